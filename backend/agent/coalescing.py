@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import copy
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from backend.deadline import DeadlineExceeded
+from backend.observability.metrics import REGISTRY
+
+
+COALESCED_REQUESTS = REGISTRY.counter(
+    "opencortex_coalesced_requests_total",
+    "Callers that shared an identical in-flight execution instead of running their own.",
+    ("scope",),
+)
+COALESCED_RERUNS = REGISTRY.counter(
+    "opencortex_coalesced_reruns_total",
+    "Waiters that re-ran an execution after it failed for a reason specific to the caller that ran it.",
+    ("scope",),
+)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, scope: str = "default") -> None:
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        timeout: float | None = None,
+        rerun_on: Tuple[type[BaseException], ...] = (),
+    ) -> Tuple[Any, bool]:
+        # `rerun_on` names errors that belong to whoever ran the execution (its deadline, its admission wait)
+        # rather than to the work itself. Waiters seeing one run the work again with their own `fn` and
+        # budget instead of inheriting the failure; they coalesce among themselves for that rerun.
+        expires_at = None if timeout is None else monotonic() + timeout
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+                else:
+                    call.waiters += 1
+
+            if leader:
+                break
+            COALESCED_REQUESTS.inc(scope=self.scope)
+            remaining = None if expires_at is None else max(0.0, expires_at - monotonic())
+            if not call.done.wait(remaining):
+                # The waiter's own budget ran out: same error (and handling) as a leader hitting its deadline.
+                raise DeadlineExceeded(f"Deadline exceeded waiting for in-flight {self.scope} execution")
+            if call.error is None:
+                return call.result, True
+            if not isinstance(call.error, rerun_on):
+                raise _own_copy(call.error)
+            COALESCED_RERUNS.inc(scope=self.scope)
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            # Later arrivals start a fresh execution; only callers that overlapped this one share it.
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+def _own_copy(error: BaseException) -> BaseException:
+    # Each waiter raises its own instance: one instance raised on several threads would collect all of
+    # their frames in a single __traceback__.
+    try:
+        return copy.copy(error)
+    except Exception:
+        return RuntimeError(f"Coalesced execution failed: {error!r}")
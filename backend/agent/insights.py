@@ -3,6 +3,9 @@ from __future__ import annotations
 from statistics import mean, pstdev
 from typing import Any, Dict, List
 
+# The only columns insights read; callers may pass rows narrowed to these.
+INSIGHT_COLUMNS = ("period", "metric_value")
+
 
 def generate_insight(question: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
     if not rows:
@@ -1,18 +1,40 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Any, Dict
+from time import perf_counter
+from typing import Any, Callable, ContextManager, Dict, Iterator, Set
 
 from sqlalchemy.orm import Session
 
-from backend.agent.insights import generate_insight
+from backend.agent.coalescing import SingleFlight
+from backend.agent.insights import INSIGHT_COLUMNS, generate_insight
 from backend.agent.intent import extract_intent
+from backend.agent.result_formats import check_result_format, encode_result
 from backend.agent.sql_generator import SQLGenerator
 from backend.agent.sql_validator import SQLValidationError, validate_sql
-from backend.db.allowlist import get_data_source, get_role_scoped_allowlist
-from backend.db.mysql import execute_readonly_query, get_mysql_engine
+from backend.agent.stages import INLINE, StageGraph
+from backend.db.admission import AdmissionController, AdmissionRejected
+from backend.db.allowlist import allowlist_version, get_data_source, get_vector_index
+from backend.db.mysql import QueryResult, execute_readonly_result, get_mysql_engine
+from backend.deadline import NO_DEADLINE, Deadline, DeadlineExceeded
+from backend.models import DataSource
+from backend.observability.metrics import PIPELINE_STAGE_SECONDS, StageTimer
+from backend.semantic.llm import DEFAULT_TIMEOUT_SECONDS as LLM_TIMEOUT_SECONDS
 from backend.semantic.service import SemanticService
-from backend.vector.service import VectorIndexService
+from backend.vector.layout import CollectionTarget, data_source_collection, registered_collection
+from backend.vector.lexical import LexicalResult
+from backend.vector.service import EMBEDDING_TIMEOUT_SECONDS, VectorIndexService
+
+
+# Failures tied to the caller whose budget ran a shared execution; coalesced waiters with time left rerun it.
+_CALLER_ERRORS = (DeadlineExceeded, AdmissionRejected)
+
+
+class _AccessDenied(Exception):
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
 
 
 @dataclass
@@ -20,6 +42,11 @@ class QueryPipeline:
     vector_index: VectorIndexService
     sql_generator: SQLGenerator
     semantic_service: SemanticService = field(default_factory=SemanticService)
+    question_flight: SingleFlight = field(default_factory=lambda: SingleFlight("question"))
+    query_flight: SingleFlight = field(default_factory=lambda: SingleFlight("warehouse_query"))
+    embedding_flight: SingleFlight = field(default_factory=lambda: SingleFlight("embedding"))
+    session_factory: Callable[[], ContextManager[Session]] | None = None
+    admission: AdmissionController = field(default_factory=AdmissionController.from_settings)
 
     def run(
         self,
@@ -30,74 +57,184 @@ class QueryPipeline:
         data_source_id: str,
         question: str,
         show_sql: bool = False,
+        deadline: Deadline = NO_DEADLINE,
+        result_format: str = "rows",
     ) -> Dict[str, Any]:
-        data_source = get_data_source(session, data_source_id)
-        if data_source is None:
-            raise ValueError(f"Unknown data source {data_source_id}")
-        if data_source.organization_id != organization_id:
-            raise ValueError("Data source does not belong to provided organization_id")
-
-        allowlist = get_role_scoped_allowlist(session, data_source_id, role=role)
-        if not allowlist:
-            return self._access_denied_response(
-                question=question,
-                organization_id=organization_id,
+        check_result_format(result_format)
+        timer = StageTimer(PIPELINE_STAGE_SECONDS, organization_id=organization_id, data_source_id=data_source_id)
+        with timer.stage("total"):
+            result = self._run_stages(
+                timer=timer,
+                session=session,
                 user_id=user_id,
+                organization_id=organization_id,
                 role=role,
                 data_source_id=data_source_id,
-                denial_reason="No role-scoped table/column access available",
+                question=question,
+                show_sql=show_sql,
+                deadline=deadline,
             )
+        # Coalesced callers share one QueryResult; each encodes it in the format it asked for.
+        result["format"] = result_format
+        rows = result["rows"]
+        # Denied and blocked responses carry no result set.
+        result["rows"] = encode_result(rows if isinstance(rows, QueryResult) else QueryResult((), []), result_format)
+        result["debug"]["timings_ms"] = timer.timings_ms()
+        result["debug"]["critical_path"] = timer.critical_path
+        return result
 
-        intent = extract_intent(question)
-        if self.semantic_service.detect_restricted_metric_request(
-            session=session,
-            organization_id=organization_id,
-            data_source_id=data_source_id,
-            role=role,
-            question=question,
-        ):
+    @contextmanager
+    def _stage_session(self, session: Session) -> Iterator[Session]:
+        if self.session_factory is None:
+            yield session
+            return
+        with self.session_factory() as stage_session:
+            yield stage_session
+
+    def _run_stages(
+        self,
+        timer: StageTimer,
+        session: Session,
+        user_id: str,
+        organization_id: str,
+        role: str,
+        data_source_id: str,
+        question: str,
+        show_sql: bool,
+        deadline: Deadline,
+    ) -> Dict[str, Any]:
+        def load_data_source() -> tuple[DataSource, CollectionTarget]:
+            with self._stage_session(session) as stage_session:
+                data_source = get_data_source(stage_session, data_source_id)
+                if data_source is None:
+                    raise ValueError(f"Unknown data source {data_source_id}")
+                if data_source.organization_id != organization_id:
+                    raise ValueError("Data source does not belong to provided organization_id")
+                # Vectors are read from wherever the data source was last indexed, which may predate a layout change.
+                index = get_vector_index(stage_session, organization_id, data_source_id)
+                if index is None:
+                    target = self.vector_index.target(organization_id, data_source_id)
+                else:
+                    target = registered_collection(organization_id, data_source_id, index.collection_name, index.layout)
+                return data_source, target
+
+        def load_allowlist() -> Dict[str, frozenset]:
+            with self._stage_session(session) as stage_session:
+                allowlist = self.semantic_service.get_role_scoped_allowlist(stage_session, organization_id, data_source_id, role)
+            if not allowlist:
+                raise _AccessDenied("No role-scoped table/column access available")
+            return allowlist
+
+        def check_restricted_metrics() -> None:
+            with self._stage_session(session) as stage_session:
+                restricted = self.semantic_service.detect_restricted_metric_request(
+                    session=stage_session,
+                    organization_id=organization_id,
+                    data_source_id=data_source_id,
+                    role=role,
+                    question=question,
+                )
+            if restricted:
+                raise _AccessDenied("Requested metric is restricted for role")
+
+        # Every stage that reads tenant data waits for the ownership check in load_data_source; after it the
+        # allowlist, the restricted-metric check and lexical search plus embedding run concurrently, each
+        # stage on its own session. Without a session_factory the stages share the request session, so the
+        # graph runs them inline on the request thread instead.
+        def search_lexical() -> LexicalResult:
+            with self._stage_session(session) as stage_session:
+                snapshot = self.semantic_service.get_snapshot(stage_session, organization_id, data_source_id)
+            self.vector_index.sync_lexical(organization_id, data_source_id, snapshot)
+            return self.vector_index.lexical_search(scope, question, top_k=12, role=role)
+
+        def embed_question(lexical: LexicalResult) -> list[float] | None:
+            # A confident lexical match makes the embedding call (and the vector scan) unnecessary.
+            if self.vector_index.is_lexically_confident(lexical, top_k=12):
+                return None
+            timeout = deadline.timeout(EMBEDDING_TIMEOUT_SECONDS, "embedding")
+            vector, _ = self.embedding_flight.do(
+                question,
+                lambda: self.vector_index.embed_query(question, timeout=timeout),
+                timeout=deadline.remaining(),
+            )
+            return vector
+
+        scope = data_source_collection(organization_id, data_source_id)
+        graph = StageGraph(timer, deadline=deadline, executor=None if self.session_factory else INLINE)
+        graph.add("data_source", load_data_source)
+        graph.add("allowlist", load_allowlist, deps=["data_source"])
+        graph.add("restricted_metric_check", check_restricted_metrics, deps=["data_source"])
+        graph.add("lexical_search", search_lexical, deps=["data_source"])
+        graph.add("embedding", lambda: embed_question(graph.result("lexical_search")), deps=["lexical_search"])
+        try:
+            stage_results = graph.run()
+        except _AccessDenied as denied:
             return self._access_denied_response(
                 question=question,
                 organization_id=organization_id,
                 user_id=user_id,
                 role=role,
                 data_source_id=data_source_id,
-                denial_reason="Requested metric is restricted for role",
+                denial_reason=denied.reason,
             )
+        finally:
+            timer.critical_path = graph.critical_path()
 
-        collection = f"org:{organization_id}:semantic:{data_source_id}"
-        retrieved_docs = self.vector_index.search(collection=collection, query=question, top_k=12, role=role)
-        accessed_metrics = sorted({d.get("name") for d in retrieved_docs if d.get("kind") == "metric" and d.get("name")})
+        data_source, collection = stage_results["data_source"]
+        allowlist = stage_results["allowlist"]
+        lexical = stage_results["lexical_search"]
+        query_vector = stage_results["embedding"]
+        intent = extract_intent(question)
 
-        sql_output = self.sql_generator.generate(question=question, intent=intent, retrieved_docs=retrieved_docs, allowlist=allowlist)
-        sql = sql_output["sql"]
+        # Identical concurrent questions from the same role against the same allowlist version share one
+        # retrieval/generation/execution; every caller still builds its own response and audit record.
+        flight_key = (data_source_id, role, allowlist_version(allowlist), question.strip())
+        deadline.check("retrieval")
+        started = perf_counter()
+        answer, shared = self.question_flight.do(
+            flight_key,
+            lambda: self._answer(
+                timer=timer,
+                organization_id=organization_id,
+                data_source_id=data_source_id,
+                collection=collection,
+                mysql_uri=data_source.mysql_uri,
+                role=role,
+                question=question,
+                intent=intent,
+                allowlist=allowlist,
+                lexical=lexical,
+                query_vector=query_vector,
+                deadline=deadline,
+            ),
+            timeout=deadline.remaining(),
+            rerun_on=_CALLER_ERRORS,
+        )
+        if shared:
+            timer.record("coalesced_wait", perf_counter() - started)
 
-        try:
-            validate_sql(sql, allowlist)
-        except SQLValidationError:
+        if answer["blocked"]:
             return self._sql_blocked_response(
                 question=question,
                 organization_id=organization_id,
                 user_id=user_id,
                 role=role,
                 data_source_id=data_source_id,
-                metrics_accessed=accessed_metrics,
+                metrics_accessed=answer["metrics_accessed"],
             )
 
-        engine = get_mysql_engine(data_source_id, data_source.mysql_uri)
-        rows = execute_readonly_query(engine, sql)
-        insight = generate_insight(question, rows)
-
         return {
             "question": question,
-            "sql": sql if show_sql else None,
-            "rows": rows,
-            "insight": insight,
+            "sql": answer["sql"] if show_sql else None,
+            "rows": answer["rows"],
+            "insight": answer["insight"],
             "debug": {
                 "auth_context": {"organization_id": organization_id, "role": role},
                 "intent": intent,
-                "semantic_hits": len(retrieved_docs),
-                "sql_rationale": sql_output.get("rationale"),
+                "semantic_hits": answer["semantic_hits"],
+                "retrieval": answer["retrieval"],
+                "sql_rationale": answer["sql_rationale"],
+                "coalesced": shared,
             },
             "_audit": {
                 "organization_id": organization_id,
@@ -105,12 +242,79 @@ class QueryPipeline:
                 "role": role,
                 "data_source_id": data_source_id,
                 "question": question,
-                "metrics_accessed": accessed_metrics,
+                "metrics_accessed": list(answer["metrics_accessed"]),
                 "access_denied": False,
                 "denial_reason": None,
             },
         }
 
+    def _answer(
+        self,
+        timer: StageTimer,
+        organization_id: str,
+        data_source_id: str,
+        collection: CollectionTarget,
+        mysql_uri: str,
+        role: str,
+        question: str,
+        intent: Dict[str, Any],
+        allowlist: Dict[str, Set[str]],
+        lexical: LexicalResult,
+        query_vector: list[float] | None,
+        deadline: Deadline,
+    ) -> Dict[str, Any]:
+        with timer.stage("vector_search"):
+            retrieved_docs = self.vector_index.hybrid_search(collection, query_vector, lexical, top_k=12, role=role)
+        accessed_metrics = sorted({d.get("name") for d in retrieved_docs if d.get("kind") == "metric" and d.get("name")})
+
+        with timer.stage("sql_generation"):
+            sql_output = self.sql_generator.generate(
+                question=question,
+                intent=intent,
+                retrieved_docs=retrieved_docs,
+                allowlist=allowlist,
+                timeout=deadline.timeout(LLM_TIMEOUT_SECONDS, "sql_generation"),
+            )
+        sql = sql_output["sql"]
+
+        try:
+            with timer.stage("sql_validation"):
+                validate_sql(sql, allowlist)
+        except SQLValidationError:
+            return {"blocked": True, "metrics_accessed": accessed_metrics}
+
+        def run_query() -> QueryResult:
+            with timer.stage("admission_wait"):
+                deadline.check("admission")
+                self.admission.acquire(organization_id, data_source_id, timeout=deadline.remaining())
+            try:
+                return execute_readonly_result(
+                    get_mysql_engine(data_source_id, mysql_uri),
+                    sql,
+                    timeout_seconds=deadline.remaining(),
+                )
+            finally:
+                self.admission.release(organization_id, data_source_id)
+
+        deadline.check("warehouse query")
+        with timer.stage("warehouse_query"):
+            rows, _ = self.query_flight.do(
+                (data_source_id, sql), run_query, timeout=deadline.remaining(), rerun_on=_CALLER_ERRORS
+            )
+        with timer.stage("insight"):
+            insight = generate_insight(question, rows.as_rows(INSIGHT_COLUMNS))
+
+        return {
+            "blocked": False,
+            "sql": sql,
+            "rows": rows,
+            "insight": insight,
+            "semantic_hits": len(retrieved_docs),
+            "retrieval": "lexical" if query_vector is None else "hybrid",
+            "sql_rationale": sql_output.get("rationale"),
+            "metrics_accessed": accessed_metrics,
+        }
+
     def _access_denied_response(
         self,
         question: str,
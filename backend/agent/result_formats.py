@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import base64
+import datetime
+import decimal
+from typing import Any, Dict, List
+
+from backend.db.mysql import QueryResult
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover
+    pa = None
+
+
+RESULT_FORMATS = ("rows", "columnar", "arrow")
+
+# Checked in order, so bool wins over int and datetime over date.
+_VALUE_TYPES = (
+    (bool, "bool"),
+    (int, "int"),
+    (float, "float"),
+    (decimal.Decimal, "decimal"),
+    (datetime.datetime, "datetime"),
+    (datetime.date, "date"),
+    (datetime.time, "time"),
+    (datetime.timedelta, "duration"),
+    (str, "string"),
+    (bytes, "bytes"),
+)
+
+
+def check_result_format(result_format: str) -> None:
+    if result_format not in RESULT_FORMATS:
+        raise ValueError(f"Unknown result format {result_format!r}; expected one of {', '.join(RESULT_FORMATS)}")
+    if result_format == "arrow" and pa is None:
+        raise ValueError("pyarrow is required for the arrow result format")
+
+
+def encode_result(result: QueryResult, result_format: str = "rows") -> Any:
+    encoded = result.encoded.get(result_format)
+    if encoded is None:
+        encoded = result.encoded.setdefault(result_format, _ENCODERS[result_format](result))
+    return encoded
+
+
+def _rows(result: QueryResult) -> List[Dict[str, Any]]:
+    return result.as_rows()
+
+
+def _columnar(result: QueryResult) -> Dict[str, Any]:
+    # Column names once and one array per column, transposed straight from the cursor tuples.
+    data = result.column_values()
+    return {"columns": list(result.columns), "types": [_column_type(values) for values in data], "data": data}
+
+
+def _arrow(result: QueryResult) -> Dict[str, Any]:
+    # from_arrays rather than a name -> array mapping, so repeated column names each keep their column.
+    table = pa.Table.from_arrays([pa.array(values) for values in result.column_values()], names=list(result.columns))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return {
+        "columns": list(result.columns),
+        "arrow_ipc": base64.b64encode(sink.getvalue().to_pybytes()).decode("ascii"),
+    }
+
+
+def _column_type(values: List[Any]) -> str:
+    sample = next((v for v in values if v is not None), None)
+    if sample is None:
+        return "null"
+    for value_type, name in _VALUE_TYPES:
+        if isinstance(sample, value_type):
+            return name
+    return type(sample).__name__
+
+
+_ENCODERS = {"rows": _rows, "columnar": _columnar, "arrow": _arrow}
@@ -16,7 +16,10 @@ class SQLGenerator:
         intent: Dict[str, Any],
         retrieved_docs: List[Dict[str, Any]],
         allowlist: Dict[str, Set[str]],
+        timeout: float | None = None,
     ) -> Dict[str, str]:
+        # timeout is the request's remaining budget for self.llm_client (complete_json(timeout=...)); the
+        # rule-based builder below makes no provider call, so it has nothing to bound yet.
         selected = self._pick_table(question, retrieved_docs, allowlist)
         db_name, table_name = selected.split(".", 1)
         table_docs = [d for d in retrieved_docs if d.get("database_name") == db_name and d.get("table_name") == table_name]
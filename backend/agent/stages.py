@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from backend.config import settings
+from backend.deadline import NO_DEADLINE, Deadline
+from backend.observability.metrics import StageTimer
+
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=settings.pipeline_stage_workers, thread_name_prefix="pipeline-stage")
+
+
+class StageCancelled(RuntimeError):
+    pass
+
+
+class InlineExecutor(Executor):
+    # Runs each stage on the calling thread as it is submitted, in dependency order; for stages that must
+    # share one session, where a pool would only add hand-off overhead.
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+
+INLINE = InlineExecutor()
+
+
+@dataclass
+class _Stage:
+    name: str
+    fn: Callable[[], Any]
+    deps: Tuple[str, ...]
+
+
+class StageGraph:
+    def __init__(self, timer: StageTimer, deadline: Deadline = NO_DEADLINE, executor: Executor | None = None) -> None:
+        self.timer = timer
+        self.deadline = deadline
+        self.executor = executor or _EXECUTOR
+        self.cancelled = threading.Event()
+        self.spans: Dict[str, Tuple[float, float]] = {}
+        self._stages: Dict[str, _Stage] = {}
+        self._results: Dict[str, Any] = {}
+
+    def add(self, name: str, fn: Callable[[], Any], deps: Tuple[str, ...] | List[str] = ()) -> None:
+        if name in self._stages:
+            raise ValueError(f"Stage {name} already registered")
+        self._stages[name] = _Stage(name=name, fn=fn, deps=tuple(deps))
+
+    def run(self) -> Dict[str, Any]:
+        origin = perf_counter()
+        results = self._results
+        pending = dict(self._stages)
+        running: Dict[Future, str] = {}
+        try:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.deps):
+                        future = self.executor.submit(self._run_stage, stage, origin)
+                        running[future] = name
+                        del pending[name]
+                        if future.done() and future.exception() is not None:
+                            break
+                if not running:
+                    raise RuntimeError(f"Unsatisfiable stage dependencies: {sorted(pending)}")
+                done, _ = wait(running, timeout=self.deadline.remaining(), return_when=FIRST_COMPLETED)
+                if not done:
+                    self.deadline.check(f"stages {sorted(running.values())} completed")
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+        except BaseException:
+            # Early exit (denial or failure): queued stages never start. Stages already running are
+            # abandoned, not interrupted: they finish in the background (bounded by their own timeouts,
+            # which the deadline caps) and their results are discarded.
+            self.cancelled.set()
+            for future in running:
+                future.cancel()
+            raise
+        return results
+
+    def result(self, name: str) -> Any:
+        # For stages that consume a dependency's output; only valid once that dependency has finished.
+        return self._results[name]
+
+    def critical_path(self) -> List[str]:
+        if not self.spans:
+            return []
+        name = max(self.spans, key=lambda n: self.spans[n][1])
+        path = [name]
+        while True:
+            deps = [d for d in self._stages[name].deps if d in self.spans]
+            if not deps:
+                break
+            name = max(deps, key=lambda d: self.spans[d][1])
+            path.append(name)
+        return list(reversed(path))
+
+    def _run_stage(self, stage: _Stage, origin: float) -> Any:
+        if self.cancelled.is_set():
+            raise StageCancelled(stage.name)
+        start = perf_counter()
+        try:
+            return stage.fn()
+        finally:
+            end = perf_counter()
+            self.spans[stage.name] = (start - origin, end - origin)
+            self.timer.record(stage.name, end - start)
@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import hashlib
+import zlib
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.semantic.snapshot import etag_matches
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "+json", "+xml")
+
+
+class _Codec:
+    def __init__(self, name: str, compress: Callable[[bytes], bytes], stream: Callable[[], Any]) -> None:
+        self.name = name
+        self.compress = compress
+        # stream() returns an object with push(chunk) -> bytes (flushed, so chunks reach the client as they
+        # are produced) and finish() -> bytes.
+        self.stream = stream
+
+
+class _GzipStream:
+    def __init__(self, level: int) -> None:
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def push(self, chunk: bytes) -> bytes:
+        return self._z.compress(chunk) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, quality: int) -> None:
+        self._c = brotli.Compressor(quality=quality)
+
+    def push(self, chunk: bytes) -> bytes:
+        return self._c.process(chunk) + self._c.flush()
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level: int) -> None:
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def push(self, chunk: bytes) -> bytes:
+        return self._c.compress(chunk) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+def build_codecs(names: Sequence[str], gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3) -> List[_Codec]:
+    # Server preference order; brotli and zstd are optional and skipped when their package is missing.
+    codecs: List[_Codec] = []
+    for name in names:
+        if name == "gzip":
+            codecs.append(_Codec("gzip", lambda body: _gzip(body, gzip_level), lambda: _GzipStream(gzip_level)))
+        elif name == "br" and brotli is not None:
+            codecs.append(_Codec("br", lambda body: brotli.compress(body, quality=brotli_quality), lambda: _BrotliStream(brotli_quality)))
+        elif name == "zstd" and zstandard is not None:
+            compressor = zstandard.ZstdCompressor(level=zstd_level)
+            codecs.append(_Codec("zstd", compressor.compress, lambda: _ZstdStream(zstd_level)))
+        elif name not in {"gzip", "br", "zstd"}:
+            raise ValueError(f"Unsupported response encoding {name!r}")
+    return codecs
+
+
+def _gzip(body: bytes, level: int) -> bytes:
+    z = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return z.compress(body) + z.flush()
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted: Dict[str, float] = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def negotiate(header: str, codecs: Sequence[_Codec]) -> _Codec | None:
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    for codec in codecs:
+        if accepted.get(codec.name, wildcard) > 0:
+            return codec
+    return None
+
+
+def _compressible(headers: MutableHeaders) -> bool:
+    content_type = headers.get("content-type", "").lower()
+    return (
+        "content-encoding" not in headers
+        and "no-transform" not in headers.get("cache-control", "").lower()
+        and any(token in content_type for token in COMPRESSIBLE_TYPES)
+    )
+
+
+def _add_vary(headers: MutableHeaders) -> None:
+    vary = headers.get("vary", "")
+    if "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"
+
+
+class CompressionMiddleware:
+    # Pure ASGI, so streamed responses are compressed chunk by chunk instead of being buffered. Bodies whose
+    # known size is below minimum_size are left alone.
+    def __init__(self, app: ASGIApp, codecs: Sequence[_Codec], minimum_size: int = 1024) -> None:
+        self.app = app
+        self.codecs = list(codecs)
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.codecs:
+            await self.app(scope, receive, send)
+            return
+        codec = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.codecs)
+        if codec is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponse(codec, self.minimum_size, send)(self.app, scope, receive)
+
+
+class _CompressedResponse:
+    def __init__(self, codec: _Codec, minimum_size: int, send: Send) -> None:
+        self.codec = codec
+        self.minimum_size = minimum_size
+        self.send = send
+        self.start: Message | None = None
+        self.stream: Any = None
+        self.passthrough = False
+
+    async def __call__(self, app: ASGIApp, scope: Scope, receive: Receive) -> None:
+        await app(scope, receive, self.on_message)
+
+    async def on_message(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if message["status"] < 200 or message["status"] in (204, 304) or not _compressible(headers):
+                self.passthrough = True
+                await self.send(message)
+                return
+            _add_vary(headers)
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.start is not None:
+            start, self.start = self.start, None
+            headers = MutableHeaders(raw=start["headers"])
+            # Content-Length still describes the whole body when an outer layer re-streams it in chunks.
+            length = headers.get("content-length")
+            size = int(length) if length else None if more_body else len(body)
+            if size is not None and size < self.minimum_size:
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            headers["Content-Encoding"] = self.codec.name
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # The bytes differ from the identity representation the strong validator names.
+                headers["ETag"] = f"W/{etag}"
+            if not more_body:
+                body = self.codec.compress(body)
+                headers["Content-Length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            del headers["Content-Length"]
+            self.stream = self.codec.stream()
+            await self.send(start)
+
+        chunk = self.stream.push(body) if body else b""
+        if not more_body:
+            chunk += self.stream.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+class ETagMiddleware:
+    # Content-hash ETags and If-None-Match revalidation for GET responses sent in one body message.
+    # Routes that set their own ETag keep it, and streamed responses pass through untouched.
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        held: List[Message] = []
+
+        async def send_with_etag(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                if message["status"] == 200 and "etag" not in headers:
+                    held.append(message)
+                    return
+                await send(message)
+                return
+            if not held:
+                await send(message)
+                return
+            start = held.pop()
+            if message.get("more_body", False):
+                await send(start)
+                await send(message)
+                return
+            body = message.get("body", b"")
+            etag, headers = _content_etag(body), MutableHeaders(raw=start["headers"])
+            headers["ETag"] = etag
+            if etag_matches(if_none_match, etag):
+                await send(_not_modified(start))
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+def _content_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _not_modified(start: Message) -> Message:
+    # A 304 repeats the validators and caching headers but carries no body or entity headers.
+    dropped = {b"content-length", b"content-type", b"content-encoding"}
+    headers: List[Tuple[bytes, bytes]] = [(k, v) for k, v in start["headers"] if k.lower() not in dropped]
+    return {"type": "http.response.start", "status": 304, "headers": headers}
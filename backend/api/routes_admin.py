@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, HTTPException, Request, Response
+from sqlalchemy import delete, select
 
 from backend.audit.service import list_audit_logs
-from backend.api.deps import vector_index_service
+from backend.circuit_breaker import breaker_snapshots
+from backend.api.deps import vector_index_service, vector_store
+from backend.config import settings
 from backend.db.allowlist import (
     create_organization,
     create_role,
@@ -15,12 +17,14 @@ from backend.db.allowlist import (
     list_organizations,
     list_roles,
     list_users,
+    list_vector_indexes,
     register_vector_index,
     set_allowlist,
     upsert_data_source,
 )
 from backend.db.mysql import get_mysql_engine, introspect_schema
-from backend.db.session import db_session
+from backend.db.session import db_read_session, db_session
+from backend.observability.metrics import ADMIN_JOB_SECONDS, StageTimer
 from backend.models import (
     AllowlistRequest,
     ConnectRequest,
@@ -29,8 +33,11 @@ from backend.models import (
     CreateUserRequest,
     DataSource,
     SemanticVisibilityOverrideRequest,
+    VectorIndex,
 )
 from backend.semantic.service import SemanticService
+from backend.semantic.snapshot import etag_matches
+from backend.vector.layout import registered_collection
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -51,7 +58,7 @@ def create_organization_endpoint(payload: CreateOrganizationRequest):
 
 @router.get("/organizations")
 def list_organizations_endpoint():
-    with db_session() as session:
+    with db_read_session() as session:
         orgs = list_organizations(session)
         return {
             "organizations": [
@@ -83,7 +90,7 @@ def create_role_endpoint(payload: CreateRoleRequest):
 
 @router.get("/organizations/{organization_id}/roles")
 def list_roles_endpoint(organization_id: str):
-    with db_session() as session:
+    with db_read_session() as session:
         roles = list_roles(session, organization_id)
         return {
             "roles": [
@@ -116,7 +123,7 @@ def create_user_endpoint(payload: CreateUserRequest):
 
 @router.get("/organizations/{organization_id}/users")
 def list_users_endpoint(organization_id: str):
-    with db_session() as session:
+    with db_read_session() as session:
         users = list_users(session, organization_id)
         return {
             "users": [
@@ -134,7 +141,7 @@ def list_users_endpoint(organization_id: str):
 
 @router.get("/organizations/{organization_id}/audit-logs")
 def list_audit_logs_endpoint(organization_id: str, limit: int = 200):
-    with db_session() as session:
+    with db_read_session() as session:
         return {"audit_logs": list_audit_logs(session, organization_id, limit=limit)}
 
 
@@ -154,7 +161,7 @@ def connect_data_source(payload: ConnectRequest):
 
 @router.get("/organizations/{organization_id}/data-sources")
 def list_data_sources(organization_id: str):
-    with db_session() as session:
+    with db_read_session() as session:
         rows = session.scalars(select(DataSource).where(DataSource.organization_id == organization_id)).all()
         return {
             "data_sources": [
@@ -171,7 +178,7 @@ def list_data_sources(organization_id: str):
 
 @router.get("/data-sources/{data_source_id}/schema")
 def get_schema(data_source_id: str):
-    with db_session() as session:
+    with db_read_session() as session:
         ds = get_data_source(session, data_source_id)
         if ds is None:
             raise HTTPException(status_code=404, detail="Data source not found")
@@ -189,12 +196,14 @@ def save_allowlist(payload: AllowlistRequest):
         if ds.organization_id != payload.organization_id:
             raise HTTPException(status_code=400, detail="organization_id does not own data source")
         set_allowlist(session, payload)
+        # Allowlist tables and columns are part of the semantic model served to readers.
+        SemanticService().refresh_snapshot(session, ds.organization_id, payload.data_source_id)
         return {"status": "ok"}
 
 
 @router.get("/data-sources/{data_source_id}/allowlist")
 def fetch_allowlist(data_source_id: str):
-    with db_session() as session:
+    with db_read_session() as session:
         return get_allowlist_with_visibility(session, data_source_id)
 
 
@@ -209,23 +218,29 @@ def build_semantic_model(data_source_id: str):
         if not allowlist:
             raise HTTPException(status_code=400, detail="Allowlist is empty")
 
-        engine = get_mysql_engine(ds.id, ds.mysql_uri)
-        schema = introspect_schema(engine)
+        timer = StageTimer(ADMIN_JOB_SECONDS, organization_id=ds.organization_id, data_source_id=data_source_id)
+        with timer.stage("introspect_schema"):
+            engine = get_mysql_engine(ds.id, ds.mysql_uri)
+            schema = introspect_schema(engine)
 
         semantic_service = SemanticService()
-        semantic_model = semantic_service.build_semantic_model(session, ds.organization_id, data_source_id, schema, allowlist)
+        with timer.stage("build_semantic_model"):
+            semantic_model = semantic_service.build_semantic_model(session, ds.organization_id, data_source_id, schema, allowlist)
         return {"organization_id": ds.organization_id, **semantic_model}
 
 
 @router.get("/data-sources/{data_source_id}/semantic")
-def get_semantic_model(data_source_id: str):
-    with db_session() as session:
+def get_semantic_model(data_source_id: str, request: Request):
+    with db_read_session() as session:
         ds = get_data_source(session, data_source_id)
         if ds is None:
             raise HTTPException(status_code=404, detail="Data source not found")
-        semantic_service = SemanticService()
-        semantic = semantic_service.get_semantics(session, ds.organization_id, data_source_id)
-        return {"organization_id": ds.organization_id, **semantic}
+        snapshot = SemanticService().get_snapshot(session, ds.organization_id, data_source_id)
+    # no-cache: clients may keep the body but must revalidate, which costs a 304 while nothing changed.
+    headers = {"ETag": snapshot.http_etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), snapshot.http_etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.response_body(), media_type="application/json", headers=headers)
 
 
 @router.post("/data-sources/{data_source_id}/semantic/visibility")
@@ -253,17 +268,80 @@ def index_semantic_docs(data_source_id: str):
         ds = get_data_source(session, data_source_id)
         if ds is None:
             raise HTTPException(status_code=404, detail="Data source not found")
+        organization_id = ds.organization_id
+    return {"organization_id": organization_id, **_index_data_source(organization_id, data_source_id)}
 
-        semantic_service = SemanticService()
-        semantic = semantic_service.get_semantics(session, ds.organization_id, data_source_id)
-        docs = vector_index_service.build_semantic_docs(data_source_id, semantic)
 
-        collection = f"org:{ds.organization_id}:semantic:{data_source_id}"
-        register_vector_index(session, ds.organization_id, data_source_id, collection)
+@router.post("/vector/migrate-layout")
+def migrate_vector_layout(organization_id: str | None = None):
+    # Re-indexes every data source whose vectors live outside the collection the current layout assigns.
+    with db_session() as session:
+        stmt = select(VectorIndex)
+        if organization_id:
+            stmt = stmt.where(VectorIndex.organization_id == organization_id)
+        pending = sorted(
+            {
+                (row.organization_id, row.data_source_id)
+                for row in session.scalars(stmt).all()
+                if row.layout != settings.vector_collection_layout
+                or row.collection_name != vector_index_service.target(row.organization_id, row.data_source_id).name
+            }
+        )
+    migrated = [
+        {"organization_id": org_id, "data_source_id": ds_id, **_index_data_source(org_id, ds_id)}
+        for org_id, ds_id in pending
+    ]
+    return {"layout": settings.vector_collection_layout, "migrated": migrated}
+
+
+def _index_data_source(organization_id: str, data_source_id: str) -> dict:
+    with db_session() as session:
+        timer = StageTimer(ADMIN_JOB_SECONDS, organization_id=organization_id, data_source_id=data_source_id)
+        semantic_service = SemanticService()
+        with timer.stage("build_semantic_docs"):
+            semantic = semantic_service.get_semantics(session, organization_id, data_source_id)
+            docs = vector_index_service.build_semantic_docs(data_source_id, semantic)
+        target = vector_index_service.target(organization_id, data_source_id)
+        stale = [
+            (row.id, registered_collection(organization_id, data_source_id, row.collection_name, row.layout))
+            for row in list_vector_indexes(session, organization_id, data_source_id)
+            if row.collection_name != target.name
+        ]
+
+    with timer.stage("index_documents"):
+        changes = vector_index_service.index_documents(collection=target, docs=docs)
+        # The new copy is complete before the old one goes, so queries never see an empty index. The lexical
+        # index is keyed per data source whatever the layout, so it is left alone.
+        dropped = sum(vector_index_service.drop_documents(old, keep_lexical=True) for _, old in stale)
 
-    count = vector_index_service.index_documents(collection=collection, docs=docs)
+    with db_session() as session:
+        for row_id, _ in stale:
+            session.execute(delete(VectorIndex).where(VectorIndex.id == row_id))
+        register_vector_index(session, organization_id, data_source_id, target.name, target.layout)
     return {
-        "organization_id": ds.organization_id,
-        "indexed": count,
-        "collection": collection,
+        "indexed": changes["added"] + changes["updated"],
+        "collection": target.name,
+        "layout": target.layout,
+        **changes,
+        "migrated_from": [old.name for _, old in stale],
+        "dropped": dropped,
     }
+
+
+@router.get("/vector/memory")
+def vector_memory_stats(recall: bool = False):
+    if not hasattr(vector_store, "memory_report"):
+        raise HTTPException(status_code=400, detail="Vector store does not report memory usage")
+    report = vector_store.memory_report()
+    report["lexical"] = vector_index_service.lexical.memory()
+    if recall:
+        # Spilled collections are not reloaded just to measure them.
+        for name, stats in report["collections"].items():
+            if stats["state"] == "resident":
+                stats["recall"] = vector_store.measure_recall(name)
+    return report
+
+
+@router.get("/circuit-breakers")
+def list_circuit_breakers():
+    return {"circuit_breakers": breaker_snapshots()}
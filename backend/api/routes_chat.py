@@ -5,7 +5,10 @@ from fastapi import APIRouter, HTTPException, Request
 from backend.audit.service import record_audit_log
 from backend.api.auth import require_auth_context
 from backend.api.deps import query_pipeline
-from backend.db.session import db_session
+from backend.api.responses import FastJSONResponse
+from backend.db.admission import AdmissionRejected
+from backend.db.session import db_read_session, db_session
+from backend.deadline import Deadline, resolve_request_timeout
 from backend.models import AskRequest
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -22,7 +25,11 @@ def ask_question(payload: AskRequest, request: Request):
         ):
             raise HTTPException(status_code=400, detail="Auth header context must match request user_id, organization_id, and role")
 
-        with db_session() as session:
+        deadline = Deadline(
+            resolve_request_timeout(payload.organization_id, request.headers.get("x-request-timeout-ms"))
+        )
+        # The pipeline only reads metadata; the audit row is the request's single write, on the primary.
+        with db_read_session() as session:
             result = query_pipeline.run(
                 session=session,
                 user_id=payload.user_id,
@@ -31,15 +38,27 @@ def ask_question(payload: AskRequest, request: Request):
                 data_source_id=payload.data_source_id,
                 question=payload.question,
                 show_sql=payload.show_sql,
+                deadline=deadline,
+                result_format=payload.format,
             )
 
-            audit = result.pop("_audit", None)
-            if audit:
+        audit = result.pop("_audit", None)
+        if audit:
+            with db_session() as session:
                 record_audit_log(session=session, **audit)
 
-            result["sql"] = None
-            result.pop("debug", None)
-            return result
+        result["sql"] = None
+        result.pop("debug", None)
+        # Rows are plain dicts of driver values (Decimal, datetime, ...); encode them once, directly.
+        return FastJSONResponse(result)
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+            headers={"Retry-After": str(int(exc.retry_after_seconds))},
+        ) from exc
+    except TimeoutError as exc:
+        raise HTTPException(status_code=504, detail=f"Request deadline exceeded: {exc}") from exc
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:
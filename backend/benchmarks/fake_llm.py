@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+
+@dataclass
+class FakeLLMConfig:
+    embedding_latency_ms: float = 20.0
+    completion_latency_ms: float = 200.0
+    jitter_ms: float = 5.0
+    embedding_dim: int = 256
+    seed: int = 7
+
+
+class FakeLLMServer:
+    def __init__(self, config: FakeLLMConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or FakeLLMConfig()
+        self._rng = random.Random(self.config.seed)
+        self._rng_lock = threading.Lock()
+        self.request_counts: Dict[str, int] = {"embeddings": 0, "chat_completions": 0}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _count(self, kind: str) -> None:
+        with self._rng_lock:
+            self.request_counts[kind] += 1
+
+    def _sleep(self, base_ms: float) -> None:
+        with self._rng_lock:
+            jitter = self._rng.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        delay = max(0.0, base_ms + jitter) / 1000.0
+        if delay:
+            time.sleep(delay)
+
+    def embed(self, text: str) -> List[float]:
+        # Bag-of-tokens hashing so lexically similar texts land near each other.
+        dim = self.config.embedding_dim
+        vector = [0.0] * dim
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.endswith("/embeddings"):
+                    server._count("embeddings")
+                    server._sleep(server.config.embedding_latency_ms)
+                    inputs = body.get("input", "")
+                    if isinstance(inputs, str):
+                        inputs = [inputs]
+                    payload = {
+                        "object": "list",
+                        "data": [
+                            {"object": "embedding", "index": i, "embedding": server.embed(text)}
+                            for i, text in enumerate(inputs)
+                        ],
+                        "model": body.get("model"),
+                    }
+                elif self.path.endswith("/chat/completions"):
+                    server._count("chat_completions")
+                    server._sleep(server.config.completion_latency_ms)
+                    prompt = body.get("messages", [{}])[-1].get("content", "")
+                    content = json.dumps({"description": f"Synthetic description. {prompt[-120:]}"})
+                    payload = {
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                        "model": body.get("model"),
+                    }
+                else:
+                    self._send(404, {"error": f"unknown path {self.path}"})
+                    return
+                self._send(200, payload)
+
+            def _send(self, status: int, payload: Dict[str, Any]) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import requests
+
+from backend.benchmarks.fake_llm import FakeLLMConfig, FakeLLMServer
+from backend.benchmarks.report import (
+    compare_metrics,
+    format_comparison,
+    git_revision,
+    latency_summary,
+    load_json,
+    write_json,
+)
+from backend.benchmarks.warehouse import SyntheticWarehouse, WarehouseConfig
+
+
+ORGANIZATION_ID = "bench_org"
+DATA_SOURCE_ID = "bench_warehouse"
+USER_ID = "bench_user"
+ROLE = "admin"
+
+DEFAULT_QUESTIONS = [
+    "What is the revenue trend over time?",
+    "How many orders do we have?",
+    "How many unique regions placed orders?",
+    "What is total revenue?",
+    "Show revenue growth trend by month",
+    "Count distinct region values",
+]
+
+_STAGE_SUM_RE = re.compile(r'^opencortex_(pipeline_stage|admin_job)_seconds_(sum|count)\{stage="([^"]+)",[^}]*\} (\S+)$')
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="End-to-end load and latency benchmark for the BI API.")
+    parser.add_argument("--requests", type=int, default=200, help="Number of /chat/ask requests to send.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent /chat/ask clients.")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured /chat/ask requests sent first.")
+    parser.add_argument("--admin-iterations", type=int, default=3, help="Semantic build and vector index runs.")
+    parser.add_argument("--admin-concurrency", type=int, default=1, help="Concurrent admin build/index clients.")
+    parser.add_argument("--tables", type=int, default=20, help="Synthetic warehouse table count.")
+    parser.add_argument("--columns", type=int, default=12, help="Columns per synthetic table.")
+    parser.add_argument("--rows", type=int, default=200, help="Rows per synthetic table.")
+    parser.add_argument("--embedding-latency-ms", type=float, default=20.0)
+    parser.add_argument("--completion-latency-ms", type=float, default=5.0)
+    parser.add_argument("--jitter-ms", type=float, default=2.0)
+    parser.add_argument("--embedding-dim", type=int, default=256)
+    parser.add_argument("--output", default="load_benchmark.json", help="Path of the JSON result file.")
+    parser.add_argument("--compare", help="Previous result JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative regression threshold for --compare.")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="bi-load-bench-")
+
+    fake_llm = FakeLLMServer(
+        FakeLLMConfig(
+            embedding_latency_ms=args.embedding_latency_ms,
+            completion_latency_ms=args.completion_latency_ms,
+            jitter_ms=args.jitter_ms,
+            embedding_dim=args.embedding_dim,
+        )
+    ).start()
+
+    # Settings are read at import time, so the environment must be in place before the app is imported.
+    os.environ["METADATA_DB_URL"] = f"sqlite:///{os.path.join(workdir, 'metadata.db')}"
+    os.environ["LLM_API_BASE"] = fake_llm.base_url
+    os.environ["LLM_API_KEY"] = "bench-key"
+    os.environ["VECTOR_PROVIDER"] = "memory"
+
+    warehouse = SyntheticWarehouse(
+        workdir,
+        WarehouseConfig(table_count=args.tables, columns_per_table=args.columns, rows_per_table=args.rows),
+    ).build()
+
+    from backend.db import mysql as mysql_module
+    from backend.main import app
+
+    mysql_module._ENGINE_CACHE[DATA_SOURCE_ID] = warehouse.create_engine()
+
+    server, base_url = _start_app(app)
+    try:
+        _setup_tenant(base_url, warehouse)
+        results: Dict[str, Any] = {}
+
+        build_url = f"{base_url}/admin/data-sources/{DATA_SOURCE_ID}/semantic/build"
+        index_url = f"{base_url}/admin/data-sources/{DATA_SOURCE_ID}/vector/index"
+        results["semantic_build"] = _measure(
+            base_url,
+            lambda s, i: s.post(build_url),
+            iterations=args.admin_iterations,
+            concurrency=args.admin_concurrency,
+            metric="admin_job",
+        )
+        results["vector_index"] = _measure(
+            base_url,
+            lambda s, i: s.post(index_url),
+            iterations=args.admin_iterations,
+            concurrency=args.admin_concurrency,
+            metric="admin_job",
+        )
+
+        chat_url = f"{base_url}/chat/ask"
+        headers = {"x-user-id": USER_ID, "x-organization-id": ORGANIZATION_ID, "x-role": ROLE}
+
+        def ask(session: requests.Session, i: int) -> requests.Response:
+            question = DEFAULT_QUESTIONS[i % len(DEFAULT_QUESTIONS)]
+            return session.post(
+                chat_url,
+                headers=headers,
+                json={
+                    "user_id": USER_ID,
+                    "organization_id": ORGANIZATION_ID,
+                    "role": ROLE,
+                    "data_source_id": DATA_SOURCE_ID,
+                    "question": question,
+                },
+            )
+
+        _drive(ask, iterations=args.warmup, concurrency=args.concurrency)
+        results["chat_ask"] = _measure(
+            base_url,
+            ask,
+            iterations=args.requests,
+            concurrency=args.concurrency,
+            metric="pipeline_stage",
+        )
+    finally:
+        server.should_exit = True
+        fake_llm.stop()
+
+    report = {
+        "git_revision": git_revision(),
+        "timestamp": time.time(),
+        "config": vars(args),
+        "fake_llm_requests": dict(fake_llm.request_counts),
+        "scenarios": results,
+    }
+    write_json(args.output, report)
+    _print_summary(results)
+
+    if args.compare:
+        baseline = load_json(args.compare)["scenarios"]
+        rows = compare_metrics(
+            baseline,
+            results,
+            keys=("p50_ms", "p95_ms", "p99_ms", "throughput_rps"),
+            threshold=args.threshold,
+            higher_is_better=("throughput_rps",),
+        )
+        print(format_comparison(rows))
+        if any(r["regression"] for r in rows):
+            return 1
+    return 0
+
+
+def _start_app(app) -> tuple[Any, str]:
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name="bench-api", daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise RuntimeError("API server failed to start")
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def _setup_tenant(base_url: str, warehouse: SyntheticWarehouse) -> None:
+    steps = [
+        ("/admin/organizations", {"id": ORGANIZATION_ID, "name": "Benchmark Org"}),
+        (
+            "/admin/data-sources/connect",
+            {
+                "id": DATA_SOURCE_ID,
+                "organization_id": ORGANIZATION_ID,
+                "name": "Synthetic warehouse",
+                "mysql_uri": warehouse.uri,
+            },
+        ),
+        ("/admin/allowlist", warehouse.allowlist_payload(ORGANIZATION_ID, DATA_SOURCE_ID)),
+    ]
+    for path, payload in steps:
+        response = requests.post(f"{base_url}{path}", json=payload, timeout=120)
+        response.raise_for_status()
+
+
+def _drive(
+    call: Callable[[requests.Session, int], requests.Response],
+    iterations: int,
+    concurrency: int,
+) -> tuple[List[float], int, float]:
+    local = threading.local()
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(i: int) -> None:
+        nonlocal errors
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = call(session, i).status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        list(pool.map(worker, range(iterations)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def _measure(
+    base_url: str,
+    call: Callable[[requests.Session, int], requests.Response],
+    iterations: int,
+    concurrency: int,
+    metric: str,
+) -> Dict[str, Any]:
+    before = _scrape_stage_totals(base_url, metric)
+    latencies, errors, wall_time = _drive(call, iterations, concurrency)
+    after = _scrape_stage_totals(base_url, metric)
+
+    summary = latency_summary(latencies, wall_time, errors)
+    summary["concurrency"] = concurrency
+    stages = {}
+    for stage, totals in after.items():
+        prev = before.get(stage, {"sum": 0.0, "count": 0.0})
+        count = totals["count"] - prev["count"]
+        if count > 0:
+            stages[stage] = {
+                "count": int(count),
+                "mean_ms": round((totals["sum"] - prev["sum"]) / count * 1000.0, 3),
+            }
+    summary["stages"] = stages
+    return summary
+
+
+def _scrape_stage_totals(base_url: str, metric: str) -> Dict[str, Dict[str, float]]:
+    text = requests.get(f"{base_url}/metrics", timeout=30).text
+    totals: Dict[str, Dict[str, float]] = {}
+    for line in text.splitlines():
+        m = _STAGE_SUM_RE.match(line)
+        if not m or m.group(1) != metric:
+            continue
+        entry = totals.setdefault(m.group(3), {"sum": 0.0, "count": 0.0})
+        entry[m.group(2)] += float(m.group(4))
+    return totals
+
+
+def _print_summary(results: Dict[str, Any]) -> None:
+    for name, summary in results.items():
+        print(
+            f"{name:<16} n={summary['requests']:<5} err={summary['errors']:<4} "
+            f"rps={summary['throughput_rps']:<9} p50={summary['p50_ms']}ms "
+            f"p95={summary['p95_ms']}ms p99={summary['p99_ms']}ms"
+        )
+        for stage, stats in sorted(summary["stages"].items(), key=lambda kv: -kv[1]["mean_ms"]):
+            print(f"    {stage:<26} {stats['mean_ms']:>10.3f}ms (n={stats['count']})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,550 @@
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+from backend.benchmarks.report import compare_metrics, format_comparison, git_revision, load_json, write_json
+
+
+DEFAULT_BASELINE = "backend/benchmarks/baselines/micro.json"
+
+
+@dataclass
+class Scale:
+    tables: int = 300
+    columns: int = 4000
+    vectors: int = 100_000
+    vector_dim: int = 32
+    periods: int = 10_000
+    questions: int = 1000
+
+    @classmethod
+    def scaled(cls, factor: float) -> "Scale":
+        base = cls()
+        return cls(
+            tables=max(2, int(base.tables * factor)),
+            columns=max(4, int(base.columns * factor)),
+            vectors=max(10, int(base.vectors * factor)),
+            vector_dim=base.vector_dim,
+            periods=max(3, int(base.periods * factor)),
+            questions=max(1, int(base.questions * factor)),
+        )
+
+
+BENCHMARKS: Dict[str, Callable[[Scale], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str):
+    def register(setup: Callable[[Scale], Callable[[], Any]]):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def _synthetic_allowlist(scale: Scale) -> Dict[str, set[str]]:
+    per_table = max(1, scale.columns // scale.tables)
+    allowlist: Dict[str, set[str]] = {}
+    for t in range(scale.tables):
+        cols = {"order_date", "revenue", "region"}
+        cols.update(f"attr_{t}_{c}" for c in range(max(0, per_table - 3)))
+        allowlist[f"analytics.table_{t:04d}"] = cols
+    return allowlist
+
+
+def _synthetic_semantic_model(scale: Scale) -> Dict[str, Any]:
+    allowlist = _synthetic_allowlist(scale)
+    roles = ["admin", "executive", "finance", "sales"]
+    tables, columns, metrics = [], [], []
+    for fq, cols in allowlist.items():
+        db_name, table_name = fq.split(".", 1)
+        tables.append(
+            {
+                "database_name": db_name,
+                "table_name": table_name,
+                "allowed_roles": roles,
+                "columns": [{"column_name": c, "allowed_roles": roles} for c in sorted(cols)],
+            }
+        )
+        for c in sorted(cols):
+            semantic_type = "time_dimension" if c == "order_date" else "measure" if c == "revenue" else "dimension"
+            columns.append(
+                {
+                    "database_name": db_name,
+                    "table_name": table_name,
+                    "column_name": c,
+                    "semantic_type": semantic_type,
+                    "description": f"{c} in {table_name} categorized as {semantic_type}.",
+                    "metric_candidates": {"sum": semantic_type == "measure", "count": True, "count_distinct": True},
+                    "allowed_roles": roles,
+                }
+            )
+            metrics.append(
+                {
+                    "name": f"{table_name}_{c}_count_distinct",
+                    "description": f"Default metric generated for {fq}.{c}",
+                    "expression_sql": f"SELECT COUNT(DISTINCT {c}) FROM {fq}",
+                    "metadata": {"database_name": db_name, "table_name": table_name, "column_name": c},
+                    "allowed_roles": roles[:2],
+                }
+            )
+    return {"semantic_tables": tables, "semantic_columns": columns, "metrics": metrics}
+
+
+@benchmark("validate_sql")
+def _bench_validate_sql(scale: Scale):
+    from backend.agent.sql_validator import validate_sql
+
+    allowlist = _synthetic_allowlist(scale)
+    sql = (
+        "SELECT DATE_FORMAT(`order_date`, '%Y-%m') AS period, SUM(`revenue`) AS metric_value "
+        "FROM `analytics`.`table_0001` WHERE `order_date` >= DATE_SUB(CURRENT_DATE, INTERVAL 6 MONTH) "
+        "GROUP BY DATE_FORMAT(`order_date`, '%Y-%m')"
+    )
+    return lambda: validate_sql(sql, allowlist)
+
+
+def _memory_query(scale: Scale, **store_options: Any) -> Callable[[], Any]:
+    from backend.vector.base import VectorRecord
+    from backend.vector.memory_store import InMemoryVectorStore
+
+    rng = random.Random(1)
+    store = InMemoryVectorStore(**store_options)
+    store.upsert(
+        "bench",
+        [
+            VectorRecord(id=f"doc-{i}", vector=[rng.uniform(-1, 1) for _ in range(scale.vector_dim)], payload={"id": f"doc-{i}"})
+            for i in range(scale.vectors)
+        ],
+    )
+    query = [rng.uniform(-1, 1) for _ in range(scale.vector_dim)]
+    return lambda: store.query("bench", query, top_k=60)
+
+
+@benchmark("memory_store.query")
+def _bench_memory_query(scale: Scale):
+    return _memory_query(scale)
+
+
+@benchmark("memory_store.query[int8]")
+def _bench_memory_query_int8(scale: Scale):
+    return _memory_query(scale, encoding="int8", rerank_factor=4)
+
+
+@benchmark("memory_store.query[pq]")
+def _bench_memory_query_pq(scale: Scale):
+    return _memory_query(scale, encoding="pq", rerank_factor=4, pq_subspaces=8)
+
+
+@benchmark("memory_store.upsert")
+def _bench_memory_upsert(scale: Scale):
+    from backend.vector.base import VectorRecord
+    from backend.vector.memory_store import InMemoryVectorStore
+
+    rng = random.Random(2)
+
+    def record(i: int) -> VectorRecord:
+        return VectorRecord(id=f"doc-{i}", vector=[rng.uniform(-1, 1) for _ in range(scale.vector_dim)], payload={"id": f"doc-{i}"})
+
+    store = InMemoryVectorStore()
+    store.upsert("bench", [record(i) for i in range(scale.vectors)])
+    batch = [record(i) for i in range(0, scale.vectors, max(1, scale.vectors // 1000))]
+    return lambda: store.upsert("bench", batch)
+
+
+@benchmark("cosine_similarity")
+def _bench_cosine(scale: Scale):
+    from backend.vector.memory_store import _cosine_similarity
+
+    rng = random.Random(3)
+    pairs = [
+        ([rng.uniform(-1, 1) for _ in range(1536)], [rng.uniform(-1, 1) for _ in range(1536)])
+        for _ in range(100)
+    ]
+
+    def run() -> None:
+        for a, b in pairs:
+            _cosine_similarity(a, b)
+
+    return run
+
+
+@benchmark("extract_intent")
+def _bench_extract_intent(scale: Scale):
+    from backend.agent.intent import extract_intent
+
+    templates = [
+        "What is the revenue trend over the last {n} months?",
+        "How many unique customers ordered in the last {n} weeks compared to the previous period?",
+        "Show total sales amount",
+        "Count of orders by region over time",
+    ]
+    questions = [templates[i % len(templates)].format(n=i % 24 + 1) for i in range(scale.questions)]
+
+    def run() -> None:
+        for q in questions:
+            extract_intent(q)
+
+    return run
+
+
+@benchmark("sql_generator.generate")
+def _bench_sql_generate(scale: Scale):
+    from backend.agent.intent import extract_intent
+    from backend.agent.sql_generator import SQLGenerator
+
+    allowlist = _synthetic_allowlist(scale)
+    generator = SQLGenerator()
+    question = "What is the revenue trend over the last 6 months?"
+    intent = extract_intent(question)
+    docs = [
+        {"database_name": "analytics", "table_name": "table_0007", "column_name": c, "semantic_type": t}
+        for c, t in [("order_date", "time_dimension"), ("revenue", "measure"), ("region", "dimension")]
+    ]
+
+    def run() -> None:
+        generator.generate(question=question, intent=intent, retrieved_docs=docs, allowlist=allowlist)
+        generator.generate(question=question, intent=intent, retrieved_docs=[], allowlist=allowlist)
+
+    return run
+
+
+@benchmark("generate_insight.trend")
+def _bench_trend_insight(scale: Scale):
+    from backend.agent.insights import generate_insight
+
+    rng = random.Random(4)
+    rows = [{"period": f"p{i:05d}", "metric_value": rng.gauss(1000, 50) + i * 0.1} for i in range(scale.periods)]
+    return lambda: generate_insight("revenue trend", rows)
+
+
+@benchmark("build_semantic_docs")
+def _bench_build_semantic_docs(scale: Scale):
+    from backend.vector.memory_store import InMemoryVectorStore
+    from backend.vector.service import VectorIndexService
+
+    service = VectorIndexService(store=InMemoryVectorStore())
+    model = _synthetic_semantic_model(scale)
+    return lambda: service.build_semantic_docs("bench_ds", model)
+
+
+def _role_scoped_semantic_model(scale: Scale, roles: List[str]) -> Dict[str, Any]:
+    # Each item is granted to a rotating handful of roles, as in an organization with many roles.
+    rng = random.Random(7)
+    model = _synthetic_semantic_model(scale)
+    for key in ("semantic_tables", "semantic_columns", "metrics"):
+        for item in model[key]:
+            item["allowed_roles"] = rng.sample(roles, rng.randint(0, 4))
+    return model
+
+
+@benchmark("role_projections.build")
+def _bench_role_projections_build(scale: Scale):
+    from backend.semantic.snapshot import RoleProjections
+
+    roles = [f"role_{i:02d}" for i in range(32)]
+    model = _role_scoped_semantic_model(scale, roles)
+
+    def run() -> None:
+        projections = RoleProjections(model)
+        for role in roles:
+            projections.view(role)
+
+    return run
+
+
+@benchmark("role_projections.view")
+def _bench_role_projections_view(scale: Scale):
+    from backend.semantic.snapshot import RoleProjections
+
+    roles = [f"role_{i:02d}" for i in range(32)]
+    projections = RoleProjections(_role_scoped_semantic_model(scale, roles))
+
+    def run() -> None:
+        for role in roles:
+            projections.view(role)
+
+    return run
+
+
+@benchmark("local_embedder.embed_many")
+def _bench_local_embed_many(scale: Scale):
+    from backend.vector.local_embedder import LocalHashingEmbedder
+    from backend.vector.service import VectorIndexService
+    from backend.vector.memory_store import InMemoryVectorStore
+
+    docs = VectorIndexService(store=InMemoryVectorStore()).build_semantic_docs("bench_ds", _synthetic_semantic_model(scale))
+    texts = [d["text"] for d in docs]
+    embedder = LocalHashingEmbedder()
+    return lambda: embedder.embed_many(texts)
+
+
+@benchmark("local_embedder.embed_query")
+def _bench_local_embed_query(scale: Scale):
+    from backend.vector.local_embedder import LocalHashingEmbedder
+
+    embedder = LocalHashingEmbedder()
+    return lambda: embedder.embed("total revenue by region last month")
+
+
+def _synthetic_result_rows(count: int) -> List[Dict[str, Any]]:
+    # Warehouse rows as execute_readonly_query returns them: driver Decimal, date and datetime values.
+    import datetime
+    from decimal import Decimal
+
+    start = datetime.datetime(2024, 1, 1, 8, 30)
+    return [
+        {
+            "order_id": i,
+            "order_date": (start + datetime.timedelta(hours=i)).date(),
+            "updated_at": start + datetime.timedelta(minutes=i),
+            "region": ("north", "south", "east", "west")[i % 4],
+            "revenue": Decimal(i % 10_000) / 100,
+            "units": i % 37,
+        }
+        for i in range(count)
+    ]
+
+
+@benchmark("serialize_rows[jsonable_encoder]")
+def _bench_serialize_rows_jsonable(scale: Scale):
+    # The previous response path: FastAPI's jsonable_encoder, then Starlette's stdlib JSONResponse.
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    content = {"question": "bench", "rows": _synthetic_result_rows(scale.vectors)}
+    return lambda: JSONResponse(jsonable_encoder(content))
+
+
+@benchmark("serialize_rows[stdlib]")
+def _bench_serialize_rows_stdlib(scale: Scale):
+    import json
+
+    from backend.api.responses import _default
+
+    content = {"question": "bench", "rows": _synthetic_result_rows(scale.vectors)}
+    return lambda: json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+@benchmark("serialize_rows")
+def _bench_serialize_rows(scale: Scale):
+    from backend.api.responses import FastJSONResponse
+
+    content = {"question": "bench", "rows": _synthetic_result_rows(scale.vectors)}
+    return lambda: FastJSONResponse(content)
+
+
+def _compression_benchmark(name: str, level: int):
+    def setup(scale: Scale):
+        from backend.api.compression import build_codecs
+        from backend.api.responses import dumps
+
+        levels = {"gzip": "gzip_level", "br": "brotli_quality", "zstd": "zstd_level"}
+        codecs = build_codecs([name], **{levels[name]: level})
+        body = dumps({"question": "bench", "rows": _synthetic_result_rows(max(1, scale.vectors // 10))})
+        compress = codecs[0].compress
+        run = lambda: compress(body)
+        compressed = len(run())
+        # Reported next to the timings, so CPU cost and bytes saved read side by side.
+        run.stats = {"input_bytes": len(body), "output_bytes": compressed, "ratio": round(len(body) / compressed, 2)}
+        return run
+
+    return setup
+
+
+def _compression_available(name: str) -> bool:
+    from backend.api.compression import build_codecs
+
+    return bool(build_codecs([name]))
+
+
+# brotli and zstd are optional; their benchmarks are only registered when the package is installed.
+for _name, _levels in (("gzip", (1, 6, 9)), ("br", (1, 4, 9)), ("zstd", (1, 3, 9))):
+    if not _compression_available(_name):
+        continue
+    for _level in _levels:
+        benchmark(f"compress[{_name}-{_level}]")(_compression_benchmark(_name, _level))
+
+
+def _bench_session():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.models import Base, DataSource, Organization
+
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autoflush=False, future=True)()
+    session.add(Organization(id="org_bench", name="Bench", status="active"))
+    session.add(DataSource(id="ds_bench", organization_id="org_bench", name="Bench", mysql_uri="mysql+pymysql://x"))
+    session.flush()
+    return session
+
+
+def _synthetic_allowlist_request(scale: Scale):
+    from backend.models import AllowlistRequest, AllowlistTablePayload
+
+    return AllowlistRequest(
+        organization_id="org_bench",
+        data_source_id="ds_bench",
+        tables=[
+            AllowlistTablePayload(database_name=fq.split(".", 1)[0], table_name=fq.split(".", 1)[1], approved_columns=sorted(cols))
+            for fq, cols in _synthetic_allowlist(scale).items()
+        ],
+    )
+
+
+@benchmark("get_role_scoped_allowlist")
+def _bench_role_scoped_allowlist(scale: Scale):
+    from backend.db.allowlist import get_role_scoped_allowlist
+    from backend.models import AllowlistColumn, AllowlistTable
+
+    session = _bench_session()
+    for fq, cols in _synthetic_allowlist(scale).items():
+        db_name, table_name = fq.split(".", 1)
+        table = AllowlistTable(
+            data_source_id="ds_bench",
+            database_name=db_name,
+            table_name=table_name,
+            approved=True,
+            allowed_roles=["admin", "finance", "sales"],
+        )
+        session.add(table)
+        session.flush()
+        session.add_all(
+            AllowlistColumn(
+                allowlist_table_id=table.id,
+                column_name=c,
+                approved=True,
+                allowed_roles=["admin", "finance"] if c == "revenue" else ["admin", "finance", "sales"],
+            )
+            for c in cols
+        )
+    session.commit()
+
+    def run() -> None:
+        get_role_scoped_allowlist(session, "ds_bench", role="sales")
+        session.expire_all()
+
+    return run
+
+
+@benchmark("set_allowlist")
+def _bench_set_allowlist(scale: Scale):
+    from backend.db.allowlist import set_allowlist
+
+    session = _bench_session()
+    request = _synthetic_allowlist_request(scale)
+
+    def run() -> None:
+        set_allowlist(session, request)
+        session.commit()
+
+    return run
+
+
+@benchmark("build_semantic_model")
+def _bench_build_semantic_model(scale: Scale):
+    from backend.db.allowlist import set_allowlist
+    from backend.semantic.service import SemanticService
+
+    session = _bench_session()
+    request = _synthetic_allowlist_request(scale)
+    set_allowlist(session, request)
+    session.commit()
+    allowlist = {f"{t.database_name}.{t.table_name}": set(t.approved_columns) for t in request.tables}
+    schema = {
+        "databases": [
+            {
+                "database_name": "analytics",
+                "tables": [
+                    {
+                        "table_name": t.table_name,
+                        "columns": [
+                            {"name": c, "type": "DATE" if c == "order_date" else "DECIMAL" if c == "revenue" else "VARCHAR"}
+                            for c in t.approved_columns
+                        ],
+                    }
+                    for t in request.tables
+                ],
+            }
+        ]
+    }
+    service = SemanticService()
+
+    def run() -> None:
+        service.build_semantic_model(session, "org_bench", "ds_bench", schema, allowlist)
+        session.commit()
+        session.expire_all()
+
+    return run
+
+
+def run_benchmark(name: str, scale: Scale, rounds: int, min_time: float) -> Dict[str, float]:
+    fn = BENCHMARKS[name](scale)
+    fn()
+    extra = getattr(fn, "stats", {})
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < rounds or (time.perf_counter() - started) < min_time:
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        if len(samples) >= rounds * 20:
+            break
+    return {
+        "rounds": len(samples),
+        "min_ms": round(min(samples) * 1000.0, 4),
+        "median_ms": round(statistics.median(samples) * 1000.0, 4),
+        "mean_ms": round(statistics.fmean(samples) * 1000.0, 4),
+        "stdev_ms": round(statistics.pstdev(samples) * 1000.0, 4),
+        **extra,
+    }
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the hot pure-Python kernels.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Input size multiplier (1.0 = production-like sizes).")
+    parser.add_argument("--rounds", type=int, default=5, help="Minimum timed rounds per benchmark.")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Minimum seconds spent per benchmark.")
+    parser.add_argument("-k", "--filter", default="", help="Only run benchmarks whose name contains this text.")
+    parser.add_argument("--save", help="Write results to this JSON path (e.g. the stored baseline).")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="Baseline JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative slowdown flagged as a regression.")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    args = parse_args(argv)
+    scale = Scale.scaled(args.scale)
+    results: Dict[str, Dict[str, float]] = {}
+    for name in BENCHMARKS:
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = run_benchmark(name, scale, args.rounds, args.min_time)
+        stats = results[name]
+        extra = "".join(f" {key}={value}" for key, value in stats.items() if key not in {"rounds", "min_ms", "median_ms", "mean_ms", "stdev_ms"})
+        print(f"{name:<32} median={stats['median_ms']:>12.4f}ms min={stats['min_ms']:>12.4f}ms rounds={stats['rounds']}{extra}")
+
+    report = {"git_revision": git_revision(), "scale": vars(scale), "benchmarks": results}
+    if args.save:
+        write_json(args.save, report)
+
+    if args.compare:
+        baseline = load_json(args.compare)
+        if baseline.get("scale") != report["scale"]:
+            print(f"warning: baseline scale {baseline.get('scale')} differs from current {report['scale']}")
+        rows = compare_metrics(baseline["benchmarks"], results, keys=("median_ms",), threshold=args.threshold)
+        print(format_comparison(rows))
+        if any(r["regression"] for r in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+import math
+import subprocess
+from typing import Any, Dict, List, Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_summary(samples_s: Sequence[float], wall_time_s: float, errors: int = 0) -> Dict[str, Any]:
+    ms = [s * 1000.0 for s in samples_s]
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "throughput_rps": round(len(ms) / wall_time_s, 3) if wall_time_s > 0 else 0.0,
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def write_json(path: str, payload: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def load_json(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def compare_metrics(
+    baseline: Dict[str, Dict[str, float]],
+    current: Dict[str, Dict[str, float]],
+    keys: Sequence[str],
+    threshold: float,
+    higher_is_better: Sequence[str] = (),
+) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for name in sorted(set(baseline) & set(current)):
+        for key in keys:
+            before = baseline[name].get(key)
+            after = current[name].get(key)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            worse = -change if key in higher_is_better else change
+            rows.append(
+                {
+                    "name": name,
+                    "metric": key,
+                    "baseline": before,
+                    "current": after,
+                    "change_pct": round(change * 100.0, 2),
+                    "regression": worse > threshold,
+                }
+            )
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]]) -> str:
+    lines = []
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        lines.append(
+            f"{row['name']:<40} {row['metric']:<16} {row['baseline']:>12.3f} -> {row['current']:>12.3f} "
+            f"({row['change_pct']:+.1f}%) {flag}"
+        )
+    return "\n".join(lines)
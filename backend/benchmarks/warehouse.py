@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import os
+import random
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+
+COLUMN_KINDS = ("measure", "dimension", "time")
+
+
+@dataclass
+class WarehouseConfig:
+    database_name: str = "analytics"
+    table_count: int = 20
+    columns_per_table: int = 12
+    rows_per_table: int = 200
+    seed: int = 11
+
+
+# SQLite-backed stand-in for a tenant MySQL warehouse. Tables live in an attached database named
+# after `database_name` so generated `db`.`table` references resolve, and DATE_FORMAT is registered
+# on every connection so trend queries execute unchanged.
+class SyntheticWarehouse:
+    def __init__(self, directory: str, config: WarehouseConfig | None = None) -> None:
+        self.config = config or WarehouseConfig()
+        self.directory = directory
+        self.main_path = os.path.join(directory, "warehouse_main.db")
+        self.data_path = os.path.join(directory, f"warehouse_{self.config.database_name}.db")
+        self.tables: Dict[str, List[Dict[str, str]]] = {}
+
+    @property
+    def uri(self) -> str:
+        return f"sqlite:///{self.main_path}"
+
+    def build(self) -> "SyntheticWarehouse":
+        rng = random.Random(self.config.seed)
+        conn = sqlite3.connect(self.data_path)
+        try:
+            for t in range(self.config.table_count):
+                table_name = f"fact_{t:04d}"
+                columns = self._column_specs(t)
+                self.tables[table_name] = columns
+                ddl = ", ".join(f"`{c['name']}` {c['type']}" for c in columns)
+                conn.execute(f"DROP TABLE IF EXISTS `{table_name}`")
+                conn.execute(f"CREATE TABLE `{table_name}` (`id` INTEGER PRIMARY KEY, {ddl})")
+                placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+                conn.executemany(
+                    f"INSERT INTO `{table_name}` VALUES ({placeholders})",
+                    (
+                        [i] + [self._value(c, i, rng) for c in columns]
+                        for i in range(self.config.rows_per_table)
+                    ),
+                )
+            conn.commit()
+        finally:
+            conn.close()
+        sqlite3.connect(self.main_path).close()
+        return self
+
+    def create_engine(self) -> Engine:
+        engine = create_engine(self.uri, future=True)
+        data_path = self.data_path
+        database_name = self.config.database_name
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record) -> None:
+            dbapi_connection.execute(f"ATTACH DATABASE '{data_path}' AS `{database_name}`")
+            dbapi_connection.create_function("DATE_FORMAT", 2, _date_format, deterministic=True)
+
+        return engine
+
+    def allowlist_payload(self, organization_id: str, data_source_id: str) -> Dict[str, Any]:
+        return {
+            "organization_id": organization_id,
+            "data_source_id": data_source_id,
+            "tables": [
+                {
+                    "database_name": self.config.database_name,
+                    "table_name": table_name,
+                    "approved_columns": ["id"] + [c["name"] for c in columns],
+                }
+                for table_name, columns in sorted(self.tables.items())
+            ],
+        }
+
+    def _column_specs(self, table_index: int) -> List[Dict[str, str]]:
+        columns = [{"name": "order_date", "type": "DATE", "kind": "time"}]
+        for c in range(1, self.config.columns_per_table):
+            kind = COLUMN_KINDS[(table_index + c) % len(COLUMN_KINDS)]
+            if kind == "measure":
+                columns.append({"name": f"revenue_{c:03d}", "type": "DECIMAL(14,2)", "kind": kind})
+            elif kind == "dimension":
+                columns.append({"name": f"region_{c:03d}", "type": "VARCHAR(64)", "kind": kind})
+            else:
+                columns.append({"name": f"shipped_date_{c:03d}", "type": "DATE", "kind": kind})
+        return columns
+
+    def _value(self, column: Dict[str, str], row_index: int, rng: random.Random) -> Any:
+        if column["kind"] == "time":
+            return (date(2024, 1, 1) + timedelta(days=row_index % 540)).isoformat()
+        if column["kind"] == "measure":
+            return round(rng.uniform(10, 5000), 2)
+        return f"region_{rng.randint(0, 24)}"
+
+
+def _date_format(value: Any, fmt: str) -> str | None:
+    if value is None:
+        return None
+    text = str(value)
+    if fmt == "%Y-%m":
+        return text[:7]
+    if fmt == "%Y":
+        return text[:4]
+    return text[:10]
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+import requests
+
+from backend.config import settings
+from backend.observability.metrics import REGISTRY
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = REGISTRY.gauge(
+    "opencortex_circuit_breaker_state",
+    "Provider circuit breaker state (0=closed, 1=half_open, 2=open).",
+    ("endpoint",),
+)
+BREAKER_TRIPS = REGISTRY.counter(
+    "opencortex_circuit_breaker_trips_total",
+    "Times a provider circuit breaker opened.",
+    ("endpoint",),
+)
+BREAKER_SHORT_CIRCUITS = REGISTRY.counter(
+    "opencortex_circuit_breaker_short_circuits_total",
+    "Provider calls skipped because the circuit was open.",
+    ("endpoint",),
+)
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        endpoint: str,
+        failure_threshold: int = 5,
+        reset_timeout_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.endpoint = endpoint
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_seconds = reset_timeout_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._trips = 0
+        self._short_circuits = 0
+        self._last_error: str | None = None
+        BREAKER_STATE.set(_STATE_VALUES[CLOSED], endpoint=endpoint)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            self._short_circuits += 1
+        BREAKER_SHORT_CIRCUITS.inc(endpoint=self.endpoint)
+        return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._half_open_in_flight = 0
+            self._set_state(CLOSED)
+
+    def record_failure(self, error: BaseException | None = None) -> None:
+        with self._lock:
+            self._last_error = repr(error) if error is not None else None
+            state = self._current_state()
+            self._consecutive_failures += 1
+            if state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._half_open_in_flight = 0
+                self._opened_at = self._clock()
+                if state != OPEN:
+                    self._trips += 1
+                    BREAKER_TRIPS.inc(endpoint=self.endpoint)
+                self._set_state(OPEN)
+
+    def call(self, fn: Callable[[], Any], capped_timeout: bool = False) -> Any:
+        # capped_timeout: fn ran with less than the endpoint's full timeout because the caller's deadline
+        # was shorter. Running out of that budget says nothing about the provider, so it is not counted.
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit open for {self.endpoint}")
+        try:
+            result = fn()
+        except BaseException as exc:
+            if capped_timeout and isinstance(exc, requests.Timeout):
+                self.record_inconclusive()
+            elif is_provider_failure(exc):
+                self.record_failure(exc)
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def record_inconclusive(self) -> None:
+        # Neither a success nor a failure: only frees a half-open probe slot for another trial call.
+        with self._lock:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == OPEN:
+                retry_in = round(max(0.0, self._opened_at + self.reset_timeout_seconds - self._clock()), 3)
+            return {
+                "endpoint": self.endpoint,
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "trips": self._trips,
+                "short_circuits": self._short_circuits,
+                "retry_in_seconds": retry_in,
+                "last_error": self._last_error,
+            }
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout_seconds:
+            self._half_open_in_flight = 0
+            self._set_state(HALF_OPEN)
+        return self._state
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            self._state = state
+            BREAKER_STATE.set(_STATE_VALUES[state], endpoint=self.endpoint)
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    # Client errors mean the provider answered; only outages, timeouts, throttling and 5xx count.
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        return status >= 500 or status == 429
+    return not isinstance(exc, (KeyboardInterrupt, SystemExit))
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get(endpoint)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                endpoint,
+                failure_threshold=settings.circuit_breaker_failure_threshold,
+                reset_timeout_seconds=settings.circuit_breaker_reset_seconds,
+                half_open_max_calls=settings.circuit_breaker_half_open_calls,
+            )
+            _BREAKERS[endpoint] = breaker
+        return breaker
+
+
+def breaker_snapshots() -> List[Dict[str, Any]]:
+    with _BREAKERS_LOCK:
+        breakers = list(_BREAKERS.values())
+    return [b.snapshot() for b in breakers]
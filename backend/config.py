@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
+from typing import Dict
 
 
 @dataclass(frozen=True)
@@ -11,16 +12,82 @@ class Settings:
     app_port: int = int(os.getenv("APP_PORT", "8000"))
 
     metadata_db_url: str = os.getenv("METADATA_DB_URL", "sqlite:///./metadata.db")
+    metadata_read_db_url: str = os.getenv("METADATA_READ_DB_URL", "")
+    metadata_db_pool_size: int = int(os.getenv("METADATA_DB_POOL_SIZE", "10"))
+    metadata_db_max_overflow: int = int(os.getenv("METADATA_DB_MAX_OVERFLOW", "20"))
+    metadata_db_pool_timeout_seconds: float = float(os.getenv("METADATA_DB_POOL_TIMEOUT_SECONDS", "30"))
+    metadata_db_pool_recycle_seconds: int = int(os.getenv("METADATA_DB_POOL_RECYCLE_SECONDS", "1800"))
+    metadata_bulk_chunk_rows: int = int(os.getenv("METADATA_BULK_CHUNK_ROWS", "2000"))
+    sqlite_journal_mode: str = os.getenv("SQLITE_JOURNAL_MODE", "wal")
+    sqlite_synchronous: str = os.getenv("SQLITE_SYNCHRONOUS", "normal")
+    sqlite_mmap_size_mb: int = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+    sqlite_busy_timeout_ms: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
 
     llm_api_base: str = os.getenv("LLM_API_BASE", "")
     llm_api_key: str = os.getenv("LLM_API_KEY", "")
     llm_model: str = os.getenv("LLM_MODEL", "gpt-4o-mini")
 
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+    embedding_dimensions: int = int(os.getenv("EMBEDDING_DIMENSIONS", "256"))
+
+    lexical_confidence_threshold: float = float(os.getenv("LEXICAL_CONFIDENCE_THRESHOLD", "0.8"))
 
     vector_provider: str = os.getenv("VECTOR_PROVIDER", "memory")
+    vector_collection_layout: str = os.getenv("VECTOR_COLLECTION_LAYOUT", "per_data_source")
+    vector_collection_shards: int = int(os.getenv("VECTOR_COLLECTION_SHARDS", "16"))
+    vector_encoding: str = os.getenv("VECTOR_ENCODING", "float32")
+    vector_rerank_factor: int = int(os.getenv("VECTOR_RERANK_FACTOR", "4"))
+    vector_pq_subspaces: int = int(os.getenv("VECTOR_PQ_SUBSPACES", "16"))
+    vector_memory_budget_mb: float = float(os.getenv("VECTOR_MEMORY_BUDGET_MB", "0"))
+    vector_organization_memory_quota_mb: float = float(os.getenv("VECTOR_ORGANIZATION_MEMORY_QUOTA_MB", "0"))
+    vector_organization_memory_quotas_mb: str = os.getenv("VECTOR_ORGANIZATION_MEMORY_QUOTAS_MB", "")
+    vector_spill_dir: str = os.getenv("VECTOR_SPILL_DIR", "")
     qdrant_url: str = os.getenv("QDRANT_URL", "")
     qdrant_api_key: str = os.getenv("QDRANT_API_KEY", "")
+    qdrant_upsert_batch_size: int = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+    qdrant_upsert_parallelism: int = int(os.getenv("QDRANT_UPSERT_PARALLELISM", "4"))
+    qdrant_slim_payloads: bool = os.getenv("QDRANT_SLIM_PAYLOADS", "false").lower() in {"1", "true", "yes"}
+
+    pipeline_stage_workers: int = int(os.getenv("PIPELINE_STAGE_WORKERS", "32"))
+
+    warehouse_max_concurrency: int = int(os.getenv("WAREHOUSE_MAX_CONCURRENCY", "64"))
+    warehouse_organization_concurrency: int = int(os.getenv("WAREHOUSE_ORGANIZATION_CONCURRENCY", "8"))
+    warehouse_data_source_concurrency: int = int(os.getenv("WAREHOUSE_DATA_SOURCE_CONCURRENCY", "4"))
+    warehouse_queue_timeout_ms: int = int(os.getenv("WAREHOUSE_QUEUE_TIMEOUT_MS", "2000"))
+    warehouse_organization_weights: str = os.getenv("WAREHOUSE_ORGANIZATION_WEIGHTS", "")
+
+    response_compression_encodings: str = os.getenv("RESPONSE_COMPRESSION_ENCODINGS", "zstd,br,gzip")
+    response_compression_min_bytes: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024"))
+    response_compression_gzip_level: int = int(os.getenv("RESPONSE_COMPRESSION_GZIP_LEVEL", "6"))
+    response_compression_brotli_quality: int = int(os.getenv("RESPONSE_COMPRESSION_BROTLI_QUALITY", "4"))
+    response_compression_zstd_level: int = int(os.getenv("RESPONSE_COMPRESSION_ZSTD_LEVEL", "3"))
+    response_etags: bool = os.getenv("RESPONSE_ETAGS", "true").lower() in {"1", "true", "yes"}
+
+    request_timeout_ms: int = int(os.getenv("REQUEST_TIMEOUT_MS", "30000"))
+    request_timeout_max_ms: int = int(os.getenv("REQUEST_TIMEOUT_MAX_MS", "120000"))
+    organization_request_timeouts_ms: str = os.getenv("ORGANIZATION_REQUEST_TIMEOUTS_MS", "")
+
+    circuit_breaker_failure_threshold: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", "5"))
+    circuit_breaker_reset_seconds: float = float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", "30"))
+    circuit_breaker_half_open_calls: int = int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", "1"))
+
+    embedding_hedging: bool = os.getenv("EMBEDDING_HEDGING", "false").lower() in {"1", "true", "yes"}
+    embedding_hedge_percentile: float = float(os.getenv("EMBEDDING_HEDGE_PERCENTILE", "95"))
+    embedding_hedge_initial_delay_ms: int = int(os.getenv("EMBEDDING_HEDGE_INITIAL_DELAY_MS", "250"))
+    embedding_hedge_min_delay_ms: int = int(os.getenv("EMBEDDING_HEDGE_MIN_DELAY_MS", "10"))
+    embedding_hedge_max_extra_load: float = float(os.getenv("EMBEDDING_HEDGE_MAX_EXTRA_LOAD", "0.1"))
+    embedding_hedge_workers: int = int(os.getenv("EMBEDDING_HEDGE_WORKERS", "16"))
+
+
+def parse_mapping(raw: str) -> Dict[str, str]:
+    # "key:value,key2:value2" settings, e.g. per-organization overrides.
+    mapping: Dict[str, str] = {}
+    for item in raw.split(","):
+        if ":" not in item:
+            continue
+        key, value = item.rsplit(":", 1)
+        mapping[key.strip()] = value.strip()
+    return mapping
 
 
 settings = Settings()
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Deque, Dict, Iterator
+
+from backend.config import parse_mapping, settings
+from backend.deadline import DeadlineExceeded
+from backend.observability.metrics import REGISTRY
+
+
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge(
+    "opencortex_warehouse_admission_queue_depth",
+    "Warehouse queries waiting for an admission slot.",
+    ("organization_id",),
+)
+ADMISSION_IN_FLIGHT = REGISTRY.gauge(
+    "opencortex_warehouse_admission_in_flight",
+    "Warehouse queries currently admitted.",
+    ("organization_id", "data_source_id"),
+)
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "opencortex_warehouse_admission_wait_seconds",
+    "Time warehouse queries spent queued before admission.",
+    ("organization_id", "data_source_id"),
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "opencortex_warehouse_admission_rejected_total",
+    "Warehouse queries rejected after exceeding the admission queue deadline.",
+    ("organization_id", "data_source_id"),
+)
+
+
+class AdmissionRejected(RuntimeError):
+    def __init__(self, message: str, retry_after_seconds: float) -> None:
+        super().__init__(message)
+        self.retry_after_seconds = retry_after_seconds
+
+
+class _Waiter:
+    __slots__ = ("organization_id", "data_source_id", "granted", "event")
+
+    def __init__(self, organization_id: str, data_source_id: str) -> None:
+        self.organization_id = organization_id
+        self.data_source_id = data_source_id
+        self.granted = False
+        self.event = threading.Event()
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        global_limit: int = 64,
+        per_organization_limit: int = 8,
+        per_data_source_limit: int = 4,
+        queue_timeout_seconds: float = 2.0,
+        organization_weights: Dict[str, int] | None = None,
+    ) -> None:
+        self.global_limit = global_limit
+        self.per_organization_limit = per_organization_limit
+        self.per_data_source_limit = per_data_source_limit
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.organization_weights = organization_weights or {}
+
+        self._lock = threading.Lock()
+        self._active_total = 0
+        self._active_by_org: Dict[str, int] = defaultdict(int)
+        self._active_by_ds: Dict[str, int] = defaultdict(int)
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._rotation: Deque[str] = deque()
+        self._credits: Dict[str, int] = {}
+
+    @classmethod
+    def from_settings(cls) -> "AdmissionController":
+        return cls(
+            global_limit=settings.warehouse_max_concurrency,
+            per_organization_limit=settings.warehouse_organization_concurrency,
+            per_data_source_limit=settings.warehouse_data_source_concurrency,
+            queue_timeout_seconds=settings.warehouse_queue_timeout_ms / 1000.0,
+            organization_weights=_parse_weights(settings.warehouse_organization_weights),
+        )
+
+    @contextmanager
+    def admit(self, organization_id: str, data_source_id: str, timeout: float | None = None) -> Iterator[None]:
+        self.acquire(organization_id, data_source_id, timeout=timeout)
+        try:
+            yield
+        finally:
+            self.release(organization_id, data_source_id)
+
+    def acquire(self, organization_id: str, data_source_id: str, timeout: float | None = None) -> None:
+        # `timeout` is the caller's remaining request budget; when it, not the queue timeout, ends the wait
+        # the request ran out of time and is not told to retry.
+        deadline_bound = timeout is not None and timeout < self.queue_timeout_seconds
+        timeout = self.queue_timeout_seconds if timeout is None else min(timeout, self.queue_timeout_seconds)
+        started = perf_counter()
+        waiter = _Waiter(organization_id, data_source_id)
+        with self._lock:
+            if not self._queues and self._has_capacity(organization_id, data_source_id):
+                self._grant(waiter)
+            else:
+                self._enqueue(waiter)
+                self._dispatch()
+
+        if not waiter.granted:
+            waiter.event.wait(max(0.0, timeout))
+            with self._lock:
+                if not waiter.granted:
+                    self._remove(waiter)
+                    if deadline_bound:
+                        raise DeadlineExceeded(f"Request deadline exceeded while queued for data source {data_source_id}")
+                    ADMISSION_REJECTED.inc(organization_id=organization_id, data_source_id=data_source_id)
+                    raise AdmissionRejected(
+                        f"Data source {data_source_id} is busy; try again shortly",
+                        retry_after_seconds=max(1.0, self.queue_timeout_seconds),
+                    )
+
+        ADMISSION_WAIT_SECONDS.observe(perf_counter() - started, organization_id=organization_id, data_source_id=data_source_id)
+
+    def release(self, organization_id: str, data_source_id: str) -> None:
+        with self._lock:
+            self._active_total -= 1
+            self._active_by_org[organization_id] -= 1
+            self._active_by_ds[data_source_id] -= 1
+            ADMISSION_IN_FLIGHT.dec(organization_id=organization_id, data_source_id=data_source_id)
+            self._dispatch()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "active_total": self._active_total,
+                "active_by_organization": {k: v for k, v in self._active_by_org.items() if v},
+                "active_by_data_source": {k: v for k, v in self._active_by_ds.items() if v},
+                "queued_by_organization": {k: len(q) for k, q in self._queues.items()},
+            }
+
+    def _has_capacity(self, organization_id: str, data_source_id: str) -> bool:
+        return (
+            self._active_total < self.global_limit
+            and self._active_by_org[organization_id] < self.per_organization_limit
+            and self._active_by_ds[data_source_id] < self.per_data_source_limit
+        )
+
+    def _grant(self, waiter: _Waiter) -> None:
+        self._active_total += 1
+        self._active_by_org[waiter.organization_id] += 1
+        self._active_by_ds[waiter.data_source_id] += 1
+        ADMISSION_IN_FLIGHT.inc(organization_id=waiter.organization_id, data_source_id=waiter.data_source_id)
+        waiter.granted = True
+        waiter.event.set()
+
+    def _enqueue(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.organization_id)
+        if queue is None:
+            queue = self._queues[waiter.organization_id] = deque()
+            self._rotation.append(waiter.organization_id)
+            self._credits[waiter.organization_id] = self._weight(waiter.organization_id)
+        queue.append(waiter)
+        ADMISSION_QUEUE_DEPTH.set(len(queue), organization_id=waiter.organization_id)
+
+    def _remove(self, waiter: _Waiter) -> None:
+        queue = self._queues.get(waiter.organization_id)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        ADMISSION_QUEUE_DEPTH.set(len(queue), organization_id=waiter.organization_id)
+        if not queue:
+            self._drop_organization(waiter.organization_id)
+
+    def _drop_organization(self, organization_id: str) -> None:
+        self._queues.pop(organization_id, None)
+        self._credits.pop(organization_id, None)
+        try:
+            self._rotation.remove(organization_id)
+        except ValueError:
+            pass
+
+    def _dispatch(self) -> None:
+        # Weighted round-robin over organizations with queued work: each organization may take up to
+        # `weight` consecutive slots before the turn passes, and within an organization the oldest waiter
+        # whose data source still has capacity goes first.
+        idle_turns = 0
+        while self._rotation and idle_turns < len(self._rotation) and self._active_total < self.global_limit:
+            organization_id = self._rotation[0]
+            queue = self._queues[organization_id]
+            waiter = self._next_runnable(queue)
+            if waiter is None:
+                idle_turns += 1
+                self._credits[organization_id] = self._weight(organization_id)
+                self._rotation.rotate(-1)
+                continue
+
+            idle_turns = 0
+            queue.remove(waiter)
+            self._grant(waiter)
+            ADMISSION_QUEUE_DEPTH.set(len(queue), organization_id=organization_id)
+            self._credits[organization_id] -= 1
+            if not queue:
+                self._drop_organization(organization_id)
+            elif self._credits[organization_id] <= 0:
+                self._credits[organization_id] = self._weight(organization_id)
+                self._rotation.rotate(-1)
+
+    def _next_runnable(self, queue: Deque[_Waiter]) -> _Waiter | None:
+        for waiter in queue:
+            if self._has_capacity(waiter.organization_id, waiter.data_source_id):
+                return waiter
+        return None
+
+    def _weight(self, organization_id: str) -> int:
+        return max(1, self.organization_weights.get(organization_id, 1))
+
+
+def _parse_weights(raw: str) -> Dict[str, int]:
+    weights: Dict[str, int] = {}
+    for organization_id, weight in parse_mapping(raw).items():
+        try:
+            weights[organization_id] = int(weight)
+        except ValueError:
+            continue
+    return weights
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 from datetime import datetime
 from typing import Any, Dict, Set
 
@@ -7,18 +8,22 @@ from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
 
 from backend.config import settings
+from backend.db.bulk import bulk_insert, chunked, supports_bulk_returning
 from backend.models import (
     AllowlistColumn,
     AllowlistRequest,
     AllowlistTable,
+    AllowlistTablePayload,
     DataSource,
     MetricDefinition,
     Organization,
     OrganizationRole,
     OrganizationUser,
     SemanticColumn,
+    SemanticSnapshot,
     VectorIndex,
 )
+from backend.semantic.snapshot import snapshot_cache
 
 DEFAULT_ROLES = ["admin", "executive", "senior_executive", "finance", "sales"]
 
@@ -113,30 +118,64 @@ def get_data_source(session: Session, data_source_id: str) -> DataSource | None:
 
 def set_allowlist(session: Session, request: AllowlistRequest) -> None:
     default_roles = list_active_role_keys(session, request.organization_id) or DEFAULT_ROLES
-    existing = session.scalars(select(AllowlistTable).where(AllowlistTable.data_source_id == request.data_source_id)).all()
-    for table in existing:
-        session.execute(delete(AllowlistColumn).where(AllowlistColumn.allowlist_table_id == table.id))
+    table_ids = select(AllowlistTable.id).where(AllowlistTable.data_source_id == request.data_source_id)
+    session.execute(delete(AllowlistColumn).where(AllowlistColumn.allowlist_table_id.in_(table_ids)))
     session.execute(delete(AllowlistTable).where(AllowlistTable.data_source_id == request.data_source_id))
 
-    for table_payload in request.tables:
-        table = AllowlistTable(
-            data_source_id=request.data_source_id,
-            database_name=table_payload.database_name,
-            table_name=table_payload.table_name,
-            approved=True,
-            allowed_roles=default_roles,
+    returning = supports_bulk_returning(session)
+    for tables in chunked(_merge_duplicate_tables(request.tables)):
+        rows = bulk_insert(
+            session,
+            AllowlistTable,
+            [
+                {
+                    "data_source_id": request.data_source_id,
+                    "database_name": t.database_name,
+                    "table_name": t.table_name,
+                    "approved": True,
+                    "allowed_roles": default_roles,
+                }
+                for t in tables
+            ],
+            returning=[AllowlistTable.id] if returning else (),
         )
-        session.add(table)
-        session.flush()
-        for column_name in table_payload.approved_columns:
-            session.add(
-                AllowlistColumn(
-                    allowlist_table_id=table.id,
-                    column_name=column_name,
-                    approved=True,
-                    allowed_roles=default_roles,
-                )
+        if returning:
+            ids = [row.id for row in rows]
+        else:
+            ids = _allowlist_table_ids(session, request.data_source_id, tables)
+        columns = (
+            {"allowlist_table_id": table_id, "column_name": column_name, "approved": True, "allowed_roles": default_roles}
+            for table_id, t in zip(ids, tables)
+            for column_name in dict.fromkeys(t.approved_columns)
+        )
+        for chunk in chunked(columns):
+            bulk_insert(session, AllowlistColumn, chunk)
+
+
+def _merge_duplicate_tables(tables: list[AllowlistTablePayload]) -> list[AllowlistTablePayload]:
+    # One row per (database, table): a table listed twice gets the union of its approved columns.
+    merged: Dict[tuple[str, str], AllowlistTablePayload] = {}
+    for t in tables:
+        key = (t.database_name, t.table_name)
+        if key in merged:
+            merged[key] = merged[key].model_copy(update={"approved_columns": merged[key].approved_columns + t.approved_columns})
+        else:
+            merged[key] = t
+    return list(merged.values())
+
+
+def _allowlist_table_ids(session: Session, data_source_id: str, tables: list) -> list[int]:
+    # Fallback for dialects without ordered RETURNING: look the new ids up by natural key.
+    ids = {
+        (row.database_name, row.table_name): row.id
+        for row in session.execute(
+            select(AllowlistTable.id, AllowlistTable.database_name, AllowlistTable.table_name).where(
+                AllowlistTable.data_source_id == data_source_id,
+                AllowlistTable.table_name.in_({t.table_name for t in tables}),
             )
+        )
+    }
+    return [ids[(t.database_name, t.table_name)] for t in tables]
 
 
 def get_allowlist(session: Session, data_source_id: str) -> Dict[str, Set[str]]:
@@ -164,6 +203,16 @@ def get_role_scoped_allowlist(session: Session, data_source_id: str, role: str)
     return output
 
 
+def allowlist_version(allowlist: Dict[str, Set[str]]) -> str:
+    digest = hashlib.sha1()
+    for fully_qualified_table in sorted(allowlist):
+        digest.update(fully_qualified_table.encode("utf-8"))
+        for column in sorted(allowlist[fully_qualified_table]):
+            digest.update(b"\0" + column.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
 def allowlist_to_json(allowlist: Dict[str, Set[str]]) -> Dict[str, Any]:
     tables = []
     for fully_qualified_table, cols in sorted(allowlist.items()):
@@ -243,7 +292,13 @@ def apply_column_visibility_override(
         col.allowed_roles = allowed_roles
 
 
-def register_vector_index(session: Session, organization_id: str, data_source_id: str, collection_name: str) -> VectorIndex:
+def register_vector_index(
+    session: Session,
+    organization_id: str,
+    data_source_id: str,
+    collection_name: str,
+    layout: str = "per_data_source",
+) -> VectorIndex:
     record = session.scalars(
         select(VectorIndex).where(
             VectorIndex.organization_id == organization_id,
@@ -255,12 +310,14 @@ def register_vector_index(session: Session, organization_id: str, data_source_id
     if record:
         record.last_indexed_at = datetime.utcnow()
         record.provider = settings.vector_provider
+        record.layout = layout
         return record
 
     record = VectorIndex(
         organization_id=organization_id,
         data_source_id=data_source_id,
         collection_name=collection_name,
+        layout=layout,
         provider=settings.vector_provider,
         last_indexed_at=datetime.utcnow(),
     )
@@ -268,6 +325,14 @@ def register_vector_index(session: Session, organization_id: str, data_source_id
     return record
 
 
+def get_vector_index(session: Session, organization_id: str, data_source_id: str) -> VectorIndex | None:
+    return session.scalars(
+        select(VectorIndex)
+        .where(VectorIndex.organization_id == organization_id, VectorIndex.data_source_id == data_source_id)
+        .order_by(VectorIndex.last_indexed_at.desc(), VectorIndex.id.desc())
+    ).first()
+
+
 def list_vector_indexes(session: Session, organization_id: str, data_source_id: str | None = None) -> list[VectorIndex]:
     stmt = select(VectorIndex).where(VectorIndex.organization_id == organization_id)
     if data_source_id:
@@ -307,3 +372,10 @@ def delete_semantic_for_datasource(session: Session, organization_id: str, data_
             MetricDefinition.data_source_id == data_source_id,
         )
     )
+    session.execute(
+        delete(SemanticSnapshot).where(
+            SemanticSnapshot.organization_id == organization_id,
+            SemanticSnapshot.data_source_id == data_source_id,
+        )
+    )
+    snapshot_cache.invalidate(organization_id, data_source_id)
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Sequence
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.orm import Session
+
+from backend.config import settings
+
+
+def chunked(rows: Iterable[Any], size: int | None = None) -> Iterator[List[Any]]:
+    size = max(1, size or settings.metadata_bulk_chunk_rows)
+    it = iter(rows)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def supports_bulk_returning(session: Session) -> bool:
+    # RETURNING rows must come back in parameter order to be matched to their inputs; SQLite >= 3.35,
+    # PostgreSQL and MariaDB qualify, MySQL does not.
+    dialect = session.get_bind().dialect
+    return bool(getattr(dialect, "insert_executemany_returning_sort_by_parameter_order", False))
+
+
+def bulk_insert(session: Session, model: type, rows: Sequence[dict[str, Any]], returning: Sequence[Any] = ()) -> List[Any]:
+    # Core executemany against the mapped table (batched by SQLAlchemy's insertmanyvalues), skipping ORM
+    # unit-of-work and bulk-persistence bookkeeping; rows are keyed by column name, not attribute name.
+    # Callers pass chunks, so parameter lists and returned rows stay bounded.
+    if not rows:
+        return []
+    stmt = insert(model.__table__)
+    if returning:
+        stmt = stmt.returning(*returning, sort_by_parameter_order=True)
+        return list(session.execute(stmt, list(rows)).all())
+    session.execute(stmt, list(rows))
+    return []
+
+
+def bulk_update(session: Session, model: type, rows: Sequence[dict[str, Any]], key: str = "id") -> None:
+    # One executemany UPDATE ... WHERE <key> = ? per chunk; every row must set the same columns.
+    if not rows:
+        return
+    table = model.__table__
+    columns = [c for c in rows[0] if c != key]
+    stmt = (
+        update(table)
+        .where(table.c[key] == bindparam(f"_b_{key}"))
+        .values({c: bindparam(f"_b_{c}") for c in columns})
+    )
+    for chunk in chunked(rows):
+        session.execute(stmt, [{f"_b_{k}": v for k, v in row.items()} for row in chunk])
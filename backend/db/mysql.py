@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Sequence, Tuple
 
 from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.engine import Engine
@@ -9,6 +10,41 @@ from sqlalchemy.engine import Engine
 _ENGINE_CACHE: dict[str, Engine] = {}
 
 
+@dataclass
+class QueryResult:
+    # Column names plus the cursor's row tuples, as fetched; encodings are built from these on demand and
+    # memoized, since coalesced requests share one result.
+    columns: Tuple[str, ...]
+    records: Sequence[Sequence[Any]]
+    encoded: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    def row_keys(self) -> Tuple[str, ...]:
+        # Row dicts cannot repeat a key, so a repeated column name gets a positional suffix (x, x_2, ...)
+        # instead of overwriting the earlier value. Columnar and Arrow encodings keep the names as returned.
+        keys: List[str] = []
+        used: set[str] = set()
+        for name in self.columns:
+            key, n = name, 1
+            while key in used:
+                n += 1
+                key = f"{name}_{n}"
+            used.add(key)
+            keys.append(key)
+        return tuple(keys)
+
+    def as_rows(self, columns: Sequence[str] | None = None) -> List[Dict[str, Any]]:
+        keys = self.row_keys()
+        if columns is None:
+            return [dict(zip(keys, record)) for record in self.records]
+        positions = [(name, keys.index(name)) for name in columns if name in keys]
+        return [{name: record[i] for name, i in positions} for record in self.records]
+
+    def column_values(self) -> List[List[Any]]:
+        if not self.records:
+            return [[] for _ in self.columns]
+        return [list(values) for values in zip(*self.records)]
+
+
 def get_mysql_engine(data_source_id: str, mysql_uri: str) -> Engine:
     engine = _ENGINE_CACHE.get(data_source_id)
     if engine is None:
@@ -68,7 +104,60 @@ def introspect_schema(engine: Engine) -> Dict[str, Any]:
     return result
 
 
-def execute_readonly_query(engine: Engine, sql: str) -> List[Dict[str, Any]]:
+def execute_readonly_query(engine: Engine, sql: str, timeout_seconds: float | None = None) -> List[Dict[str, Any]]:
+    return execute_readonly_result(engine, sql, timeout_seconds=timeout_seconds).as_rows()
+
+
+def execute_readonly_result(engine: Engine, sql: str, timeout_seconds: float | None = None) -> QueryResult:
+    if timeout_seconds is not None and engine.dialect.name == "mysql":
+        sql = with_max_execution_time(sql, timeout_seconds)
     with engine.connect() as conn:
-        rows = conn.execute(text(sql)).mappings().all()
-        return [dict(r) for r in rows]
+        result = conn.execute(text(sql))
+        return QueryResult(tuple(result.keys()), result.all())
+
+
+def with_max_execution_time(sql: str, timeout_seconds: float) -> str:
+    # MySQL aborts the statement server-side once the optimizer hint's budget (ms) is spent. The hint only
+    # takes effect on the top-level SELECT, which for WITH queries follows the (parenthesised) CTE list.
+    budget_ms = max(1, int(timeout_seconds * 1000))
+    stripped = sql.lstrip()
+    keyword = stripped[:6].lower()
+    if keyword == "select":
+        position = 0
+    elif stripped[:4].lower() == "with" and not _is_identifier_char(stripped[4:5]):
+        position = _top_level_select(stripped)
+        if position is None:
+            return sql
+    else:
+        return sql
+    return f"{stripped[:position]}SELECT /*+ MAX_EXECUTION_TIME({budget_ms}) */{stripped[position + 6:]}"
+
+
+def _top_level_select(sql: str) -> int | None:
+    depth, quote, i = 0, "", 0
+    while i < len(sql):
+        ch = sql[i]
+        if quote:
+            if ch == "\\" and quote != "`":
+                i += 1
+            elif ch == quote:
+                quote = ""
+        elif ch in "'\"`":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif (
+            depth == 0
+            and sql[i : i + 6].lower() == "select"
+            and not _is_identifier_char(sql[i - 1 : i])
+            and not _is_identifier_char(sql[i + 6 : i + 7])
+        ):
+            return i
+        i += 1
+    return None
+
+
+def _is_identifier_char(ch: str) -> bool:
+    return bool(ch) and (ch.isalnum() or ch in "_$")
@@ -2,19 +2,117 @@ from __future__ import annotations
 
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine
+from typing import Any
+
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from backend.config import settings
 from backend.models import Base
 
 
-metadata_engine = create_engine(settings.metadata_db_url, future=True)
+def create_metadata_engine(url: str) -> Engine:
+    db_url = make_url(url)
+    if db_url.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            future=True,
+            pool_size=settings.metadata_db_pool_size,
+            max_overflow=settings.metadata_db_max_overflow,
+            pool_timeout=settings.metadata_db_pool_timeout_seconds,
+            pool_recycle=settings.metadata_db_pool_recycle_seconds,
+            pool_pre_ping=True,
+        )
+
+    # Connections are shared across the API's worker threads; sqlite3's own busy handler replaces the
+    # default 5s timeout so writers queue for the lock instead of failing with "database is locked".
+    connect_args: dict[str, Any] = {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000.0}
+    in_memory = db_url.database in (None, "", ":memory:")
+    if in_memory:
+        engine = create_engine(url, future=True, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            url,
+            future=True,
+            connect_args=connect_args,
+            pool_size=settings.metadata_db_pool_size,
+            max_overflow=settings.metadata_db_max_overflow,
+            pool_timeout=settings.metadata_db_pool_timeout_seconds,
+        )
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection: Any, _record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            if not in_memory:
+                # WAL lets readers proceed while a writer commits; NORMAL only syncs at checkpoints, which is
+                # safe in WAL mode (a power loss can drop the last commits but never corrupts the file).
+                cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+                cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size_mb * 1024 * 1024}")
+            cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+            cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+metadata_engine = create_metadata_engine(settings.metadata_db_url)
+# Without METADATA_READ_DB_URL reads share the primary engine (and its pool) but still skip the commit.
+metadata_read_engine = (
+    create_metadata_engine(settings.metadata_read_db_url) if settings.metadata_read_db_url else metadata_engine
+)
 SessionLocal = sessionmaker(bind=metadata_engine, autoflush=False, autocommit=False, future=True)
+ReadSessionLocal = sessionmaker(bind=metadata_read_engine, autoflush=False, autocommit=False, future=True)
+
+
+class ReadOnlySessionError(RuntimeError):
+    pass
+
+
+@event.listens_for(ReadSessionLocal, "before_flush")
+def _reject_read_session_flush(session: Session, _context: Any, _instances: Any) -> None:
+    raise ReadOnlySessionError("Read-only metadata session cannot write; use db_session()")
+
+
+@event.listens_for(ReadSessionLocal, "do_orm_execute")
+def _reject_read_session_dml(state: Any) -> None:
+    if not state.is_select:
+        raise ReadOnlySessionError("Read-only metadata session cannot write; use db_session()")
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _mark_flushed(session: Session, _context: Any) -> None:
+    session.info["has_writes"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _mark_dml(state: Any) -> None:
+    if not state.is_select:
+        state.session.info["has_writes"] = True
+
+
+# Columns added after a table first shipped; create_all never alters existing tables.
+_ADDED_COLUMNS = {
+    "vector_indexes": {"layout": "VARCHAR(32) NOT NULL DEFAULT 'per_data_source'"},
+}
 
 
 def init_metadata_db() -> None:
     Base.metadata.create_all(bind=metadata_engine)
+    _add_missing_columns()
+
+
+def _add_missing_columns() -> None:
+    inspector = inspect(metadata_engine)
+    with metadata_engine.begin() as conn:
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
 
 
 @contextmanager
@@ -22,9 +120,21 @@ def db_session() -> Session:
     session = SessionLocal()
     try:
         yield session
-        session.commit()
+        # A transaction that never wrote has nothing to make durable; closing it rolls back for free.
+        if session.info.get("has_writes") or session.new or session.dirty or session.deleted:
+            session.commit()
     except Exception:
         session.rollback()
         raise
     finally:
         session.close()
+
+
+@contextmanager
+def db_read_session() -> Session:
+    # For paths that only read: bound to the read replica when configured, never flushes or commits.
+    session = ReadSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from time import monotonic
+from typing import Dict
+
+from backend.config import parse_mapping, settings
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    def __init__(self, timeout_seconds: float | None = None) -> None:
+        self.timeout_seconds = timeout_seconds
+        self.expires_at = None if timeout_seconds is None else monotonic() + timeout_seconds
+
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - monotonic())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0.0
+
+    def check(self, stage: str = "") -> None:
+        if self.expired():
+            where = f" before {stage}" if stage else ""
+            raise DeadlineExceeded(f"Request deadline of {self.timeout_seconds:.3f}s exceeded{where}")
+
+    def timeout(self, cap: float, stage: str = "") -> float:
+        self.check(stage)
+        remaining = self.remaining()
+        return cap if remaining is None else min(cap, remaining)
+
+
+NO_DEADLINE = Deadline(None)
+
+
+def resolve_request_timeout(organization_id: str, header_value: str | None) -> float:
+    max_seconds = settings.request_timeout_max_ms / 1000.0
+    if header_value:
+        try:
+            requested = float(header_value) / 1000.0
+        except ValueError:
+            raise ValueError("x-request-timeout-ms must be a number of milliseconds")
+        if requested <= 0:
+            raise ValueError("x-request-timeout-ms must be positive")
+        return min(requested, max_seconds)
+
+    org_default_ms = _parse_org_timeouts(settings.organization_request_timeouts_ms).get(organization_id)
+    return min((org_default_ms or settings.request_timeout_ms) / 1000.0, max_seconds)
+
+
+def _parse_org_timeouts(raw: str) -> Dict[str, float]:
+    timeouts: Dict[str, float] = {}
+    for organization_id, value in parse_mapping(raw).items():
+        try:
+            timeouts[organization_id] = float(value)
+        except ValueError:
+            continue
+    return timeouts
@@ -2,14 +2,24 @@ from __future__ import annotations
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.exc import IntegrityError
 
+from backend.api.compression import CompressionMiddleware, ETagMiddleware, build_codecs
 from backend.api.middleware import AuthContextMiddleware
+from backend.api.responses import FastJSONResponse
 from backend.api.routes_admin import router as admin_router
 from backend.api.routes_chat import router as chat_router
-from backend.db.session import init_metadata_db
+from backend.config import settings
+from backend.db.session import db_session, init_metadata_db
+from backend.observability.metrics import render_prometheus
+from backend.semantic.service import SemanticService
 
-app = FastAPI(title="Conversational BI Platform", version="0.1.0")
+app = FastAPI(title="Conversational BI Platform", version="0.1.0", default_response_class=FastJSONResponse)
 
+# Innermost: it only tags single-message bodies, and the auth middleware re-streams everything it wraps.
+if settings.response_etags:
+    app.add_middleware(ETagMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -18,11 +28,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(AuthContextMiddleware)
+# Outermost, so ETags are computed over the identity body and every response can be compressed.
+app.add_middleware(
+    CompressionMiddleware,
+    codecs=build_codecs(
+        [name.strip() for name in settings.response_compression_encodings.split(",") if name.strip()],
+        gzip_level=settings.response_compression_gzip_level,
+        brotli_quality=settings.response_compression_brotli_quality,
+        zstd_level=settings.response_compression_zstd_level,
+    ),
+    minimum_size=settings.response_compression_min_bytes,
+)
 
 
 @app.on_event("startup")
 def startup_event() -> None:
     init_metadata_db()
+    try:
+        with db_session() as session:
+            SemanticService().backfill_snapshots(session)
+    except IntegrityError:
+        # Another worker starting at the same time stored them first.
+        pass
 
 
 @app.get("/health")
@@ -30,5 +57,10 @@ def healthcheck():
     return {"status": "ok"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 app.include_router(admin_router)
 app.include_router(chat_router)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Literal, Optional, Union
 
 from pydantic import BaseModel, Field
 from sqlalchemy import Boolean, DateTime, ForeignKey, JSON, String, Text, UniqueConstraint
@@ -124,6 +124,19 @@ class MetricDefinition(Base):
     allowed_roles: Mapped[List[str]] = mapped_column(JSON, default=list)
 
 
+class SemanticSnapshot(Base):
+    __tablename__ = "semantic_snapshots"
+    __table_args__ = (UniqueConstraint("organization_id", "data_source_id", name="uq_semantic_snapshot"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    organization_id: Mapped[str] = mapped_column(String(64), index=True)
+    data_source_id: Mapped[str] = mapped_column(String(64), index=True)
+    version: Mapped[int] = mapped_column(default=1)
+    etag: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[str] = mapped_column(Text)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
 class VectorIndex(Base):
     __tablename__ = "vector_indexes"
     __table_args__ = (UniqueConstraint("organization_id", "data_source_id", "collection_name", name="uq_vector_index"),)
@@ -132,6 +145,7 @@ class VectorIndex(Base):
     organization_id: Mapped[str] = mapped_column(String(64), index=True)
     data_source_id: Mapped[str] = mapped_column(String(64), index=True)
     collection_name: Mapped[str] = mapped_column(String(255))
+    layout: Mapped[str] = mapped_column(String(32), default="per_data_source")
     provider: Mapped[str] = mapped_column(String(64), default="memory")
     last_indexed_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
@@ -228,6 +242,8 @@ class AskRequest(BaseModel):
     data_source_id: str
     question: str
     show_sql: bool = False
+    # "rows" (list of objects), "columnar" (names once, one array per column) or "arrow" (base64 IPC stream).
+    format: Literal["rows", "columnar", "arrow"] = "rows"
 
 
 class InsightResponse(BaseModel):
@@ -240,5 +256,6 @@ class InsightResponse(BaseModel):
 class AskResponse(BaseModel):
     question: str
     sql: Optional[str]
-    rows: List[Dict[str, Any]]
+    format: str = "rows"
+    rows: Union[List[Dict[str, Any]], Dict[str, Any]]
     insight: InsightResponse
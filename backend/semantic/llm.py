@@ -5,19 +5,30 @@ from typing import Any, Dict
 
 import requests
 
+from backend.circuit_breaker import get_breaker
 from backend.config import settings
 
 
+DEFAULT_TIMEOUT_SECONDS = 45.0
+
+
 class LLMClient:
     def is_configured(self) -> bool:
         return bool(settings.llm_api_base and settings.llm_api_key)
 
-    def complete_json(self, system_prompt: str, user_prompt: str) -> Dict[str, Any]:
+    def complete_json(self, system_prompt: str, user_prompt: str, timeout: float | None = None) -> Dict[str, Any]:
         if not self.is_configured():
             raise RuntimeError("LLM provider is not configured")
 
+        url = f"{settings.llm_api_base.rstrip('/')}/chat/completions"
+        capped = timeout is not None and timeout < DEFAULT_TIMEOUT_SECONDS
+        response = get_breaker(url).call(lambda: self._post(url, system_prompt, user_prompt, timeout), capped_timeout=capped)
+        content = response.json()["choices"][0]["message"]["content"]
+        return json.loads(content)
+
+    def _post(self, url: str, system_prompt: str, user_prompt: str, timeout: float | None) -> requests.Response:
         response = requests.post(
-            f"{settings.llm_api_base.rstrip('/')}/chat/completions",
+            url,
             headers={
                 "Authorization": f"Bearer {settings.llm_api_key}",
                 "Content-Type": "application/json",
@@ -31,8 +42,7 @@ class LLMClient:
                     {"role": "user", "content": user_prompt},
                 ],
             },
-            timeout=45,
+            timeout=DEFAULT_TIMEOUT_SECONDS if timeout is None else min(timeout, DEFAULT_TIMEOUT_SECONDS),
         )
         response.raise_for_status()
-        content = response.json()["choices"][0]["message"]["content"]
-        return json.loads(content)
+        return response
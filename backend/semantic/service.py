@@ -1,19 +1,24 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Any, Dict, List
 
-from sqlalchemy import delete, select
+from sqlalchemy import delete, select, tuple_
 from sqlalchemy.orm import Session
 
 from backend.db.allowlist import list_active_role_keys
+from backend.db.bulk import bulk_insert, bulk_update, chunked
 from backend.models import (
     AllowlistColumn,
     AllowlistTable,
+    DataSource,
     MetricDefinition,
     SemanticColumn,
+    SemanticSnapshot,
     SemanticVisibilityOverrideRequest,
 )
 from backend.semantic.llm import LLMClient
+from backend.semantic.snapshot import CachedSnapshot, publish_on_commit, snapshot_cache
 
 
 NUMERIC_HINTS = {"int", "decimal", "numeric", "float", "double", "bigint", "smallint"}
@@ -70,19 +75,6 @@ class SemanticService:
                     metric_candidates = self._metric_candidates(col_name, semantic_type)
                     column_roles = self._column_roles(visibility_map, fq_table, col_name, role_catalog)
 
-                    session.add(
-                        SemanticColumn(
-                            organization_id=organization_id,
-                            data_source_id=data_source_id,
-                            database_name=db_name,
-                            table_name=table_name,
-                            column_name=col_name,
-                            semantic_type=semantic_type,
-                            description=description,
-                            metric_candidates=metric_candidates,
-                            allowed_roles=column_roles,
-                        )
-                    )
                     semantic_columns.append(
                         {
                             "database_name": db_name,
@@ -114,40 +106,143 @@ class SemanticService:
                         }
                         metrics.append(metric)
 
-        unique_metrics = {m["name"]: m for m in metrics}
-        for m in unique_metrics.values():
-            session.add(
-                MetricDefinition(
-                    organization_id=organization_id,
-                    data_source_id=data_source_id,
-                    name=m["name"],
-                    description=m["description"],
-                    expression_sql=m["expression_sql"],
-                    meta=m["metadata"],
-                    allowed_roles=m["allowed_roles"],
-                )
+        for chunk in chunked(semantic_columns):
+            bulk_insert(
+                session,
+                SemanticColumn,
+                [{"organization_id": organization_id, "data_source_id": data_source_id, **c} for c in chunk],
             )
 
-        return self.get_semantics(session, organization_id, data_source_id)
+        unique_metrics = {m["name"]: m for m in metrics}
+        metric_rows = (
+            {
+                "organization_id": organization_id,
+                "data_source_id": data_source_id,
+                "name": m["name"],
+                "description": m["description"],
+                "expression_sql": m["expression_sql"],
+                "metadata": m["metadata"],
+                "allowed_roles": m["allowed_roles"],
+            }
+            for m in unique_metrics.values()
+        )
+        for chunk in chunked(metric_rows):
+            bulk_insert(session, MetricDefinition, chunk)
+
+        return self.refresh_snapshot(session, organization_id, data_source_id).model
 
     def get_semantics(self, session: Session, organization_id: str, data_source_id: str) -> Dict[str, Any]:
+        # Shared, read-only model: copy before changing anything.
+        return self.get_snapshot(session, organization_id, data_source_id).model
+
+    def get_snapshot(self, session: Session, organization_id: str, data_source_id: str) -> CachedSnapshot:
+        # One indexed lookup decides whether the in-process copy is still current; the model itself is only
+        # rebuilt when a writer has stored a new version.
+        row = session.execute(
+            select(SemanticSnapshot.version, SemanticSnapshot.etag).where(
+                SemanticSnapshot.organization_id == organization_id,
+                SemanticSnapshot.data_source_id == data_source_id,
+            )
+        ).first()
+        if row is None:
+            # No write since this data source was created (backfill_snapshots stores one for older data
+            # sources at startup): there is no version to validate a cached copy against, so build from the rows.
+            model = self._materialize(session, organization_id, data_source_id)
+            return CachedSnapshot.from_model(organization_id, data_source_id, 0, model)
+        cached = snapshot_cache.get(organization_id, data_source_id)
+        if cached is not None and cached.version == row.version and cached.etag == row.etag:
+            return cached
+        # Version, etag and payload come from one read, so a concurrent refresh cannot pair one version's
+        # etag with another's payload.
+        stored = session.execute(
+            select(SemanticSnapshot.version, SemanticSnapshot.etag, SemanticSnapshot.payload).where(
+                SemanticSnapshot.organization_id == organization_id,
+                SemanticSnapshot.data_source_id == data_source_id,
+            )
+        ).first()
+        if stored is None:
+            return self.get_snapshot(session, organization_id, data_source_id)
+        return snapshot_cache.put(
+            CachedSnapshot.from_payload(organization_id, data_source_id, stored.version, stored.etag, stored.payload)
+        )
+
+    def backfill_snapshots(self, session: Session) -> int:
+        # Data sources written before snapshots existed have no row and would be rebuilt from the rows on
+        # every read until their next write; store one for each.
+        missing = session.execute(
+            select(DataSource.organization_id, DataSource.id)
+            .outerjoin(
+                SemanticSnapshot,
+                (SemanticSnapshot.organization_id == DataSource.organization_id)
+                & (SemanticSnapshot.data_source_id == DataSource.id),
+            )
+            .where(SemanticSnapshot.id.is_(None))
+        ).all()
+        for organization_id, data_source_id in missing:
+            self.refresh_snapshot(session, organization_id, data_source_id)
+        return len(missing)
+
+    def refresh_snapshot(self, session: Session, organization_id: str, data_source_id: str) -> CachedSnapshot:
+        # Called by every writer of semantic or allowlist rows, inside the writer's transaction; the
+        # in-process cache picks the result up when that transaction commits.
+        model = self._materialize(session, organization_id, data_source_id)
+        fresh = CachedSnapshot.from_model(organization_id, data_source_id, 1, model)
+        row = session.scalars(
+            select(SemanticSnapshot).where(
+                SemanticSnapshot.organization_id == organization_id,
+                SemanticSnapshot.data_source_id == data_source_id,
+            )
+        ).first()
+        if row is None:
+            row = SemanticSnapshot(organization_id=organization_id, data_source_id=data_source_id, version=1)
+            session.add(row)
+        elif row.etag != fresh.etag:
+            row.version += 1
+        if row.etag != fresh.etag:
+            row.etag = fresh.etag
+            row.payload = fresh.payload
+            row.updated_at = datetime.utcnow()
+            session.flush()
+        fresh.version = row.version
+        return publish_on_commit(session, fresh)
+
+    def _materialize(self, session: Session, organization_id: str, data_source_id: str) -> Dict[str, Any]:
         columns = session.scalars(
-            select(SemanticColumn).where(
+            select(SemanticColumn)
+            .where(
                 SemanticColumn.organization_id == organization_id,
                 SemanticColumn.data_source_id == data_source_id,
             )
+            .order_by(SemanticColumn.id)
         ).all()
         metrics = session.scalars(
-            select(MetricDefinition).where(
+            select(MetricDefinition)
+            .where(
                 MetricDefinition.organization_id == organization_id,
                 MetricDefinition.data_source_id == data_source_id,
             )
+            .order_by(MetricDefinition.id)
         ).all()
 
-        table_rows = session.scalars(select(AllowlistTable).where(AllowlistTable.data_source_id == data_source_id)).all()
+        # Allowlist rows carry no organization; the join keeps another tenant's tables out of this model.
+        owned = (DataSource.id == data_source_id) & (DataSource.organization_id == organization_id)
+        table_rows = session.scalars(
+            select(AllowlistTable)
+            .join(DataSource, AllowlistTable.data_source_id == DataSource.id)
+            .where(owned)
+            .order_by(AllowlistTable.id)
+        ).all()
+        columns_by_table: Dict[int, List[AllowlistColumn]] = {}
+        for c in session.scalars(
+            select(AllowlistColumn)
+            .join(AllowlistTable, AllowlistColumn.allowlist_table_id == AllowlistTable.id)
+            .join(DataSource, AllowlistTable.data_source_id == DataSource.id)
+            .where(owned)
+            .order_by(AllowlistColumn.id)
+        ):
+            columns_by_table.setdefault(c.allowlist_table_id, []).append(c)
         semantic_tables = []
         for table in table_rows:
-            table_columns = session.scalars(select(AllowlistColumn).where(AllowlistColumn.allowlist_table_id == table.id)).all()
             semantic_tables.append(
                 {
                     "database_name": table.database_name,
@@ -155,7 +250,7 @@ class SemanticService:
                     "allowed_roles": table.allowed_roles or [],
                     "columns": [
                         {"column_name": c.column_name, "allowed_roles": c.allowed_roles or []}
-                        for c in table_columns
+                        for c in columns_by_table.get(table.id, [])
                     ],
                 }
             )
@@ -187,17 +282,14 @@ class SemanticService:
         }
 
     def get_role_aware_semantics(self, session: Session, organization_id: str, data_source_id: str, role: str) -> Dict[str, Any]:
-        semantics = self.get_semantics(session, organization_id, data_source_id)
+        # Projections live on the snapshot, so they are computed once per semantic version and shared.
+        return self.get_snapshot(session, organization_id, data_source_id).projections.view(role)
 
-        def visible(item: Dict[str, Any]) -> bool:
-            roles = item.get("allowed_roles") or []
-            return (not roles) or (role in roles)
-
-        return {
-            "semantic_tables": [t for t in semantics.get("semantic_tables", []) if visible(t)],
-            "semantic_columns": [c for c in semantics.get("semantic_columns", []) if visible(c)],
-            "metrics": [m for m in semantics.get("metrics", []) if visible(m)],
-        }
+    def get_role_scoped_allowlist(
+        self, session: Session, organization_id: str, data_source_id: str, role: str
+    ) -> Dict[str, frozenset]:
+        # Shared across requests for the same snapshot version and role; callers must not modify it.
+        return self.get_snapshot(session, organization_id, data_source_id).projections.allowlist(role)
 
     def apply_visibility_overrides(
         self,
@@ -206,60 +298,120 @@ class SemanticService:
         data_source_id: str,
         payload: SemanticVisibilityOverrideRequest,
     ) -> Dict[str, Any]:
-        for t in payload.table_overrides:
-            table = session.scalars(
-                select(AllowlistTable).where(
-                    AllowlistTable.data_source_id == data_source_id,
-                    AllowlistTable.database_name == t.database_name,
-                    AllowlistTable.table_name == t.table_name,
-                )
-            ).first()
-            if table:
-                table.allowed_roles = t.allowed_roles
-
-        for c in payload.column_overrides:
-            table = session.scalars(
-                select(AllowlistTable).where(
-                    AllowlistTable.data_source_id == data_source_id,
-                    AllowlistTable.database_name == c.database_name,
-                    AllowlistTable.table_name == c.table_name,
+        # Targets are resolved with set-based lookups per chunk of keys and changed with bulk UPDATEs.
+        # Repeated keys resolve to the last override, as if they were applied in order.
+        table_roles = {(t.database_name, t.table_name): t.allowed_roles for t in payload.table_overrides}
+        column_roles = {
+            (c.database_name, c.table_name, c.column_name): c.allowed_roles for c in payload.column_overrides
+        }
+        metric_roles = {m.metric_name: m.allowed_roles for m in payload.metric_overrides}
+
+        table_keys = set(table_roles) | {key[:2] for key in column_roles}
+        table_ids: Dict[tuple, int] = {}
+        for chunk in chunked(table_keys):
+            table_ids.update(
+                ((row.database_name, row.table_name), row.id)
+                for row in session.execute(
+                    select(AllowlistTable.id, AllowlistTable.database_name, AllowlistTable.table_name).where(
+                        AllowlistTable.data_source_id == data_source_id,
+                        tuple_(AllowlistTable.database_name, AllowlistTable.table_name).in_(chunk),
+                    )
                 )
-            ).first()
-            if not table:
-                continue
-            col = session.scalars(
-                select(AllowlistColumn).where(
-                    AllowlistColumn.allowlist_table_id == table.id,
-                    AllowlistColumn.column_name == c.column_name,
+            )
+
+        # Column overrides only apply under a known allowlist table, as before.
+        column_keys = [key for key in column_roles if key[:2] in table_ids]
+        allowlist_column_ids: Dict[tuple, int] = {}
+        semantic_column_ids: Dict[tuple, int] = {}
+        for chunk in chunked(column_keys):
+            allowlist_column_ids.update(
+                ((row.database_name, row.table_name, row.column_name), row.id)
+                for row in session.execute(
+                    select(
+                        AllowlistColumn.id,
+                        AllowlistTable.database_name,
+                        AllowlistTable.table_name,
+                        AllowlistColumn.column_name,
+                    )
+                    .join(AllowlistTable, AllowlistColumn.allowlist_table_id == AllowlistTable.id)
+                    .where(
+                        AllowlistTable.data_source_id == data_source_id,
+                        tuple_(AllowlistTable.database_name, AllowlistTable.table_name, AllowlistColumn.column_name).in_(chunk),
+                    )
                 )
-            ).first()
-            if col:
-                col.allowed_roles = c.allowed_roles
-
-            semantic_col = session.scalars(
-                select(SemanticColumn).where(
-                    SemanticColumn.organization_id == organization_id,
-                    SemanticColumn.data_source_id == data_source_id,
-                    SemanticColumn.database_name == c.database_name,
-                    SemanticColumn.table_name == c.table_name,
-                    SemanticColumn.column_name == c.column_name,
+            )
+            semantic_column_ids.update(
+                ((row.database_name, row.table_name, row.column_name), row.id)
+                for row in session.execute(
+                    select(SemanticColumn.id, SemanticColumn.database_name, SemanticColumn.table_name, SemanticColumn.column_name).where(
+                        SemanticColumn.organization_id == organization_id,
+                        SemanticColumn.data_source_id == data_source_id,
+                        tuple_(SemanticColumn.database_name, SemanticColumn.table_name, SemanticColumn.column_name).in_(chunk),
+                    )
                 )
-            ).first()
-            if semantic_col:
-                semantic_col.allowed_roles = c.allowed_roles
-
-        for m in payload.metric_overrides:
-            metric = session.scalars(
-                select(MetricDefinition).where(
-                    MetricDefinition.organization_id == organization_id,
-                    MetricDefinition.data_source_id == data_source_id,
-                    MetricDefinition.name == m.metric_name,
+            )
+
+        metric_ids: Dict[str, int] = {}
+        for chunk in chunked(metric_roles):
+            metric_ids.update(
+                (row.name, row.id)
+                for row in session.execute(
+                    select(MetricDefinition.id, MetricDefinition.name).where(
+                        MetricDefinition.organization_id == organization_id,
+                        MetricDefinition.data_source_id == data_source_id,
+                        MetricDefinition.name.in_(chunk),
+                    )
                 )
-            ).first()
-            if metric:
-                metric.allowed_roles = m.allowed_roles
+            )
+
+        bulk_update(
+            session,
+            AllowlistTable,
+            [{"id": table_ids[key], "allowed_roles": roles} for key, roles in table_roles.items() if key in table_ids],
+        )
+        bulk_update(
+            session,
+            AllowlistColumn,
+            [{"id": row_id, "allowed_roles": column_roles[key]} for key, row_id in allowlist_column_ids.items()],
+        )
+        bulk_update(
+            session,
+            SemanticColumn,
+            [{"id": row_id, "allowed_roles": column_roles[key]} for key, row_id in semantic_column_ids.items()],
+        )
+        bulk_update(
+            session,
+            MetricDefinition,
+            [{"id": metric_ids[name], "allowed_roles": roles} for name, roles in metric_roles.items() if name in metric_ids],
+        )
+        # Core UPDATEs bypass the identity map; anything already loaded must be re-read.
+        session.expire_all()
+
+        def status(found: bool) -> str:
+            return "applied" if found else "missing"
 
-        return self.get_semantics(session, organization_id, data_source_id)
+        overrides = {
+            "tables": [
+                {"database_name": t.database_name, "table_name": t.table_name, "status": status((t.database_name, t.table_name) in table_ids)}
+                for t in payload.table_overrides
+            ],
+            "columns": [
+                {
+                    "database_name": c.database_name,
+                    "table_name": c.table_name,
+                    "column_name": c.column_name,
+                    "status": status(
+                        (c.database_name, c.table_name, c.column_name) in allowlist_column_ids
+                        or (c.database_name, c.table_name, c.column_name) in semantic_column_ids
+                    ),
+                }
+                for c in payload.column_overrides
+            ],
+            "metrics": [
+                {"metric_name": m.metric_name, "status": status(m.metric_name in metric_ids)} for m in payload.metric_overrides
+            ],
+        }
+        return {**self.refresh_snapshot(session, organization_id, data_source_id).model, "overrides": overrides}
 
     def detect_restricted_metric_request(
         self,
@@ -270,27 +422,23 @@ class SemanticService:
         question: str,
     ) -> bool:
         question_l = question.lower()
-        metrics = session.scalars(
-            select(MetricDefinition).where(
-                MetricDefinition.organization_id == organization_id,
-                MetricDefinition.data_source_id == data_source_id,
-            )
-        ).all()
+        snapshot = self.get_snapshot(session, organization_id, data_source_id)
+        # The role's projection holds the very metric dicts it may see, so visibility is an identity check.
+        visible = {id(metric) for metric in snapshot.projections.view(role)["metrics"]}
 
         restricted_hits = 0
         visible_hits = 0
-        for metric in metrics:
-            name_l = metric.name.lower().replace("_", " ")
-            desc_l = metric.description.lower()
+        for metric in snapshot.model["metrics"]:
+            name_l = metric["name"].lower().replace("_", " ")
+            desc_l = metric["description"].lower()
             matched = any(token in question_l for token in self._important_tokens(name_l + " " + desc_l))
             if not matched:
                 continue
 
-            allowed = metric.allowed_roles or []
-            if allowed and role not in allowed:
-                restricted_hits += 1
-            else:
+            if id(metric) in visible:
                 visible_hits += 1
+            else:
+                restricted_hits += 1
 
         return restricted_hits > 0 and visible_hits == 0
 
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+def serialize_model(model: Dict[str, Any]) -> str:
+    return json.dumps(model, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def model_etag(payload: str) -> str:
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+ROLE_PROJECTED_KEYS = ("semantic_tables", "semantic_columns", "metrics")
+
+
+class RoleProjections:
+    # Position sets over one snapshot: per key, the items open to every role and, for each role named in
+    # some allowed_roles list, the items granted to it. Role views are built once from those sets and hold
+    # references to the snapshot's own dicts; roles that are never named share the open view.
+    def __init__(self, model: Dict[str, Any]) -> None:
+        self._model = model
+        self._open: Dict[str, Tuple[int, ...]] = {}
+        self._granted: Dict[str, Dict[str, Tuple[int, ...]]] = {}
+        for key in ROLE_PROJECTED_KEYS:
+            open_positions: List[int] = []
+            granted: Dict[str, List[int]] = {}
+            for position, item in enumerate(model.get(key, [])):
+                roles = item.get("allowed_roles") or []
+                if not roles:
+                    open_positions.append(position)
+                for role in set(roles):
+                    granted.setdefault(role, []).append(position)
+            self._open[key] = tuple(open_positions)
+            self._granted[key] = {role: tuple(positions) for role, positions in granted.items()}
+        self.roles = frozenset(role for granted in self._granted.values() for role in granted)
+        self._views: Dict[str | None, Dict[str, List[Dict[str, Any]]]] = {}
+        # Allowlist columns nest inside semantic_tables and can name roles of their own.
+        self._column_roles = frozenset(
+            role
+            for table in model.get("semantic_tables", [])
+            for column in table.get("columns", [])
+            for role in column.get("allowed_roles") or []
+        )
+        self._allowlists: Dict[str | None, Dict[str, frozenset]] = {}
+
+    def view(self, role: str) -> Dict[str, List[Dict[str, Any]]]:
+        key = role if role in self.roles else None
+        view = self._views.get(key)
+        if view is None:
+            view = self._views.setdefault(key, self._build(key))
+        return view
+
+    def allowlist(self, role: str) -> Dict[str, frozenset]:
+        # "database.table" -> columns the role may query, as get_role_scoped_allowlist derives it from the rows;
+        # tables left with no visible column are omitted.
+        key = role if role in self.roles or role in self._column_roles else None
+        allowlist = self._allowlists.get(key)
+        if allowlist is None:
+            allowlist = {}
+            for table in self.view(role)["semantic_tables"]:
+                columns = frozenset(
+                    c["column_name"] for c in table.get("columns", []) if not c.get("allowed_roles") or role in c["allowed_roles"]
+                )
+                if columns:
+                    allowlist[f"{table['database_name']}.{table['table_name']}"] = columns
+            allowlist = self._allowlists.setdefault(key, allowlist)
+        return allowlist
+
+    def _build(self, role: str | None) -> Dict[str, List[Dict[str, Any]]]:
+        view = {}
+        for key in ROLE_PROJECTED_KEYS:
+            items = self._model.get(key, [])
+            positions = self._open[key]
+            granted = self._granted[key].get(role, ()) if role is not None else ()
+            if granted:
+                positions = sorted(set(positions).union(granted))
+            view[key] = [items[p] for p in positions]
+        return view
+
+
+@dataclass
+class CachedSnapshot:
+    # One materialized semantic model version. `model` is shared by every reader in the process and must
+    # be treated as read-only; version 0 marks a model built from the rows because none was stored yet.
+    organization_id: str
+    data_source_id: str
+    version: int
+    etag: str
+    payload: str
+    model: Dict[str, Any]
+    _response_body: bytes | None = field(default=None, repr=False)
+
+    @classmethod
+    def from_model(cls, organization_id: str, data_source_id: str, version: int, model: Dict[str, Any]) -> "CachedSnapshot":
+        payload = serialize_model(model)
+        return cls(organization_id, data_source_id, version, model_etag(payload), payload, model)
+
+    @classmethod
+    def from_payload(cls, organization_id: str, data_source_id: str, version: int, etag: str, payload: str) -> "CachedSnapshot":
+        return cls(organization_id, data_source_id, version, etag, payload, json.loads(payload))
+
+    @cached_property
+    def projections(self) -> RoleProjections:
+        return RoleProjections(self.model)
+
+    @property
+    def http_etag(self) -> str:
+        return f'"{self.etag}"'
+
+    def response_body(self) -> bytes:
+        # The admin GET body ({"organization_id": ..., **model}), spliced from the stored payload once.
+        if self._response_body is None:
+            prefix = '{"organization_id":' + json.dumps(self.organization_id)
+            rest = self.payload[1:]
+            self._response_body = (prefix + ("," + rest if rest != "}" else "}")).encode("utf-8")
+        return self._response_body
+
+
+class SnapshotCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshots: Dict[Tuple[str, str], CachedSnapshot] = {}
+
+    def get(self, organization_id: str, data_source_id: str) -> CachedSnapshot | None:
+        with self._lock:
+            return self._snapshots.get((organization_id, data_source_id))
+
+    def put(self, snapshot: CachedSnapshot) -> CachedSnapshot:
+        with self._lock:
+            self._snapshots[(snapshot.organization_id, snapshot.data_source_id)] = snapshot
+        return snapshot
+
+    def invalidate(self, organization_id: str, data_source_id: str) -> None:
+        with self._lock:
+            self._snapshots.pop((organization_id, data_source_id), None)
+
+
+snapshot_cache = SnapshotCache()
+
+_PENDING_SNAPSHOTS = "pending_semantic_snapshots"
+
+
+def publish_on_commit(session: Session, snapshot: CachedSnapshot) -> CachedSnapshot:
+    # Writers refresh inside their transaction; the process-wide copy is only replaced once that commits,
+    # so a rolled-back write never leaves a version in the cache that the table does not have.
+    session.info.setdefault(_PENDING_SNAPSHOTS, {})[(snapshot.organization_id, snapshot.data_source_id)] = snapshot
+    return snapshot
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session) -> None:
+    for snapshot in session.info.pop(_PENDING_SNAPSHOTS, {}).values():
+        snapshot_cache.put(snapshot)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session) -> None:
+    session.info.pop(_PENDING_SNAPSHOTS, None)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
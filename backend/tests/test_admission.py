@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from backend.db.admission import AdmissionController, AdmissionRejected
+from backend.deadline import DeadlineExceeded
+
+
+def test_per_data_source_limit_rejects_after_queue_deadline():
+    controller = AdmissionController(per_data_source_limit=1, queue_timeout_seconds=0.05)
+    controller.acquire("org_a", "ds1")
+
+    started = time.perf_counter()
+    with pytest.raises(AdmissionRejected) as exc_info:
+        controller.acquire("org_a", "ds1")
+    assert time.perf_counter() - started < 0.5
+    assert exc_info.value.retry_after_seconds >= 1
+
+    # A different data source of the same organization is unaffected.
+    with controller.admit("org_a", "ds2"):
+        pass
+    controller.release("org_a", "ds1")
+    assert controller.stats()["active_total"] == 0
+
+
+def test_wait_cut_short_by_request_deadline_is_a_timeout():
+    controller = AdmissionController(per_data_source_limit=1, queue_timeout_seconds=5)
+    controller.acquire("org_a", "ds1")
+
+    # No budget left (or less than the queue timeout) means a deadline error, not "busy, retry later".
+    for remaining in (0.0, 0.05):
+        with pytest.raises(DeadlineExceeded):
+            controller.acquire("org_a", "ds1", timeout=remaining)
+    controller.release("org_a", "ds1")
+    assert controller.stats()["active_total"] == 0
+
+
+def test_released_slot_is_handed_to_queued_waiter():
+    controller = AdmissionController(per_data_source_limit=1, queue_timeout_seconds=2.0)
+    controller.acquire("org_a", "ds1")
+    admitted = threading.Event()
+
+    def waiter():
+        with controller.admit("org_a", "ds1"):
+            admitted.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.05)
+    assert not admitted.is_set()
+    controller.release("org_a", "ds1")
+    thread.join(timeout=2)
+    assert admitted.is_set()
+
+
+def test_weighted_round_robin_across_organizations():
+    controller = AdmissionController(
+        global_limit=1,
+        per_organization_limit=10,
+        per_data_source_limit=10,
+        queue_timeout_seconds=5.0,
+        organization_weights={"noisy": 1, "quiet": 1},
+    )
+    controller.acquire("warmup", "ds0")
+    order = []
+    lock = threading.Lock()
+
+    def worker(org: str):
+        with controller.admit(org, f"{org}_ds"):
+            with lock:
+                order.append(org)
+
+    threads = []
+    for org in ["noisy", "noisy", "noisy", "quiet"]:
+        t = threading.Thread(target=worker, args=(org,))
+        t.start()
+        threads.append(t)
+        time.sleep(0.02)
+
+    controller.release("warmup", "ds0")
+    for t in threads:
+        t.join(timeout=5)
+
+    assert order.index("quiet") <= 1
@@ -0,0 +1,107 @@
+from dataclasses import replace
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.config import settings
+from backend.db.allowlist import create_organization, get_allowlist, set_allowlist, upsert_data_source
+from backend.models import (
+    AllowlistColumn,
+    AllowlistRequest,
+    AllowlistTable,
+    AllowlistTablePayload,
+    Base,
+    MetricDefinition,
+    SemanticColumn,
+)
+from backend.semantic.service import SemanticService
+
+
+@pytest.fixture()
+def session(monkeypatch):
+    # A tiny chunk size makes every writer cross several chunk boundaries.
+    monkeypatch.setattr("backend.db.bulk.settings", replace(settings, metadata_bulk_chunk_rows=7))
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False, future=True)()
+    create_organization(session, "org_bulk", "Bulk")
+    upsert_data_source(session, "ds_bulk", "org_bulk", "Bulk", "mysql+pymysql://x")
+    yield session
+    session.close()
+
+
+def _request(tables: int, columns: int) -> AllowlistRequest:
+    return AllowlistRequest(
+        organization_id="org_bulk",
+        data_source_id="ds_bulk",
+        tables=[
+            AllowlistTablePayload(
+                database_name="analytics",
+                table_name=f"t{t:03d}",
+                approved_columns=["order_date", "revenue"] + [f"c{t}_{c}" for c in range(columns - 2)],
+            )
+            for t in range(tables)
+        ],
+    )
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_set_allowlist_bulk_inserts_and_replaces(session, monkeypatch, returning):
+    monkeypatch.setattr("backend.db.allowlist.supports_bulk_returning", lambda _session: returning)
+    request = _request(tables=23, columns=5)
+    set_allowlist(session, request)
+    expected = {f"analytics.{t.table_name}": set(t.approved_columns) for t in request.tables}
+    assert get_allowlist(session, "ds_bulk") == expected
+
+    smaller = _request(tables=3, columns=3)
+    set_allowlist(session, smaller)
+    assert get_allowlist(session, "ds_bulk") == {f"analytics.{t.table_name}": set(t.approved_columns) for t in smaller.tables}
+
+
+@pytest.mark.parametrize("returning", [True, False])
+def test_set_allowlist_merges_tables_listed_twice(session, monkeypatch, returning):
+    monkeypatch.setattr("backend.db.allowlist.supports_bulk_returning", lambda _session: returning)
+    tables = [
+        AllowlistTablePayload(database_name="analytics", table_name="orders", approved_columns=["order_date"]),
+        AllowlistTablePayload(database_name="analytics", table_name="refunds", approved_columns=["amount"]),
+        AllowlistTablePayload(database_name="analytics", table_name="orders", approved_columns=["revenue", "order_date"]),
+    ]
+    set_allowlist(session, AllowlistRequest(organization_id="org_bulk", data_source_id="ds_bulk", tables=tables))
+    assert get_allowlist(session, "ds_bulk") == {"analytics.orders": {"order_date", "revenue"}, "analytics.refunds": {"amount"}}
+    assert session.scalar(select(func.count()).select_from(AllowlistTable)) == 2
+    assert session.scalar(select(func.count()).select_from(AllowlistColumn)) == 3
+
+
+def test_build_semantic_model_bulk_inserts_columns_and_metrics(session):
+    request = _request(tables=9, columns=4)
+    set_allowlist(session, request)
+    allowlist = get_allowlist(session, "ds_bulk")
+    schema = {
+        "databases": [
+            {
+                "database_name": "analytics",
+                "tables": [
+                    {
+                        "table_name": t.table_name,
+                        "columns": [
+                            {"name": c, "type": "DATE" if c == "order_date" else "DECIMAL(10,2)" if c == "revenue" else "VARCHAR(32)"}
+                            for c in t.approved_columns
+                        ],
+                    }
+                    for t in request.tables
+                ],
+            }
+        ]
+    }
+
+    service = SemanticService()
+    model = service.build_semantic_model(session, "org_bulk", "ds_bulk", schema, allowlist)
+    rebuilt = service.build_semantic_model(session, "org_bulk", "ds_bulk", schema, allowlist)
+
+    assert session.scalar(select(func.count()).select_from(SemanticColumn)) == 9 * 4
+    assert len(model["semantic_columns"]) == len(rebuilt["semantic_columns"]) == 9 * 4
+    metric_count = session.scalar(select(func.count()).select_from(MetricDefinition))
+    assert metric_count == len(rebuilt["metrics"]) > 0
+    revenue = session.scalars(select(MetricDefinition).where(MetricDefinition.name.like("%revenue%"))).first()
+    assert revenue.meta["column_name"] == "revenue"
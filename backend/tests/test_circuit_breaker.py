@@ -0,0 +1,100 @@
+import pytest
+import requests
+
+from backend.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _fail():
+    raise requests.ConnectionError("provider down")
+
+
+def test_breaker_opens_after_consecutive_failures_and_short_circuits():
+    clock = _Clock()
+    breaker = CircuitBreaker("http://llm/embeddings", failure_threshold=3, reset_timeout_seconds=10, clock=clock)
+    calls = []
+
+    for _ in range(3):
+        with pytest.raises(requests.ConnectionError):
+            breaker.call(lambda: calls.append(1) or _fail())
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: calls.append(1))
+    assert len(calls) == 3
+    assert breaker.snapshot()["trips"] == 1
+    assert breaker.snapshot()["short_circuits"] == 1
+
+
+def test_half_open_probe_closes_or_reopens():
+    clock = _Clock()
+    breaker = CircuitBreaker("http://llm/chat", failure_threshold=1, reset_timeout_seconds=5, clock=clock)
+    with pytest.raises(requests.ConnectionError):
+        breaker.call(_fail)
+
+    clock.now = 6
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["trips"] == 2
+
+    clock.now = 12
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    response = requests.Response()
+    response.status_code = 400
+    breaker = CircuitBreaker("http://llm/chat", failure_threshold=1)
+
+    def bad_request():
+        raise requests.HTTPError(response=response)
+
+    with pytest.raises(requests.HTTPError):
+        breaker.call(bad_request)
+    assert breaker.state == CLOSED
+
+
+def test_deadline_capped_timeouts_do_not_trip_the_breaker():
+    breaker = CircuitBreaker("http://llm/embeddings", failure_threshold=1)
+
+    def timeout():
+        raise requests.Timeout("read timed out")
+
+    # A caller with a tiny request budget cannot open the breaker shared by every tenant.
+    for _ in range(3):
+        with pytest.raises(requests.Timeout):
+            breaker.call(timeout, capped_timeout=True)
+    assert breaker.state == CLOSED
+
+    with pytest.raises(requests.Timeout):
+        breaker.call(timeout)
+    assert breaker.state == OPEN
+
+
+def test_embedding_client_marks_deadline_capped_calls(monkeypatch):
+    from backend.vector import service
+
+    seen = []
+
+    class _Breaker:
+        def call(self, fn, capped_timeout=False):
+            seen.append(capped_timeout)
+            raise requests.Timeout("read timed out")
+
+    monkeypatch.setattr(service, "get_breaker", lambda url: _Breaker())
+    client = service.EmbeddingClient()
+    for timeout in (0.05, None, service.EMBEDDING_TIMEOUT_SECONDS):
+        with pytest.raises(requests.Timeout):
+            client.embed_remote("revenue", timeout=timeout)
+    assert seen == [True, False, False]
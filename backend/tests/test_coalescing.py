@@ -0,0 +1,110 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.agent.coalescing import SingleFlight
+from backend.db.allowlist import allowlist_version
+from backend.deadline import Deadline, DeadlineExceeded
+
+
+def test_concurrent_duplicates_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+    started = threading.Event()
+
+    def work():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return [{"metric_value": 42}]
+
+    def caller():
+        return flight.do(("ds1", "v1", "total revenue"), work)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        leader = pool.submit(caller)
+        started.wait()
+        followers = [pool.submit(caller) for _ in range(7)]
+        results = [leader.result()] + [f.result() for f in followers]
+
+    assert len(calls) == 1
+    assert all(rows == [{"metric_value": 42}] for rows, _ in results)
+    assert sum(1 for _, shared in results if shared) == 7
+    assert flight.in_flight() == 0
+
+
+def test_errors_propagate_to_waiters_and_next_call_reruns():
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    def failing():
+        release.wait()
+        raise RuntimeError("warehouse down")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(flight.do, "k", failing)
+        while flight.in_flight() == 0:
+            time.sleep(0.01)
+        second = pool.submit(flight.do, "k", failing)
+        time.sleep(0.05)
+        release.set()
+        errors = []
+        for future in (first, second):
+            with pytest.raises(RuntimeError, match="warehouse down"):
+                future.result()
+            errors.append(future.exception())
+
+    # The waiter raises its own instance, so the two tracebacks stay separate.
+    assert errors[0] is not errors[1]
+    assert flight.do("k", lambda: "fresh") == ("fresh", False)
+
+
+def test_waiter_out_of_budget_raises_deadline_exceeded():
+    flight = SingleFlight("test")
+    release = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(flight.do, "k", lambda: release.wait(5) and "done")
+        while flight.in_flight() == 0:
+            time.sleep(0.01)
+        with pytest.raises(DeadlineExceeded):
+            flight.do("k", lambda: "unused", timeout=0.01)
+        release.set()
+        assert leader.result() == ("done", False)
+
+
+def test_waiters_rerun_after_the_leader_runs_out_of_budget():
+    flight = SingleFlight("test")
+    started = threading.Event()
+    runs = []
+
+    def work(deadline):
+        runs.append(deadline.timeout_seconds)
+        started.set()
+        time.sleep(0.2)
+        deadline.check("warehouse query")
+        return "rows"
+
+    def caller(deadline):
+        return flight.do("k", lambda: work(deadline), timeout=deadline.remaining(), rerun_on=(DeadlineExceeded,))
+
+    short, long = Deadline(0.05), Deadline(5)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(caller, short)
+        started.wait()
+        follower = pool.submit(caller, long)
+        with pytest.raises(DeadlineExceeded):
+            leader.result()
+        # The generous caller is not failed by the tight one's deadline; it runs the work under its own.
+        assert follower.result() == ("rows", False)
+
+    assert runs == [0.05, 5]
+
+
+def test_allowlist_version_is_order_insensitive():
+    a = {"analytics.orders": {"revenue", "order_date"}, "analytics.customers": {"id"}}
+    b = {"analytics.customers": {"id"}, "analytics.orders": {"order_date", "revenue"}}
+    assert allowlist_version(a) == allowlist_version(b)
+    assert allowlist_version(a) != allowlist_version({"analytics.orders": {"revenue"}})
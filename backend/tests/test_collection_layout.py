@@ -0,0 +1,96 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from backend.db import session as db_session_module
+from backend.vector.layout import (
+    PER_DATA_SOURCE,
+    PER_ORGANIZATION,
+    SHARDED,
+    registered_collection,
+    resolve_collection,
+)
+from backend.vector.memory_store import InMemoryVectorStore
+from backend.vector.service import VectorIndexService
+
+
+def _docs(ds: str, topic: str):
+    return [
+        {"id": f"{ds}:col:orders.{topic}", "kind": "column", "text": f"orders {topic} measure", "allowed_roles": []},
+        {"id": f"{ds}:metric:total_{topic}", "kind": "metric", "text": f"total {topic} metric", "allowed_roles": ["finance"]},
+    ]
+
+
+def test_resolve_collection_names_and_filters():
+    per_ds = resolve_collection("acme", "ds1", layout=PER_DATA_SOURCE)
+    assert per_ds.name == per_ds.scope == "org:acme:semantic:ds1"
+    assert per_ds.filters == {}
+
+    per_org = resolve_collection("acme", "ds1", layout=PER_ORGANIZATION)
+    assert per_org.name == "org:acme:semantic"
+    assert per_org.scope == "org:acme:semantic:ds1"
+    assert per_org.filters == {"data_source_id": "ds1"}
+
+    sharded = resolve_collection("acme", "ds1", layout=SHARDED, shards=4)
+    assert sharded.name.startswith("semantic:shard:")
+    assert sharded.name == resolve_collection("acme", "ds2", layout=SHARDED, shards=4).name
+    assert sharded.filters == {"organization_id": "acme", "data_source_id": "ds1"}
+
+    with pytest.raises(ValueError):
+        resolve_collection("acme", "ds1", layout="per_table")
+
+
+@pytest.mark.parametrize("layout", [PER_ORGANIZATION, SHARDED])
+def test_shared_collection_isolates_data_sources(layout):
+    store = InMemoryVectorStore()
+    service = VectorIndexService(store=store)
+    first = service.target("acme", "ds1", layout=layout)
+    second = service.target("acme", "ds2", layout=layout)
+    assert first.name == second.name
+
+    service.index_documents(first, _docs("ds1", "revenue"))
+    service.index_documents(second, _docs("ds2", "revenue"))
+    assert store.memory_stats()[first.name]["count"] == 4
+
+    hits = service.search_by_vector(first, service.embed_query("orders revenue measure"), top_k=10)
+    assert {h["id"] for h in hits} == {"ds1:col:orders.revenue", "ds1:metric:total_revenue"}
+    hits = service.search_by_vector(second, service.embed_query("total revenue metric"), top_k=10, role="sales")
+    assert [h["id"] for h in hits] == ["ds2:col:orders.revenue"]
+
+    # Re-indexing one data source must not treat the other's docs as stale.
+    assert service.index_documents(first, _docs("ds1", "revenue")[:1])["removed"] == 1
+    assert set(store.content_hashes(second.name, filters=second.filters)) == {d["id"] for d in _docs("ds2", "revenue")}
+
+
+def test_moving_to_a_shared_layout_drops_the_old_copy():
+    store = InMemoryVectorStore()
+    service = VectorIndexService(store=store)
+    old = service.target("acme", "ds1", layout=PER_DATA_SOURCE)
+    new = service.target("acme", "ds1", layout=PER_ORGANIZATION)
+
+    service.index_documents(old, _docs("ds1", "revenue"))
+    assert service.index_documents(new, _docs("ds1", "revenue"))["added"] == 2
+    assert service.drop_documents(registered_collection("acme", "ds1", old.name, old.layout), keep_lexical=True) == 2
+
+    assert store.content_hashes(old.name) == {}
+    assert len(service.search(new, "total revenue metric", top_k=5, role="finance")) == 2
+
+
+def test_init_metadata_db_adds_layout_column_to_existing_table(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'meta.db'}", future=True)
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE vector_indexes (id INTEGER PRIMARY KEY, organization_id VARCHAR(64), "
+                "data_source_id VARCHAR(64), collection_name VARCHAR(255), provider VARCHAR(64), "
+                "last_indexed_at DATETIME)"
+            )
+        )
+        conn.execute(text("INSERT INTO vector_indexes VALUES (1, 'acme', 'ds1', 'org:acme:semantic:ds1', 'memory', NULL)"))
+    monkeypatch.setattr(db_session_module, "metadata_engine", engine)
+
+    db_session_module.init_metadata_db()
+    db_session_module.init_metadata_db()
+
+    assert "layout" in {c["name"] for c in inspect(engine).get_columns("vector_indexes")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT layout FROM vector_indexes")).scalar_one() == "per_data_source"
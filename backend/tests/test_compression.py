@@ -0,0 +1,108 @@
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from backend.api.compression import CompressionMiddleware, ETagMiddleware, build_codecs, negotiate
+
+PAYLOAD = {"rows": [{"region": "north", "revenue": i} for i in range(500)]}
+
+
+@pytest.fixture()
+def client():
+    app = FastAPI()
+
+    @app.get("/large")
+    def large():
+        return PAYLOAD
+
+    @app.get("/small")
+    def small():
+        return {"status": "ok"}
+
+    @app.get("/versioned")
+    def versioned():
+        return Response(content=json.dumps(PAYLOAD), media_type="application/json", headers={"ETag": '"v7"'})
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse((f"line {i}\n" for i in range(200)), media_type="text/plain")
+
+    @app.get("/small-stream")
+    def small_stream():
+        return StreamingResponse(iter([b"tiny ", b"body"]), media_type="text/plain", headers={"Content-Length": "9"})
+
+    @app.get("/binary")
+    def binary():
+        return Response(content=b"\x89PNG" * 1000, media_type="image/png")
+
+    app.add_middleware(ETagMiddleware)
+    app.add_middleware(CompressionMiddleware, codecs=build_codecs(["zstd", "br", "gzip"], gzip_level=5), minimum_size=512)
+    return TestClient(app)
+
+
+def test_negotiation_follows_server_preference_and_q_values():
+    codecs = build_codecs(["gzip"])
+    assert negotiate("gzip;q=0.5, deflate", codecs).name == "gzip"
+    assert negotiate("gzip;q=0, *", codecs) is None
+    assert negotiate("*", codecs).name == "gzip"
+    assert negotiate("identity", codecs) is None
+    with pytest.raises(ValueError):
+        build_codecs(["lz4"])
+
+
+def test_gzip_applies_above_threshold_only(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) < len(json.dumps(PAYLOAD)) / 4
+    assert response.json() == PAYLOAD
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    binary = client.get("/binary", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in binary.headers
+
+    plain = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.json() == PAYLOAD
+
+
+@pytest.mark.parametrize("encoding, module", [("br", "brotli"), ("zstd", "zstandard")])
+def test_optional_encodings(client, encoding, module):
+    pytest.importorskip(module)
+    response = client.get("/large", headers={"Accept-Encoding": f"gzip;q=0.5, {encoding}"})
+    assert response.headers["content-encoding"] == encoding
+    assert response.json() == PAYLOAD
+
+
+def test_streamed_responses_are_compressed_incrementally(client):
+    with client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw).decode() == "".join(f"line {i}\n" for i in range(200))
+
+    # A declared length below the threshold is honored even when the body arrives in chunks.
+    small = client.get("/small-stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers and small.text == "tiny body"
+
+
+def test_get_responses_revalidate_with_etags(client):
+    first = client.get("/large", headers={"Accept-Encoding": "identity"})
+    etag = first.headers["etag"]
+    not_modified = client.get("/large", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    # Compressed bodies carry the weak form, which still revalidates.
+    compressed = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["etag"] == f"W/{etag}"
+    assert client.get("/large", headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]}).status_code == 304
+
+    # A route's own validator is kept.
+    assert client.get("/versioned", headers={"Accept-Encoding": "identity"}).headers["etag"] == '"v7"'
+    assert "etag" not in client.get("/stream").headers
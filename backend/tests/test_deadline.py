@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from backend.agent.pipeline import QueryPipeline
+from backend.agent.sql_generator import SQLGenerator
+from backend.agent.stages import StageGraph
+from backend.db.mysql import with_max_execution_time
+from backend.deadline import Deadline, DeadlineExceeded, resolve_request_timeout
+from backend.observability.metrics import MetricsRegistry, StageTimer
+from backend.vector.lexical import LexicalResult
+from backend.vector.memory_store import InMemoryVectorStore
+from backend.vector.service import VectorIndexService
+
+
+def test_deadline_caps_stage_timeouts_and_expires():
+    deadline = Deadline(0.05)
+    assert deadline.timeout(30.0) <= 0.05
+    time.sleep(0.06)
+    assert deadline.expired()
+    with pytest.raises(DeadlineExceeded, match="before embedding"):
+        deadline.timeout(30.0, "embedding")
+
+
+def test_no_deadline_uses_stage_cap():
+    assert Deadline(None).timeout(45.0) == 45.0
+    assert Deadline(None).remaining() is None
+
+
+def test_request_timeout_header_overrides_default_and_is_capped():
+    assert resolve_request_timeout("org_demo", "1500") == 1.5
+    assert resolve_request_timeout("org_demo", "999999999") == 120.0
+    assert resolve_request_timeout("org_demo", None) == 30.0
+    with pytest.raises(ValueError):
+        resolve_request_timeout("org_demo", "-5")
+
+
+def test_stage_graph_stops_waiting_when_budget_is_spent():
+    timer = StageTimer(MetricsRegistry().histogram("s", "Stage latency.", ("stage",)))
+    graph = StageGraph(timer, deadline=Deadline(0.05))
+    graph.add("embedding", lambda: time.sleep(0.5))
+
+    started = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        graph.run()
+    assert time.perf_counter() - started < 0.3
+
+
+def test_max_execution_time_hint_uses_remaining_budget():
+    sql = "SELECT COUNT(*) AS metric_value FROM `analytics`.`orders`"
+    assert with_max_execution_time(sql, 2.5) == "SELECT /*+ MAX_EXECUTION_TIME(2500) */ COUNT(*) AS metric_value FROM `analytics`.`orders`"
+
+
+def test_max_execution_time_hint_targets_the_main_select_of_cte_queries():
+    sql = "WITH t AS (SELECT region, ')' AS p FROM orders) SELECT region FROM t"
+    assert with_max_execution_time(sql, 1) == "WITH t AS (SELECT region, ')' AS p FROM orders) SELECT /*+ MAX_EXECUTION_TIME(1000) */ region FROM t"
+    assert with_max_execution_time("SHOW TABLES", 1) == "SHOW TABLES"
+
+
+def test_sql_generation_gets_the_remaining_request_budget():
+    budgets = []
+
+    class _Generator(SQLGenerator):
+        def generate(self, question, intent, retrieved_docs, allowlist, timeout=None):
+            budgets.append(timeout)
+            return {"sql": "DELETE FROM orders", "rationale": ""}
+
+    pipeline = QueryPipeline(vector_index=VectorIndexService(store=InMemoryVectorStore()), sql_generator=_Generator())
+    answer = pipeline._answer(
+        timer=StageTimer(MetricsRegistry().histogram("stage_seconds", "Stage latency.", ("stage",))),
+        organization_id="o",
+        data_source_id="ds",
+        collection=pipeline.vector_index.target("o", "ds"),
+        mysql_uri="sqlite://",
+        role="admin",
+        question="total revenue",
+        intent={},
+        allowlist={"analytics.orders": {"revenue"}},
+        lexical=LexicalResult(),
+        query_vector=None,
+        deadline=Deadline(2.0),
+    )
+    assert answer["blocked"]
+    assert 0 < budgets[0] <= 2.0
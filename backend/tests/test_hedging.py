@@ -0,0 +1,79 @@
+import threading
+import time
+
+from backend.vector import hedging
+from backend.vector.hedging import HEDGES_FIRED, HEDGES_SUPPRESSED, HEDGES_WON, HedgedEmbedder, LatencyWindow
+
+
+class _SlowFirstCall:
+    def __init__(self, slow_seconds: float) -> None:
+        self.slow_seconds = slow_seconds
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text, timeout):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call == 1:
+            time.sleep(self.slow_seconds)
+            return [1.0]
+        return [2.0]
+
+
+def test_slow_primary_is_hedged_and_hedge_wins():
+    fired, won = HEDGES_FIRED.value(), HEDGES_WON.value()
+    embed_fn = _SlowFirstCall(slow_seconds=0.5)
+    hedger = HedgedEmbedder(embed_fn, initial_delay_seconds=0.02, max_extra_load=1.0)
+
+    started = time.perf_counter()
+    assert hedger.embed("revenue by month") == [2.0]
+    assert time.perf_counter() - started < 0.3
+    assert embed_fn.calls == 2
+    assert HEDGES_FIRED.value() == fired + 1
+    assert HEDGES_WON.value() == won + 1
+
+
+def test_hedges_respect_extra_load_budget():
+    suppressed = HEDGES_SUPPRESSED.value()
+    embed_fn = _SlowFirstCall(slow_seconds=0.1)
+    hedger = HedgedEmbedder(embed_fn, initial_delay_seconds=0.01, max_extra_load=0.0)
+
+    assert hedger.embed("revenue by month") == [1.0]
+    assert embed_fn.calls == 1
+    assert HEDGES_SUPPRESSED.value() == suppressed + 1
+
+
+def test_hedge_delay_tracks_observed_percentile():
+    window = LatencyWindow()
+    for ms in range(1, 101):
+        window.observe(ms / 1000.0)
+    hedger = HedgedEmbedder(lambda text, timeout: [0.0], percentile=95, window=window)
+    assert hedger.hedge_delay() == 0.095
+
+
+def test_primaries_never_queue_and_hedges_are_suppressed_when_workers_are_busy(monkeypatch):
+    monkeypatch.setattr(hedging, "_HEDGE_SLOTS", threading.BoundedSemaphore(1))
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def slow(text, timeout):
+        started.release()
+        release.wait(5)
+        return [1.0]
+
+    # Far more concurrent primaries than hedge workers: every one starts without waiting for a worker.
+    hedger = HedgedEmbedder(slow, initial_delay_seconds=0.01, max_extra_load=1.0)
+    suppressed = HEDGES_SUPPRESSED.value()
+    threads = [threading.Thread(target=hedger.embed, args=(f"q{i}",)) for i in range(40)]
+    for thread in threads:
+        thread.start()
+    assert all(started.acquire(timeout=2) for _ in range(41))
+    # One hedge took the only worker; the others are suppressed instead of queued behind it.
+    waited = time.perf_counter()
+    while HEDGES_SUPPRESSED.value() - suppressed < 39 and time.perf_counter() - waited < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert HEDGES_SUPPRESSED.value() - suppressed == 39
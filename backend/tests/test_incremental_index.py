@@ -0,0 +1,52 @@
+from backend.vector.memory_store import InMemoryVectorStore
+from backend.vector.service import EmbeddingClient, VectorIndexService
+
+
+class _CountingEmbedder(EmbeddingClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.embedded: list[str] = []
+
+    def try_embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return super().try_embed_documents(texts)
+
+
+def _docs():
+    return [
+        {"id": "ds:col:orders.revenue", "kind": "column", "text": "orders revenue measure", "allowed_roles": ["finance"]},
+        {"id": "ds:col:orders.region", "kind": "column", "text": "orders region dimension", "allowed_roles": []},
+        {"id": "ds:metric:total_revenue", "kind": "metric", "text": "total revenue metric", "allowed_roles": []},
+    ]
+
+
+def test_reindex_skips_unchanged_docs_and_deletes_stale_ones():
+    embedder = _CountingEmbedder()
+    service = VectorIndexService(store=InMemoryVectorStore(), embedder=embedder)
+
+    assert service.index_documents("c", _docs()) == {"added": 3, "updated": 0, "removed": 0, "skipped": 0}
+    assert service.index_documents("c", _docs()) == {"added": 0, "updated": 0, "removed": 0, "skipped": 3}
+    assert len(embedder.embedded) == 3
+
+    docs = _docs()[:2]
+    docs[0]["allowed_roles"] = ["finance", "admin"]
+    docs.append({"id": "ds:col:orders.channel", "kind": "column", "text": "orders channel dimension", "allowed_roles": []})
+    assert service.index_documents("c", docs) == {"added": 1, "updated": 1, "removed": 1, "skipped": 1}
+    assert embedder.embedded[3:] == ["orders revenue measure", "orders channel dimension"]
+
+    ids = {d["id"] for d in service.search("c", "total revenue metric", top_k=10)}
+    assert "ds:metric:total_revenue" not in ids
+    assert service.store.content_hashes("c").keys() == {d["id"] for d in docs}
+    admin_doc = next(d for d in service.search("c", "revenue", top_k=10, role="admin") if d["id"] == "ds:col:orders.revenue")
+    assert admin_doc["allowed_roles"] == ["finance", "admin"]
+
+
+def test_memory_store_delete_keeps_remaining_rows_aligned():
+    store = InMemoryVectorStore(encoding="int8", rerank_factor=2)
+    service = VectorIndexService(store=store)
+    service.index_documents("c", _docs())
+    store.delete("c", ["ds:col:orders.revenue"])
+
+    assert store.memory_stats()["c"]["count"] == 2
+    hits = store.query("c", service.embedder.embed("orders region dimension"), top_k=1)
+    assert hits[0]["id"] == "ds:col:orders.region"
@@ -0,0 +1,44 @@
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from backend.api import responses
+from backend.api.responses import FastJSONResponse
+
+
+ROW = {
+    "order_id": 7,
+    "order_date": datetime.date(2024, 3, 1),
+    "updated_at": datetime.datetime(2024, 3, 1, 8, 30, 15, 250),
+    "opened_at": datetime.time(9, 5),
+    "revenue": Decimal("1234.50"),
+    "units": Decimal("12"),
+    "duration": datetime.timedelta(minutes=90),
+    "tags": frozenset({"vip"}),
+    "request_id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "region": "nörth",
+    "discount": None,
+}
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_fast_json_matches_jsonable_encoder(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(responses, "orjson", None)
+    elif responses.orjson is None:
+        pytest.skip("orjson is not installed")
+    content = {"question": "q", "rows": [ROW, {**ROW, "order_id": 8}], "insight": {"key_insights": []}}
+
+    body = FastJSONResponse(content).body
+
+    assert json.loads(body) == jsonable_encoder(content)
+    assert json.loads(body)["rows"][0]["units"] == 12
+
+
+def test_unknown_types_still_fail():
+    with pytest.raises(TypeError):
+        FastJSONResponse({"rows": [{"value": object()}]})
@@ -0,0 +1,148 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.agent.pipeline import QueryPipeline
+from backend.agent.sql_generator import SQLGenerator
+from backend.db.allowlist import create_organization, upsert_data_source
+from backend.models import Base
+from backend.semantic.snapshot import CachedSnapshot
+from backend.vector.lexical import LexicalIndex, reciprocal_rank_fusion
+from backend.vector.memory_store import InMemoryVectorStore
+from backend.vector.service import EmbeddingClient, VectorIndexService
+
+
+DOCS = [
+    {"id": "t1", "kind": "table", "text": "Table analytics.orders columns order_date revenue region", "allowed_roles": []},
+    {"id": "c1", "kind": "column", "text": "Table analytics.orders column revenue is a measure", "allowed_roles": ["finance"]},
+    {"id": "c2", "kind": "column", "text": "Table analytics.orders column region is a dimension", "allowed_roles": []},
+    {"id": "c3", "kind": "column", "text": "Table analytics.tickets column priority is a dimension", "allowed_roles": []},
+]
+
+
+class _CountingEmbedder(EmbeddingClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.queries = 0
+
+    def embed(self, text, timeout=None):
+        self.queries += 1
+        return super().embed(text, timeout=timeout)
+
+
+def test_bm25_ranks_by_term_overlap_and_filters_roles():
+    index = LexicalIndex()
+    index.upsert("c", DOCS)
+
+    result = index.search("c", "revenue by region", top_k=3)
+    assert result.docs[0]["id"] == "t1"
+    assert result.confidence == 1.0
+
+    sales = index.search("c", "revenue", top_k=5, role="sales")
+    assert [d["id"] for d in sales.docs] == ["t1"]
+
+
+def test_upsert_replaces_postings():
+    index = LexicalIndex()
+    index.upsert("c", DOCS)
+    index.upsert("c", [{"id": "c3", "text": "Table analytics.tickets column severity"}])
+    assert index.search("c", "priority").hits == []
+    assert index.search("c", "severity").docs[0]["id"] == "c3"
+    assert index.size("c") == 4
+
+
+def test_unknown_terms_lower_confidence():
+    index = LexicalIndex()
+    index.upsert("c", DOCS)
+    assert index.search("c", "revenue churn forecast").confidence < 0.5
+
+
+def test_confident_lexical_match_skips_embedding():
+    embedder = _CountingEmbedder()
+    service = VectorIndexService(store=InMemoryVectorStore(), embedder=embedder)
+    service.index_documents("c", DOCS)
+    embedder.queries = 0
+
+    assert {d["id"] for d in service.search("c", "orders", top_k=3)} == {"t1", "c1", "c2"}
+    assert embedder.queries == 0
+
+    service.search("c", "orders churn", top_k=3)
+    assert embedder.queries == 1
+
+
+def test_index_keeps_retrieval_fields_only_and_reports_its_size():
+    index = LexicalIndex()
+    index.upsert("c", [{**doc, "description": "x" * 4096} for doc in DOCS])
+    hit = index.search("c", "revenue").docs[0]
+    assert "text" not in hit and "description" not in hit
+    assert hit["kind"] == "table"
+
+    before = index.nbytes()
+    assert 0 < before < 4096
+    assert index.memory()["c"]["count"] == 4
+    index.delete("c", ["c3"])
+    assert index.nbytes() < before
+
+
+def test_lexical_bytes_count_against_the_vector_memory_budget(tmp_path):
+    store = InMemoryVectorStore(spill_dir=str(tmp_path))
+    service = VectorIndexService(store=store, embedder=EmbeddingClient())
+    service.index_documents("a", DOCS)
+    service.index_documents("b", DOCS)
+
+    # Room for both collections but not for the lexical postings too: the least recently used one goes.
+    store.memory_budget_bytes = store.memory_report()["resident_bytes"] + service.lexical.nbytes() // 2
+    service.index_documents("b", DOCS)
+    report = store.memory_report()
+    assert report["external_bytes"]["lexical"] == service.lexical.nbytes() > 0
+    assert [name for name, stats in report["collections"].items() if stats["state"] == "spilled"] == ["a"]
+
+
+def test_sync_rebuilds_from_the_snapshot_only_when_its_etag_changes():
+    model = {
+        "semantic_tables": [{"database_name": "analytics", "table_name": "orders", "allowed_roles": [], "columns": []}],
+        "semantic_columns": [],
+        "metrics": [],
+    }
+    service = VectorIndexService(store=InMemoryVectorStore(), embedder=EmbeddingClient())
+    first = CachedSnapshot.from_model("org_a", "ds_a", 1, model)
+    assert service.sync_lexical("org_a", "ds_a", first)
+    assert not service.sync_lexical("org_a", "ds_a", first)
+
+    scope = service.target("org_a", "ds_a").scope
+    assert [d["table_name"] for d in service.lexical.search(scope, "orders").docs] == ["orders"]
+
+    model["semantic_tables"][0]["table_name"] = "tickets"
+    second = CachedSnapshot.from_model("org_a", "ds_a", 2, model)
+    assert service.sync_lexical("org_a", "ds_a", second)
+    assert service.lexical.search(scope, "orders").hits == []
+    assert service.lexical.version(scope) == second.etag
+
+
+def test_chat_requests_for_unknown_or_empty_data_sources_leave_no_collections():
+    engine = create_engine("sqlite://", future=True, poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, future=True)
+    with factory() as session:
+        create_organization(session, "o", "O")
+        create_organization(session, "other", "Other")
+        upsert_data_source(session, "empty", "o", "Empty", "mysql+pymysql://x")
+        upsert_data_source(session, "foreign", "other", "Foreign", "mysql+pymysql://x")
+        session.commit()
+    service = VectorIndexService(store=InMemoryVectorStore(), embedder=EmbeddingClient())
+    pipeline = QueryPipeline(vector_index=service, sql_generator=SQLGenerator(), session_factory=factory)
+
+    with factory() as session:
+        for data_source_id in ["nope0", "nope1", "foreign"]:
+            with pytest.raises(ValueError):
+                pipeline.run(session, "u", "o", "admin", data_source_id, "total revenue")
+        pipeline.run(session, "u", "o", "admin", "empty", "total revenue")
+    assert not service.sync_lexical("o", "empty", CachedSnapshot.from_model("o", "empty", 0, {}))
+    assert service.lexical.memory() == {}
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a = [{"id": "x"}, {"id": "y"}, {"id": "z"}]
+    b = [{"id": "y"}, {"id": "w"}]
+    assert [d["id"] for d in reciprocal_rank_fusion([a, b], top_k=2)] == ["y", "x"]
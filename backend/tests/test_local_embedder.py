@@ -0,0 +1,49 @@
+from dataclasses import replace
+
+import numpy as np
+
+from backend.config import settings
+
+from backend.vector.local_embedder import LocalHashingEmbedder
+from backend.vector.memory_store import InMemoryVectorStore
+from backend.vector.service import EmbeddingClient, VectorIndexService
+
+
+DOCS = [
+    "Table analytics.orders column revenue is a measure. Total order revenue.",
+    "Table analytics.orders column order_date is a time_dimension. Date the order was placed.",
+    "Table analytics.customers column region is a dimension. Customer sales region.",
+    "Table analytics.support column ticket_count is a measure. Number of support tickets.",
+]
+
+
+def test_embed_many_is_normalized_and_matches_single_embed():
+    embedder = LocalHashingEmbedder(dimensions=128)
+    matrix = embedder.embed_many(DOCS)
+    assert matrix.shape == (4, 128)
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0, atol=1e-5)
+    assert np.allclose(matrix[1], embedder.embed(DOCS[1]), atol=1e-6)
+
+    # Vectors do not depend on what else was embedded, so stored and query vectors stay comparable across
+    # collections, tenants and restarts.
+    fresh = LocalHashingEmbedder(dimensions=128)
+    fresh.embed_many(["Unrelated tenant text about payroll and payroll adjustments."] * 50)
+    assert np.array_equal(fresh.embed_many(DOCS[::-1]), matrix[::-1])
+
+
+def test_similar_text_ranks_first():
+    embedder = LocalHashingEmbedder()
+    matrix = embedder.embed_many(DOCS)
+    query = np.asarray(embedder.embed("support tickets"))
+    assert int(np.argmax(matrix @ query)) == 3
+
+
+def test_local_model_is_used_for_indexing_and_queries(monkeypatch):
+    monkeypatch.setattr("backend.vector.service.settings", replace(settings, embedding_model="local-hashing"))
+    client = EmbeddingClient()
+    assert client.local is not None and not client.is_configured()
+
+    service = VectorIndexService(store=InMemoryVectorStore(), embedder=client)
+    service.index_documents("c", [{"id": f"d{i}", "text": t} for i, t in enumerate(DOCS)])
+    hits = service.search("c", "customer region", top_k=1)
+    assert hits[0]["id"] == "d2"
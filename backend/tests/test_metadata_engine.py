@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from backend.db.session import create_metadata_engine
+from backend.models import AuditLog, Base
+
+
+def _audit(i: int) -> AuditLog:
+    return AuditLog(organization_id="org", user_id=f"u{i}", role="analyst", data_source_id="ds", question="q")
+
+
+def _hold_read_transaction(path):
+    reader = sqlite3.connect(path, isolation_level=None)
+    reader.execute("BEGIN")
+    reader.execute("SELECT count(*) FROM audit_logs").fetchall()
+    return reader
+
+
+def test_sqlite_engine_applies_pragmas(tmp_path):
+    engine = create_metadata_engine(f"sqlite:///{tmp_path / 'meta.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA mmap_size")).scalar() > 0
+
+
+def test_writes_are_not_blocked_by_open_read_transactions(tmp_path):
+    # Default rollback-journal mode: a reader's shared lock makes the writer's commit fail.
+    legacy_path = tmp_path / "legacy.db"
+    legacy = create_engine(f"sqlite:///{legacy_path}", connect_args={"timeout": 0.1})
+    Base.metadata.create_all(legacy)
+    reader = _hold_read_transaction(legacy_path)
+    with pytest.raises(OperationalError, match="database is locked"):
+        with sessionmaker(bind=legacy).begin() as session:
+            session.add(_audit(0))
+    reader.close()
+
+    tuned_path = tmp_path / "tuned.db"
+    tuned = create_metadata_engine(f"sqlite:///{tuned_path}")
+    Base.metadata.create_all(tuned)
+    reader = _hold_read_transaction(tuned_path)
+    with sessionmaker(bind=tuned).begin() as session:
+        session.add(_audit(0))
+    reader.close()
+
+
+def test_concurrent_readers_and_writers_do_not_error(tmp_path):
+    engine = create_metadata_engine(f"sqlite:///{tmp_path / 'meta.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    errors: list[Exception] = []
+
+    def worker(n: int) -> None:
+        try:
+            for i in range(25):
+                if n % 2:
+                    with factory.begin() as session:
+                        session.add(_audit(n * 100 + i))
+                else:
+                    with factory() as session:
+                        session.scalar(select(func.count()).select_from(AuditLog))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with factory() as session:
+        assert session.scalar(select(func.count()).select_from(AuditLog)) == 4 * 25
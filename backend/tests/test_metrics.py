@@ -0,0 +1,31 @@
+from backend.observability.metrics import MetricsRegistry, StageTimer
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    registry = MetricsRegistry()
+    hist = registry.histogram("stage_seconds", "Stage latency.", ("stage",), buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="sql")
+    hist.observe(0.5, stage="sql")
+    hist.observe(2.0, stage="sql")
+
+    text = registry.render()
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{stage="sql",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="sql",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="sql",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{stage="sql"} 3' in text
+
+
+def test_stage_timer_records_labelled_observations():
+    registry = MetricsRegistry()
+    hist = registry.histogram("pipeline_seconds", "Pipeline latency.", ("stage", "organization_id", "data_source_id"))
+    timer = StageTimer(hist, organization_id="org_demo", data_source_id="ds1")
+
+    with timer.stage("embedding"):
+        pass
+    with timer.stage("embedding"):
+        pass
+
+    assert set(timer.timings_ms()) == {"embedding"}
+    snapshot = hist.snapshot()
+    assert snapshot[("embedding", "org_demo", "ds1")]["count"] == 2
@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+qdrant_client = pytest.importorskip("qdrant_client")
+
+pytestmark = pytest.mark.filterwarnings("ignore:Payload indexes have no effect")
+
+from backend.vector.memory_store import InMemoryVectorStore
+from backend.vector.qdrant_store import INDEXED_PAYLOAD_FIELDS, QdrantVectorStore, point_id
+from backend.vector.service import VectorIndexService
+
+
+DOCS = [
+    {"id": "ds:col:orders.revenue", "kind": "column", "text": "orders revenue measure", "column_name": "revenue", "allowed_roles": ["finance"]},
+    {"id": "ds:col:orders.region", "kind": "column", "text": "orders region dimension", "column_name": "region", "allowed_roles": []},
+    {"id": "ds:metric:total_revenue", "kind": "metric", "text": "total revenue metric", "name": "total_revenue", "allowed_roles": ["sales"]},
+]
+
+
+class _CountingClient:
+    def __init__(self, client):
+        self._client = client
+        self.calls: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            # Upserts run on a thread pool, so the counter must not lose increments.
+            with self._lock:
+                self.calls[name] = self.calls.get(name, 0) + 1
+            return attr(*args, **kwargs)
+
+        return wrapper
+
+
+def _store(**kwargs):
+    client = _CountingClient(qdrant_client.QdrantClient(":memory:"))
+    return QdrantVectorStore(url="", client=client, **kwargs), client
+
+
+def test_index_query_and_incremental_delete_round_trip():
+    store, client = _store(upsert_batch_size=1, upsert_parallelism=2, slim_payloads=True)
+    service = VectorIndexService(store=store)
+
+    assert service.index_documents("c", DOCS)["added"] == 3
+    assert client.calls["upsert"] == 3
+    assert client.calls["create_payload_index"] == len(INDEXED_PAYLOAD_FIELDS)
+
+    hits = service.search_by_vector("c", service.embed_query("orders region dimension"), top_k=3, role="sales")
+    assert {h["id"] for h in hits} == {"ds:col:orders.region", "ds:metric:total_revenue"}
+    assert all("text" not in h for h in hits)
+
+    assert service.index_documents("c", DOCS[:2]) == {"added": 0, "updated": 0, "removed": 1, "skipped": 2}
+    assert set(store.content_hashes("c")) == {"ds:col:orders.revenue", "ds:col:orders.region"}
+
+
+def test_collection_metadata_is_cached_and_invalidated():
+    store, client = _store()
+    store.upsert("c", [])
+    assert store.query("missing", [0.1] * 32) == []
+
+    VectorIndexService(store=store).index_documents("c", DOCS)
+    before = client.calls.get("collection_exists", 0)
+    for _ in range(5):
+        store.query("c", [0.1] * 32, top_k=2)
+    assert client.calls.get("collection_exists", 0) == before
+
+    client._client.delete_collection("c")
+    assert store.query("c", [0.1] * 32) == []
+    assert store.query("c", [0.1] * 32) == []
+
+
+def test_point_ids_are_stable_uuids():
+    assert point_id("ds:col:orders.revenue") == point_id("ds:col:orders.revenue")
+    assert len(point_id("ds:col:orders.revenue")) == 36
+
+
+def test_memory_store_applies_role_filter_natively():
+    store = InMemoryVectorStore()
+    VectorIndexService(store=store).index_documents("c", DOCS)
+    hits = store.query("c", [0.1] * 32, top_k=10, role="finance")
+    assert {h["id"] for h in hits} == {"ds:col:orders.revenue", "ds:col:orders.region"}
+
+
+def test_shared_collection_filters_by_data_source():
+    store, client = _store(slim_payloads=True)
+    service = VectorIndexService(store=store)
+    first = service.target("acme", "ds1", layout="per_organization")
+    second = service.target("acme", "ds2", layout="per_organization")
+    service.index_documents(first, DOCS)
+    service.index_documents(second, [{**DOCS[0], "id": "ds2:col:orders.revenue"}])
+
+    hits = service.search_by_vector(second, service.embed_query("orders revenue measure"), top_k=5)
+    assert [h["id"] for h in hits] == ["ds2:col:orders.revenue"]
+    assert hits[0]["data_source_id"] == "ds2"
+    assert set(store.content_hashes(first.name, filters=first.filters)) == {d["id"] for d in DOCS}
@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+from backend.vector.base import VectorRecord
+from backend.vector.memory_store import InMemoryVectorStore
+
+
+def _records(n=2000, dim=64, seed=7):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim))
+    vectors = centers[rng.integers(0, 20, n)] + rng.normal(scale=0.3, size=(n, dim))
+    return [VectorRecord(id=f"d{i}", vector=v.tolist(), payload={"id": f"d{i}"}) for i, v in enumerate(vectors)]
+
+
+@pytest.mark.parametrize("encoding,min_compression", [("float16", 1.9), ("int8", 3.5), ("pq", 3.5)])
+def test_compressed_encodings_shrink_memory_and_keep_recall(encoding, min_compression):
+    store = InMemoryVectorStore(encoding=encoding, rerank_factor=8, pq_subspaces=16)
+    store.upsert("c", _records())
+
+    stats = store.memory_stats()["c"]
+    assert stats["count"] == 2000
+    code_only = 2000 * 64 * 4 / (stats["code_bytes"] + stats["codebook_bytes"])
+    assert code_only >= min_compression
+
+    recall = store.measure_recall("c", k=10)
+    assert recall["reranked_recall"] >= 0.9
+    assert recall["reranked_recall"] >= recall["recall"]
+
+
+def test_query_matches_exact_float32_ranking_for_near_duplicates():
+    records = _records(n=500)
+    exact = InMemoryVectorStore()
+    quantized = InMemoryVectorStore(encoding="int8", rerank_factor=4)
+    exact.upsert("c", records)
+    quantized.upsert("c", records)
+
+    query = records[42].vector
+    assert exact.query("c", query, top_k=1)[0]["id"] == "d42"
+    assert quantized.query("c", query, top_k=1)[0]["id"] == "d42"
+
+
+def test_upsert_replaces_existing_ids_and_pads_short_vectors():
+    store = InMemoryVectorStore(encoding="int8")
+    store.upsert("c", [VectorRecord(id="a", vector=[1.0, 0.0, 0.0, 0.0], payload={"v": 1})])
+    store.upsert("c", [VectorRecord(id="a", vector=[0.0, 1.0], payload={"v": 2})])
+    store.upsert("c", [VectorRecord(id="b", vector=[1.0, 0.0, 0.0, 0.0], payload={"v": 3})])
+
+    assert store.memory_stats()["c"]["count"] == 2
+    assert store.query("c", [0.0, 1.0, 0.0, 0.0], top_k=1) == [{"v": 2}]
+
+
+def test_upsert_does_not_change_a_snapshot_in_flight():
+    store = InMemoryVectorStore(encoding="int8")
+    store.upsert("c", [VectorRecord(id="a", vector=[1.0, 0.0], payload={"v": 1})])
+    col = store._collections["c"]
+    before = col.snapshot()
+    codes = before.codes.copy()
+
+    store.upsert("c", [VectorRecord(id="a", vector=[0.0, 1.0], payload={"v": 2}), VectorRecord(id="b", vector=[1.0, 1.0], payload={"v": 3})])
+    assert before.payloads == [{"v": 1}]
+    assert np.array_equal(before.codes, codes)
+    assert col.snapshot().payloads == [{"v": 2}, {"v": 3}]
+
+
+def test_pq_refits_from_full_precision_without_reranking():
+    records = _records(n=1200)
+    store = InMemoryVectorStore(encoding="pq", rerank_factor=0, pq_subspaces=16)
+    store.upsert("c", records[:300])
+    store.upsert("c", records[300:])
+
+    col = store._collections["c"]
+    assert col.codec.fitted_on == 1200
+    assert col.full is not None
+    assert np.array_equal(col.codes, col.codec.encode(col.full))
+
+
+@pytest.mark.parametrize("encoding", ["float32", "int8"])
+def test_wider_embeddings_after_fallback_vectors_widen_the_collection(encoding):
+    store = InMemoryVectorStore(encoding=encoding)
+    # Fallback vectors written during a provider outage come first and are narrower.
+    store.upsert("c", [VectorRecord(id="fallback", vector=[1.0] * 32, payload={"id": "fallback"})])
+
+    rng = np.random.default_rng(3)
+    real = rng.normal(size=(2, 64))
+    real[:, :32] = 0.5  # identical prefixes: only the tail tells the two documents apart
+    store.upsert("c", [VectorRecord(id=f"r{i}", vector=v.tolist(), payload={"id": f"r{i}"}) for i, v in enumerate(real)])
+
+    assert store.memory_stats()["c"]["dimensions"] == 64
+    assert store.query("c", real[1].tolist(), top_k=1)[0]["id"] == "r1"
+    assert store.query("c", [1.0] * 32, top_k=1)[0]["id"] == "fallback"
+    assert store.memory_stats()["c"]["count"] == 3
+
+
+def test_mixed_widths_in_one_upsert_are_rejected():
+    store = InMemoryVectorStore()
+    with pytest.raises(ValueError, match="same width"):
+        store.upsert("c", [VectorRecord(id="a", vector=[1.0, 0.0], payload={}), VectorRecord(id="b", vector=[1.0], payload={})])
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        InMemoryVectorStore(encoding="int4")
@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import delete, event, select
+
+from backend.db import session as session_module
+from backend.db.session import ReadOnlySessionError, create_metadata_engine, db_read_session, db_session
+from backend.models import Base, Organization
+
+
+@pytest.fixture(autouse=True)
+def metadata_db(tmp_path):
+    engine = create_metadata_engine(f"sqlite:///{tmp_path / 'meta.db'}")
+    Base.metadata.create_all(engine)
+    session_module.SessionLocal.configure(bind=engine)
+    session_module.ReadSessionLocal.configure(bind=engine)
+    yield engine
+    session_module.SessionLocal.configure(bind=session_module.metadata_engine)
+    session_module.ReadSessionLocal.configure(bind=session_module.metadata_read_engine)
+
+
+@pytest.fixture()
+def commits():
+    seen: list[str] = []
+
+    def record(session):
+        seen.append("commit")
+
+    event.listen(session_module.SessionLocal, "after_commit", record)
+    yield seen
+    event.remove(session_module.SessionLocal, "after_commit", record)
+
+
+def test_read_only_transactions_skip_the_commit(commits):
+    with db_session() as session:
+        session.scalars(select(Organization)).all()
+    assert commits == []
+
+    with db_session() as session:
+        session.merge(Organization(id="org_rw_split", name="Split", status="active"))
+    assert commits == ["commit"]
+
+    with db_session() as session:
+        session.execute(delete(Organization).where(Organization.id == "org_rw_split"))
+    assert commits == ["commit", "commit"]
+
+
+def test_read_session_rejects_writes():
+    with db_read_session() as session:
+        assert session.get(Organization, "org_rw_missing") is None
+        session.add(Organization(id="org_rw_missing", name="Nope", status="active"))
+        with pytest.raises(ReadOnlySessionError):
+            session.flush()
+
+    with db_read_session() as session:
+        with pytest.raises(ReadOnlySessionError):
+            session.execute(delete(Organization).where(Organization.id == "org_rw_missing"))
@@ -0,0 +1,88 @@
+import base64
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from backend.agent import result_formats
+from backend.agent.insights import INSIGHT_COLUMNS, generate_insight
+from backend.agent.result_formats import check_result_format, encode_result
+from backend.db.mysql import QueryResult, execute_readonly_query, execute_readonly_result
+
+
+@pytest.fixture()
+def engine():
+    engine = create_engine("sqlite://", future=True)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE sales (period TEXT, region TEXT, metric_value REAL, units INTEGER)"))
+        conn.execute(
+            text("INSERT INTO sales VALUES (:period, :region, :value, :units)"),
+            [
+                {"period": "2025-01", "region": "north", "value": 100.0, "units": 3},
+                {"period": "2025-02", "region": None, "value": 120.5, "units": 4},
+                {"period": "2025-03", "region": "south", "value": 150.0, "units": None},
+            ],
+        )
+    return engine
+
+
+SQL = "SELECT period, region, metric_value, units FROM sales ORDER BY period"
+
+
+def test_row_and_columnar_encodings(engine):
+    result = execute_readonly_result(engine, SQL)
+
+    rows = encode_result(result, "rows")
+    assert rows == execute_readonly_query(engine, SQL)
+    assert rows[1] == {"period": "2025-02", "region": None, "metric_value": 120.5, "units": 4}
+
+    columnar = encode_result(result, "columnar")
+    assert columnar == {
+        "columns": ["period", "region", "metric_value", "units"],
+        "types": ["string", "string", "float", "int"],
+        "data": [["2025-01", "2025-02", "2025-03"], ["north", None, "south"], [100.0, 120.5, 150.0], [3, 4, None]],
+    }
+    # Coalesced callers asking for the same format share the encoding.
+    assert encode_result(result, "columnar") is columnar
+
+
+def test_empty_results_and_insight_projection(engine):
+    empty = execute_readonly_result(engine, SQL.replace("ORDER BY", "WHERE units > 99 ORDER BY"))
+    assert encode_result(empty, "rows") == []
+    assert encode_result(empty, "columnar")["data"] == [[], [], [], []]
+    assert encode_result(QueryResult((), []), "columnar") == {"columns": [], "types": [], "data": []}
+
+    result = execute_readonly_result(engine, SQL)
+    narrowed = result.as_rows(INSIGHT_COLUMNS)
+    assert narrowed[0] == {"period": "2025-01", "metric_value": 100.0}
+    assert generate_insight("trend", narrowed) == generate_insight("trend", result.as_rows())
+
+
+def test_unknown_or_unavailable_formats_are_rejected(monkeypatch):
+    with pytest.raises(ValueError):
+        check_result_format("csv")
+    monkeypatch.setattr(result_formats, "pa", None)
+    with pytest.raises(ValueError, match="pyarrow"):
+        check_result_format("arrow")
+
+
+def test_arrow_encoding_round_trips(engine):
+    pa = pytest.importorskip("pyarrow")
+    encoded = encode_result(execute_readonly_result(engine, SQL), "arrow")
+    table = pa.ipc.open_stream(base64.b64decode(encoded["arrow_ipc"])).read_all()
+    assert table.column_names == encoded["columns"]
+    assert table.column("units").to_pylist() == [3, 4, None]
+
+
+def test_repeated_column_names_keep_every_column(engine):
+    result = execute_readonly_result(engine, "SELECT period, units AS n, metric_value AS n, units AS n_2 FROM sales ORDER BY period")
+    assert result.columns == ("period", "n", "n", "n_2")
+
+    assert encode_result(result, "rows")[0] == {"period": "2025-01", "n": 3, "n_2": 100.0, "n_2_2": 3}
+    assert result.as_rows(["n"])[0] == {"n": 3}
+    assert encode_result(result, "columnar")["data"][1:3] == [[3, 4, None], [100.0, 120.5, 150.0]]
+
+    pa = pytest.importorskip("pyarrow")
+    encoded = encode_result(result, "arrow")
+    table = pa.ipc.open_stream(base64.b64decode(encoded["arrow_ipc"])).read_all()
+    assert table.column_names == ["period", "n", "n", "n_2"]
+    assert table.column(2).to_pylist() == [100.0, 120.5, 150.0]
@@ -0,0 +1,192 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, delete, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.db.allowlist import (
+    apply_column_visibility_override,
+    apply_table_visibility_override,
+    create_organization,
+    delete_semantic_for_datasource,
+    get_allowlist,
+    get_role_scoped_allowlist,
+    set_allowlist,
+    upsert_data_source,
+)
+from backend.models import (
+    AllowlistRequest,
+    AllowlistTablePayload,
+    Base,
+    SemanticMetricVisibilityOverride,
+    SemanticSnapshot,
+    SemanticVisibilityOverrideRequest,
+)
+from backend.semantic.service import SemanticService
+from backend.semantic.snapshot import CachedSnapshot, etag_matches, snapshot_cache
+
+
+@pytest.fixture()
+def seeded():
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False, future=True)()
+    create_organization(session, "org_snap", "Snap")
+    upsert_data_source(session, "ds_snap", "org_snap", "Snap", "mysql+pymysql://x")
+    set_allowlist(
+        session,
+        AllowlistRequest(
+            organization_id="org_snap",
+            data_source_id="ds_snap",
+            tables=[AllowlistTablePayload(database_name="analytics", table_name="orders", approved_columns=["order_date", "revenue"])],
+        ),
+    )
+    schema = {
+        "databases": [
+            {
+                "database_name": "analytics",
+                "tables": [
+                    {"table_name": "orders", "columns": [{"name": "order_date", "type": "DATE"}, {"name": "revenue", "type": "DECIMAL(10,2)"}]}
+                ],
+            }
+        ]
+    }
+    service = SemanticService()
+    service.build_semantic_model(session, "org_snap", "ds_snap", schema, get_allowlist(session, "ds_snap"))
+    yield engine, session, service
+    session.close()
+    snapshot_cache.invalidate("org_snap", "ds_snap")
+
+
+def test_snapshot_version_follows_content_changes(seeded):
+    engine, session, service = seeded
+    first = service.get_snapshot(session, "org_snap", "ds_snap")
+    assert first.version == 1
+
+    assert service.refresh_snapshot(session, "org_snap", "ds_snap").version == 1
+
+    metric = first.model["metrics"][0]["name"]
+    service.apply_visibility_overrides(
+        session,
+        "org_snap",
+        "ds_snap",
+        SemanticVisibilityOverrideRequest(
+            organization_id="org_snap",
+            metric_overrides=[SemanticMetricVisibilityOverride(metric_name=metric, allowed_roles=["finance"])],
+        ),
+    )
+    second = service.get_snapshot(session, "org_snap", "ds_snap")
+    assert second.version == 2 and second.etag != first.etag
+    assert next(m for m in second.model["metrics"] if m["name"] == metric)["allowed_roles"] == ["finance"]
+
+
+def test_cached_snapshot_is_revalidated_with_one_query(seeded):
+    engine, session, service = seeded
+    cached = service.get_snapshot(session, "org_snap", "ds_snap")
+
+    statements: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    assert service.get_snapshot(session, "org_snap", "ds_snap") is cached
+    assert len(statements) == 1 and "payload" not in statements[0]
+
+    # Another process published a newer version: the stored payload replaces the stale copy.
+    snapshot_cache.invalidate("org_snap", "ds_snap")
+    reloaded = service.get_snapshot(session, "org_snap", "ds_snap")
+    assert reloaded is not cached and reloaded.model == cached.model
+
+    delete_semantic_for_datasource(session, "org_snap", "ds_snap")
+    assert snapshot_cache.get("org_snap", "ds_snap") is None
+    assert service.get_snapshot(session, "org_snap", "ds_snap").version == 0
+
+
+def test_response_body_and_etag_matching(seeded):
+    engine, session, service = seeded
+    snapshot = service.get_snapshot(session, "org_snap", "ds_snap")
+    assert json.loads(snapshot.response_body()) == {"organization_id": "org_snap", **snapshot.model}
+
+    assert etag_matches(snapshot.http_etag, snapshot.http_etag)
+    assert etag_matches(f'"other", W/{snapshot.http_etag}', snapshot.http_etag)
+    assert etag_matches("*", snapshot.http_etag)
+    assert not etag_matches('"other"', snapshot.http_etag)
+    assert not etag_matches(None, snapshot.http_etag)
+
+
+def test_role_projections_match_filtering_and_are_shared():
+    model = {
+        "semantic_tables": [
+            {"table_name": "orders", "allowed_roles": []},
+            {"table_name": "payroll", "allowed_roles": ["finance", "finance"]},
+        ],
+        "semantic_columns": [
+            {"column_name": "revenue", "allowed_roles": ["finance", "executive"]},
+            {"column_name": "region", "allowed_roles": None},
+            {"column_name": "salary", "allowed_roles": ["admin"]},
+        ],
+        "metrics": [{"name": "total_revenue", "allowed_roles": ["executive"]}],
+    }
+    snapshot = CachedSnapshot.from_model("org_snap", "ds_snap", 1, model)
+
+    def filtered(role):
+        return {
+            key: [item for item in model[key] if not item.get("allowed_roles") or role in item["allowed_roles"]]
+            for key in ("semantic_tables", "semantic_columns", "metrics")
+        }
+
+    for role in ("finance", "executive", "admin", "sales", "nobody"):
+        assert snapshot.projections.view(role) == filtered(role)
+
+    assert snapshot.projections.view("finance") is snapshot.projections.view("finance")
+    # Roles that are never granted anything share the open view, and views reference the snapshot's items.
+    assert snapshot.projections.view("sales") is snapshot.projections.view("nobody")
+    assert snapshot.projections.view("finance")["semantic_columns"][0] is model["semantic_columns"][0]
+
+
+def test_role_scoped_allowlist_from_the_snapshot_matches_the_allowlist_rows(seeded):
+    engine, session, service = seeded
+    apply_column_visibility_override(session, "ds_snap", "analytics", "orders", "revenue", ["finance"])
+    service.refresh_snapshot(session, "org_snap", "ds_snap")
+    for role in ("finance", "sales", "nobody"):
+        allowlist = service.get_role_scoped_allowlist(session, "org_snap", "ds_snap", role)
+        assert allowlist == get_role_scoped_allowlist(session, "ds_snap", role)
+        assert allowlist is service.get_role_scoped_allowlist(session, "org_snap", "ds_snap", role)
+    assert service.get_role_scoped_allowlist(session, "org_snap", "ds_snap", "sales") == {"analytics.orders": {"order_date"}}
+
+    apply_table_visibility_override(session, "ds_snap", "analytics", "orders", ["finance"])
+    service.refresh_snapshot(session, "org_snap", "ds_snap")
+    assert service.get_role_scoped_allowlist(session, "org_snap", "ds_snap", "sales") == {}
+    assert service.get_role_scoped_allowlist(session, "org_snap", "ds_snap", "finance") == {"analytics.orders": {"order_date", "revenue"}}
+
+
+def test_snapshot_for_a_foreign_organization_excludes_the_data_sources_tables(seeded):
+    engine, session, service = seeded
+    assert service.get_snapshot(session, "org_snap", "ds_snap").model["semantic_tables"]
+    foreign = service.get_snapshot(session, "org_other", "ds_snap").model
+    assert foreign["semantic_tables"] == [] and foreign["semantic_columns"] == []
+
+
+def test_refreshed_snapshots_reach_the_cache_only_on_commit(seeded):
+    engine, session, service = seeded
+    session.commit()
+    snapshot_cache.invalidate("org_snap", "ds_snap")
+
+    service.refresh_snapshot(session, "org_snap", "ds_snap")
+    session.execute(delete(SemanticSnapshot))
+    service.refresh_snapshot(session, "org_snap", "ds_snap")
+    session.rollback()
+    assert snapshot_cache.get("org_snap", "ds_snap") is None
+
+    committed = service.refresh_snapshot(session, "org_snap", "ds_snap")
+    session.commit()
+    assert snapshot_cache.get("org_snap", "ds_snap") is committed
+
+
+def test_backfill_stores_snapshots_for_data_sources_without_one(seeded):
+    engine, session, service = seeded
+    upsert_data_source(session, "ds_old", "org_snap", "Old", "mysql+pymysql://x")
+    session.execute(delete(SemanticSnapshot))
+    assert service.get_snapshot(session, "org_snap", "ds_snap").version == 0
+
+    assert service.backfill_snapshots(session) == 2
+    assert service.backfill_snapshots(session) == 0
+    snapshot = service.get_snapshot(session, "org_snap", "ds_snap")
+    assert snapshot.version == 1 and snapshot.model["semantic_tables"]
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.agent.pipeline import QueryPipeline
+from backend.agent.sql_generator import SQLGenerator
+from backend.agent.stages import INLINE, StageGraph
+from backend.db.allowlist import create_organization, upsert_data_source
+from backend.models import Base
+from backend.observability.metrics import MetricsRegistry, StageTimer
+from backend.semantic.service import SemanticService
+from backend.vector.memory_store import InMemoryVectorStore
+from backend.vector.service import VectorIndexService
+
+
+def _timer() -> StageTimer:
+    hist = MetricsRegistry().histogram("stage_seconds", "Stage latency.", ("stage",))
+    return StageTimer(hist)
+
+
+def test_independent_stages_run_concurrently():
+    # Every stage waits at the barrier until all three are running, so sequential execution breaks it.
+    barrier = threading.Barrier(3, timeout=5)
+
+    def stage(result, hold):
+        barrier.wait()
+        time.sleep(hold)
+        return result
+
+    graph = StageGraph(_timer())
+    graph.add("embedding", lambda: stage("vec", 0.05))
+    graph.add("allowlist", lambda: stage({"analytics.orders": {"revenue"}}, 0.05))
+    graph.add("restricted_metric_check", lambda: stage(None, 0))
+
+    results = graph.run()
+
+    assert results["embedding"] == "vec"
+    starts = [start for start, _ in graph.spans.values()]
+    ends = [end for _, end in graph.spans.values()]
+    assert max(starts) < min(ends)
+    assert graph.critical_path()[-1] in {"embedding", "allowlist"}
+
+
+def test_dependent_stage_waits_and_critical_path_follows_chain():
+    graph = StageGraph(_timer())
+    order = []
+    graph.add("data_source", lambda: order.append("data_source") or time.sleep(0.05))
+    graph.add("allowlist", lambda: order.append("allowlist") or time.sleep(0.1), deps=["data_source"])
+    graph.add("embedding", lambda: time.sleep(0.01))
+
+    graph.run()
+
+    assert order == ["data_source", "allowlist"]
+    assert graph.critical_path() == ["data_source", "allowlist"]
+
+
+def test_early_failure_skips_pending_stages():
+    graph = StageGraph(_timer())
+    ran = []
+    release = threading.Event()
+    finished = threading.Event()
+
+    def deny():
+        raise PermissionError("denied")
+
+    def slow_embedding():
+        release.wait(5)
+        finished.set()
+
+    graph.add("allowlist", deny)
+    graph.add("sql", lambda: ran.append("sql"), deps=["allowlist"])
+    graph.add("embedding", slow_embedding)
+
+    with pytest.raises(PermissionError):
+        graph.run()
+
+    # The failure surfaced while the independent stage was still blocked.
+    assert not finished.is_set()
+    release.set()
+    assert ran == []
+    assert graph.cancelled.is_set()
+
+
+def test_inline_executor_runs_in_dependency_order_and_stops_at_the_first_failure():
+    graph = StageGraph(_timer(), executor=INLINE)
+    threads = []
+
+    def record(name):
+        threads.append((name, threading.current_thread()))
+
+    def deny():
+        record("allowlist")
+        raise PermissionError("denied")
+
+    graph.add("restricted_metric_check", lambda: record("restricted_metric_check"), deps=["data_source"])
+    graph.add("allowlist", deny, deps=["data_source"])
+    graph.add("lexical_search", lambda: record("lexical_search"), deps=["data_source"])
+    graph.add("data_source", lambda: record("data_source"))
+
+    with pytest.raises(PermissionError):
+        graph.run()
+
+    assert [name for name, _ in threads] == ["data_source", "restricted_metric_check", "allowlist"]
+    assert {thread for _, thread in threads} == {threading.current_thread()}
+
+
+@pytest.mark.parametrize("pooled", [True, False])
+def test_pipeline_checks_data_source_ownership_before_tenant_stages(pooled):
+    engine = create_engine("sqlite://", future=True, poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, future=True)
+    with factory() as session:
+        create_organization(session, "org_a", "A")
+        create_organization(session, "org_b", "B")
+        upsert_data_source(session, "ds_b", "org_b", "B", "mysql+pymysql://x")
+        session.commit()
+
+    class _Spy(SemanticService):
+        def __init__(self):
+            super().__init__()
+            self.calls = []
+
+        def get_snapshot(self, *args, **kwargs):
+            self.calls.append("get_snapshot")
+            return super().get_snapshot(*args, **kwargs)
+
+        def detect_restricted_metric_request(self, *args, **kwargs):
+            self.calls.append("restricted_metric_check")
+            return super().detect_restricted_metric_request(*args, **kwargs)
+
+    spy = _Spy()
+    pipeline = QueryPipeline(
+        vector_index=VectorIndexService(store=InMemoryVectorStore()),
+        sql_generator=SQLGenerator(),
+        semantic_service=spy,
+        session_factory=factory if pooled else None,
+    )
+    with factory() as session, pytest.raises(ValueError, match="does not belong"):
+        pipeline.run(session, "u", "org_a", "admin", "ds_b", "total revenue")
+    assert spy.calls == []
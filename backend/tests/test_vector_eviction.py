@@ -0,0 +1,68 @@
+import numpy as np
+
+from backend.vector.base import VectorRecord
+from backend.vector.memory_store import VECTOR_EVICTIONS, VECTOR_RELOADS, InMemoryVectorStore
+
+
+def _records(prefix: str, n: int = 64, dims: int = 32, seed: int = 0, **payload):
+    rng = np.random.default_rng(seed)
+    return [
+        VectorRecord(id=f"{prefix}:{i}", vector=rng.normal(size=dims).tolist(), payload={"id": f"{prefix}:{i}", **payload})
+        for i in range(n)
+    ]
+
+
+def test_budget_spills_least_recently_used_collection_and_reloads_it(tmp_path):
+    probe = InMemoryVectorStore()
+    probe.upsert("org:a:semantic:ds1", _records("a"))
+    size = probe.memory_report()["resident_bytes"]
+
+    store = InMemoryVectorStore(encoding="int8", rerank_factor=2, memory_budget_bytes=int(size * 2.5), spill_dir=str(tmp_path))
+    records = _records("a", seed=1)
+    store.upsert("org:a:semantic:ds1", records)
+    store.upsert("org:b:semantic:ds1", _records("b", seed=2))
+    expected = store.query("org:a:semantic:ds1", records[3].vector, top_k=5)
+    store.upsert("org:c:semantic:ds1", _records("c", seed=3))
+    evictions = VECTOR_EVICTIONS.value(reason="memory_budget")
+    store.upsert("org:d:semantic:ds1", _records("d", seed=4))
+
+    stats = store.memory_stats()
+    assert VECTOR_EVICTIONS.value(reason="memory_budget") > evictions
+    assert stats["org:a:semantic:ds1"]["state"] == "spilled"
+    assert stats["org:d:semantic:ds1"]["state"] == "resident"
+    assert store.memory_report()["resident_bytes"] <= store.memory_budget_bytes
+
+    reloads = VECTOR_RELOADS.value()
+    assert store.query("org:a:semantic:ds1", records[3].vector, top_k=5) == expected
+    assert VECTOR_RELOADS.value() == reloads + 1
+    assert store.memory_stats()["org:a:semantic:ds1"]["state"] == "resident"
+    assert len(store.content_hashes("org:a:semantic:ds1")) == 64
+
+
+def test_organization_quota_only_evicts_that_organizations_collections(tmp_path):
+    probe = InMemoryVectorStore()
+    probe.upsert("org:a:semantic:ds1", _records("a"))
+    size = probe.memory_report()["resident_bytes"]
+
+    store = InMemoryVectorStore(organization_quotas={"a": int(size * 1.5)}, spill_dir=str(tmp_path))
+    store.upsert("org:b:semantic:ds1", _records("b"))
+    store.upsert("org:a:semantic:ds1", _records("a1"))
+    store.upsert("org:a:semantic:ds2", _records("a2"))
+
+    report = store.memory_report()
+    assert report["collections"]["org:a:semantic:ds1"]["state"] == "spilled"
+    assert report["collections"]["org:b:semantic:ds1"]["state"] == "resident"
+    assert report["organizations"]["a"]["resident_bytes"] <= report["organizations"]["a"]["quota_bytes"]
+    assert report["organizations"]["a"]["spilled_bytes"] > 0
+
+    # Updating a spilled collection reloads it first rather than starting from an empty one.
+    store.upsert("org:a:semantic:ds1", _records("a1", n=1, seed=9))
+    assert len(store.content_hashes("org:a:semantic:ds1")) == 64
+    assert store.memory_stats()["org:a:semantic:ds2"]["state"] == "spilled"
+
+
+def test_shared_collections_are_attributed_by_row_share():
+    store = InMemoryVectorStore()
+    store.upsert("semantic:shard:001", _records("a", n=30, organization_id="a") + _records("b", n=10, organization_id="b"))
+    organizations = store.memory_report()["organizations"]
+    assert organizations["a"]["resident_bytes"] > 2 * organizations["b"]["resident_bytes"]
@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from backend.db.allowlist import create_organization, get_allowlist, get_allowlist_with_visibility, set_allowlist, upsert_data_source
+from backend.models import (
+    AllowlistRequest,
+    AllowlistTablePayload,
+    Base,
+    SemanticColumnVisibilityOverride,
+    SemanticMetricVisibilityOverride,
+    SemanticTableVisibilityOverride,
+    SemanticVisibilityOverrideRequest,
+)
+from backend.semantic.service import SemanticService
+
+
+@pytest.fixture()
+def seeded():
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False, future=True)()
+    create_organization(session, "org_vis", "Vis")
+    upsert_data_source(session, "ds_vis", "org_vis", "Vis", "mysql+pymysql://x")
+    tables = [f"t{i:02d}" for i in range(12)]
+    set_allowlist(
+        session,
+        AllowlistRequest(
+            organization_id="org_vis",
+            data_source_id="ds_vis",
+            tables=[AllowlistTablePayload(database_name="analytics", table_name=t, approved_columns=["order_date", "revenue"]) for t in tables],
+        ),
+    )
+    schema = {
+        "databases": [
+            {
+                "database_name": "analytics",
+                "tables": [
+                    {"table_name": t, "columns": [{"name": "order_date", "type": "DATE"}, {"name": "revenue", "type": "DECIMAL(10,2)"}]}
+                    for t in tables
+                ],
+            }
+        ]
+    }
+    service = SemanticService()
+    model = service.build_semantic_model(session, "org_vis", "ds_vis", schema, get_allowlist(session, "ds_vis"))
+    yield engine, session, service, model
+    session.close()
+
+
+def test_overrides_apply_in_bulk_and_report_status(seeded):
+    engine, session, service, model = seeded
+    metric = model["metrics"][0]["name"]
+    payload = SemanticVisibilityOverrideRequest(
+        organization_id="org_vis",
+        table_overrides=[
+            SemanticTableVisibilityOverride(database_name="analytics", table_name=f"t{i:02d}", allowed_roles=["admin"]) for i in range(12)
+        ]
+        + [SemanticTableVisibilityOverride(database_name="analytics", table_name="nope", allowed_roles=["admin"])],
+        column_overrides=[
+            SemanticColumnVisibilityOverride(database_name="analytics", table_name=f"t{i:02d}", column_name="revenue", allowed_roles=["finance"])
+            for i in range(12)
+        ]
+        + [
+            SemanticColumnVisibilityOverride(database_name="analytics", table_name="t00", column_name="missing", allowed_roles=["finance"]),
+            SemanticColumnVisibilityOverride(database_name="analytics", table_name="nope", column_name="revenue", allowed_roles=["finance"]),
+        ],
+        metric_overrides=[
+            SemanticMetricVisibilityOverride(metric_name=metric, allowed_roles=["executive"]),
+            SemanticMetricVisibilityOverride(metric_name="no_such_metric", allowed_roles=["executive"]),
+        ],
+    )
+
+    statements: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    result = service.apply_visibility_overrides(session, "org_vis", "ds_vis", payload)
+
+    # Resolution and updates take a constant number of statements however many overrides were sent.
+    # The snapshot row written afterwards is a single statement of its own.
+    updates = [i for i, s in enumerate(statements) if s.startswith("UPDATE") and "semantic_snapshots" not in s]
+    assert len(updates) == 4
+    assert len(statements[: updates[0]]) == 4
+
+    overrides = result["overrides"]
+    assert [t["status"] for t in overrides["tables"]] == ["applied"] * 12 + ["missing"]
+    assert [c["status"] for c in overrides["columns"]] == ["applied"] * 12 + ["missing", "missing"]
+    assert [m["status"] for m in overrides["metrics"]] == ["applied", "missing"]
+
+    visibility = get_allowlist_with_visibility(session, "ds_vis")
+    first = next(t for t in visibility["tables"] if t["table_name"] == "t00")
+    assert first["table_allowed_roles"] == ["admin"]
+    revenue = [c for c in result["semantic_columns"] if c["column_name"] == "revenue"]
+    assert len(revenue) == 12 and all(c["allowed_roles"] == ["finance"] for c in revenue)
+    assert next(m for m in result["metrics"] if m["name"] == metric)["allowed_roles"] == ["executive"]
@@ -4,6 +4,22 @@ from dataclasses import dataclass
 from typing import Any, Protocol
 
 
+# Everything retrieval, SQL generation and incremental indexing read back from a hit.
+RETRIEVAL_PAYLOAD_FIELDS = (
+    "id",
+    "kind",
+    "name",
+    "database_name",
+    "table_name",
+    "column_name",
+    "semantic_type",
+    "allowed_roles",
+    "content_hash",
+    "organization_id",
+    "data_source_id",
+)
+
+
 @dataclass
 class VectorRecord:
     id: str
@@ -15,5 +31,18 @@ class VectorStore(Protocol):
     def upsert(self, collection: str, records: list[VectorRecord]) -> None:
         ...
 
-    def query(self, collection: str, vector: list[float], top_k: int = 5) -> list[dict[str, Any]]:
+    def query(
+        self,
+        collection: str,
+        vector: list[float],
+        top_k: int = 5,
+        role: str | None = None,
+        filters: dict[str, str] | None = None,
+    ) -> list[dict[str, Any]]:
+        ...
+
+    def delete(self, collection: str, ids: list[str]) -> None:
+        ...
+
+    def content_hashes(self, collection: str, filters: dict[str, str] | None = None) -> dict[str, str]:
         ...
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from time import perf_counter
+from typing import Callable, List
+
+from backend.config import settings
+from backend.observability.metrics import REGISTRY
+
+
+EmbedFn = Callable[[str, "float | None"], List[float]]
+
+# Only hedges use the pool; a hedge that finds every worker busy is suppressed rather than queued, since a
+# queued duplicate would arrive too late to help.
+_HEDGE_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, settings.embedding_hedge_workers), thread_name_prefix="embedding-hedge")
+_HEDGE_SLOTS = threading.BoundedSemaphore(max(1, settings.embedding_hedge_workers))
+
+HEDGES_FIRED = REGISTRY.counter(
+    "opencortex_embedding_hedges_fired_total",
+    "Duplicate query-embedding requests sent because the first was slower than the hedge delay.",
+)
+HEDGES_WON = REGISTRY.counter(
+    "opencortex_embedding_hedges_won_total",
+    "Hedged query embeddings where the duplicate request returned first.",
+)
+HEDGES_SUPPRESSED = REGISTRY.counter(
+    "opencortex_embedding_hedges_suppressed_total",
+    "Hedges skipped because the extra-load budget was exhausted.",
+)
+HEDGE_DELAY = REGISTRY.gauge(
+    "opencortex_embedding_hedge_delay_seconds",
+    "Current delay before a query embedding is hedged.",
+)
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 512) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> float | None:
+        with self._lock:
+            if not self._samples:
+                return None
+            ordered = sorted(self._samples)
+        rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class HedgeBudget:
+    # Token bucket: every primary request earns max_extra_load tokens, every hedge spends one.
+    def __init__(self, max_extra_load: float, burst: float = 10.0) -> None:
+        self.max_extra_load = max(0.0, max_extra_load)
+        self.burst = max(1.0, burst)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.max_extra_load)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+
+class HedgedEmbedder:
+    def __init__(
+        self,
+        embed_fn: EmbedFn,
+        percentile: float = 95.0,
+        initial_delay_seconds: float = 0.25,
+        min_delay_seconds: float = 0.01,
+        max_extra_load: float = 0.1,
+        min_samples: int = 20,
+        window: LatencyWindow | None = None,
+    ) -> None:
+        self.embed_fn = embed_fn
+        self.percentile = percentile
+        self.initial_delay_seconds = initial_delay_seconds
+        self.min_delay_seconds = min_delay_seconds
+        self.min_samples = min_samples
+        self.window = window or LatencyWindow()
+        self.budget = HedgeBudget(max_extra_load)
+
+    @classmethod
+    def from_settings(cls, embed_fn: EmbedFn) -> "HedgedEmbedder":
+        return cls(
+            embed_fn,
+            percentile=settings.embedding_hedge_percentile,
+            initial_delay_seconds=settings.embedding_hedge_initial_delay_ms / 1000.0,
+            min_delay_seconds=settings.embedding_hedge_min_delay_ms / 1000.0,
+            max_extra_load=settings.embedding_hedge_max_extra_load,
+        )
+
+    def hedge_delay(self) -> float:
+        observed = self.window.percentile(self.percentile) if len(self.window) >= self.min_samples else None
+        delay = self.initial_delay_seconds if observed is None else max(self.min_delay_seconds, observed)
+        HEDGE_DELAY.set(delay)
+        return delay
+
+    def embed(self, text: str, timeout: float | None = None) -> List[float]:
+        started = perf_counter()
+        self.budget.earn()
+        primary = self._start_primary(text, timeout)
+
+        delay = self.hedge_delay()
+        if timeout is not None:
+            delay = min(delay, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        remaining = None if timeout is None else timeout - (perf_counter() - started)
+        if remaining is not None and remaining <= 0:
+            return primary.result()
+        if not _HEDGE_SLOTS.acquire(blocking=False):
+            HEDGES_SUPPRESSED.inc()
+            return primary.result()
+        if not self.budget.try_spend():
+            _HEDGE_SLOTS.release()
+            HEDGES_SUPPRESSED.inc()
+            return primary.result()
+
+        HEDGES_FIRED.inc()
+        hedge = _HEDGE_EXECUTOR.submit(self._hedge, text, remaining)
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = future.exception()
+                    continue
+                # The loser keeps running in the background; its latency still feeds the window.
+                if future is hedge:
+                    HEDGES_WON.inc()
+                return future.result()
+        raise error or RuntimeError("Hedged embedding failed")
+
+    def _start_primary(self, text: str, timeout: float | None) -> Future:
+        # The primary starts at once on its own thread: it never waits behind other requests, so neither the
+        # latency window nor the hedge delay measures queueing. (It cannot run on the caller's thread, which
+        # has to stay free to return a winning hedge.)
+        future: Future = Future()
+
+        def run() -> None:
+            try:
+                future.set_result(self._timed(text, timeout))
+            except Exception as exc:
+                future.set_exception(exc)
+
+        threading.Thread(target=run, name="embedding-primary", daemon=True).start()
+        return future
+
+    def _hedge(self, text: str, timeout: float | None) -> List[float]:
+        try:
+            return self._timed(text, timeout)
+        finally:
+            _HEDGE_SLOTS.release()
+
+    def _timed(self, text: str, timeout: float | None) -> List[float]:
+        started = perf_counter()
+        vector = self.embed_fn(text, timeout)
+        self.window.observe(perf_counter() - started)
+        return vector
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict
+
+from backend.config import settings
+
+
+PER_DATA_SOURCE = "per_data_source"
+PER_ORGANIZATION = "per_organization"
+SHARDED = "sharded"
+
+LAYOUTS = (PER_DATA_SOURCE, PER_ORGANIZATION, SHARDED)
+
+
+@dataclass(frozen=True)
+class CollectionTarget:
+    # name is the physical store collection; filters narrow a shared collection to one data source;
+    # scope is the per-data-source key used for everything kept in-process (e.g. the lexical index).
+    name: str
+    scope: str
+    layout: str = PER_DATA_SOURCE
+    filters: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_name(cls, name: str) -> "CollectionTarget":
+        return cls(name=name, scope=name)
+
+
+def data_source_collection(organization_id: str, data_source_id: str) -> str:
+    return f"org:{organization_id}:semantic:{data_source_id}"
+
+
+def resolve_collection(
+    organization_id: str,
+    data_source_id: str,
+    layout: str | None = None,
+    shards: int | None = None,
+) -> CollectionTarget:
+    layout = layout or settings.vector_collection_layout
+    if layout == PER_DATA_SOURCE:
+        name = data_source_collection(organization_id, data_source_id)
+    elif layout == PER_ORGANIZATION:
+        name = f"org:{organization_id}:semantic"
+    elif layout == SHARDED:
+        shards = max(1, shards or settings.vector_collection_shards)
+        name = f"semantic:shard:{zlib.crc32(organization_id.encode('utf-8')) % shards:03d}"
+    else:
+        raise ValueError(f"Unknown vector collection layout {layout!r}; expected one of {list(LAYOUTS)}")
+    return registered_collection(organization_id, data_source_id, name, layout)
+
+
+def registered_collection(organization_id: str, data_source_id: str, collection_name: str, layout: str) -> CollectionTarget:
+    # Rebuilds the target recorded on a VectorIndex row, so a later change of shard count does not
+    # redirect queries for data already indexed.
+    filters: Dict[str, str] = {}
+    if layout == PER_ORGANIZATION:
+        filters = {"data_source_id": data_source_id}
+    elif layout == SHARDED:
+        filters = {"organization_id": organization_id, "data_source_id": data_source_id}
+    return CollectionTarget(
+        name=collection_name,
+        scope=data_source_collection(organization_id, data_source_id),
+        layout=layout,
+        filters=filters,
+    )
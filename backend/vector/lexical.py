@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Tuple
+
+from backend.vector.base import RETRIEVAL_PAYLOAD_FIELDS
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Question scaffolding and time/aggregation words are handled by intent extraction, not retrieval.
+STOPWORDS = frozenset(
+    """
+    a all an and any are as at be by compare count day days did distinct do does for from get give growth have
+    how i in is it last list many me month months much number of on or our over per please show than that the
+    their there this to total trend unique us value values versus vs was we week weeks what when where which who
+    why with year years you
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def query_terms(text: str) -> List[str]:
+    return [t for t in dict.fromkeys(tokenize(text)) if t not in STOPWORDS and not t.isdigit()]
+
+
+@dataclass
+class LexicalResult:
+    hits: List[Tuple[float, Dict[str, Any]]] = field(default_factory=list)
+    # Share of the query's IDF mass matched by the best document; terms the index has never seen count
+    # against it, so questions the index cannot explain fall through to vector search.
+    confidence: float = 0.0
+
+    @property
+    def docs(self) -> List[Dict[str, Any]]:
+        return [payload for _, payload in self.hits]
+
+
+class _Collection:
+    # Token statistics plus the retrieval fields of each doc; document text and the rest of the payload
+    # stay in the vector store, so the index does not hold a second copy of them.
+    def __init__(self, version: str | None = None) -> None:
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.fields: Dict[str, Dict[str, Any]] = {}
+        self.doc_bytes: Dict[str, int] = {}
+        self.total_length = 0
+        self.nbytes = 0
+        self.version = version
+
+    def remove(self, doc_id: str) -> None:
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            posting.pop(doc_id, None)
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.fields.pop(doc_id, None)
+        self.nbytes -= self.doc_bytes.pop(doc_id)
+
+    def add(self, doc_id: str, text: str, payload: Dict[str, Any]) -> None:
+        tokens = tokenize(text)
+        terms = Counter(tokens)
+        for term, tf in terms.items():
+            self.postings[term][doc_id] = tf
+        fields = {key: payload[key] for key in RETRIEVAL_PAYLOAD_FIELDS if key in payload}
+        self.doc_terms[doc_id] = terms
+        self.doc_lengths[doc_id] = len(tokens)
+        self.fields[doc_id] = fields
+        # Serialised fields plus a fixed cost per posting: a stable stand-in for the size of the dicts.
+        self.doc_bytes[doc_id] = len(json.dumps(fields, default=str)) + sum(len(term) + 16 for term in terms)
+        self.nbytes += self.doc_bytes[doc_id]
+        self.total_length += len(tokens)
+
+    def idf(self, term: str) -> float:
+        n = len(self.doc_lengths)
+        df = len(self.postings.get(term, ()))
+        return math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+
+
+class LexicalIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._collections: Dict[str, _Collection] = {}
+
+    def upsert(self, collection: str, docs: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            col = self._collections.setdefault(collection, _Collection())
+            # Incremental changes no longer match whatever source version the collection was built from.
+            col.version = None
+            for doc in docs:
+                doc_id, text = doc.get("id"), doc.get("text")
+                if not doc_id or not text:
+                    continue
+                col.remove(doc_id)
+                col.add(doc_id, text, doc)
+            if not col.doc_lengths:
+                del self._collections[collection]
+
+    def replace(self, collection: str, docs: Iterable[Dict[str, Any]], version: str | None = None) -> None:
+        # Builds the new postings off the lock, then swaps them in; searches see the old or the new set.
+        # An empty set drops the collection rather than keeping an empty one around.
+        col = _Collection(version)
+        for doc in docs:
+            doc_id, text = doc.get("id"), doc.get("text")
+            if doc_id and text:
+                col.remove(doc_id)
+                col.add(doc_id, text, doc)
+        with self._lock:
+            if col.doc_lengths:
+                self._collections[collection] = col
+            else:
+                self._collections.pop(collection, None)
+
+    def version(self, collection: str) -> str | None:
+        with self._lock:
+            col = self._collections.get(collection)
+            return col.version if col else None
+
+    def delete(self, collection: str, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            col = self._collections.get(collection)
+            if col is None:
+                return
+            for doc_id in doc_ids:
+                col.remove(doc_id)
+            if not col.doc_lengths:
+                del self._collections[collection]
+
+    def search(self, collection: str, query: str, top_k: int = 5, role: str | None = None) -> LexicalResult:
+        terms = query_terms(query)
+        with self._lock:
+            col = self._collections.get(collection)
+            if col is None or not col.doc_lengths or not terms:
+                return LexicalResult()
+            avg_length = col.total_length / len(col.doc_lengths)
+            idfs = {t: col.idf(t) for t in terms}
+            scores: Dict[str, float] = defaultdict(float)
+            matched: Dict[str, float] = defaultdict(float)
+            for term in terms:
+                idf = idfs[term]
+                for doc_id, tf in col.postings.get(term, {}).items():
+                    norm = self.k1 * (1.0 - self.b + self.b * col.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1.0) / (tf + norm)
+                    matched[doc_id] += idf
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            hits: List[Tuple[float, Dict[str, Any]]] = []
+            for doc_id, score in ranked:
+                payload = col.fields[doc_id]
+                allowed_roles = payload.get("allowed_roles") or []
+                if role is not None and allowed_roles and role not in allowed_roles:
+                    continue
+                hits.append((score, payload))
+                if len(hits) >= top_k:
+                    break
+        total_idf = sum(idfs.values())
+        confidence = 0.0
+        if hits and total_idf > 0:
+            confidence = max(matched[payload["id"]] for _, payload in hits) / total_idf
+        return LexicalResult(hits=hits, confidence=confidence)
+
+    def size(self, collection: str) -> int:
+        with self._lock:
+            col = self._collections.get(collection)
+            return len(col.doc_lengths) if col else 0
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(col.nbytes for col in self._collections.values())
+
+    def memory(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: {"count": len(col.doc_lengths), "terms": len(col.postings), "total_bytes": col.nbytes, "version": col.version}
+                for name, col in self._collections.items()
+            }
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[Dict[str, Any]]], top_k: int, k: int = 60) -> List[Dict[str, Any]]:
+    scores: Dict[str, float] = defaultdict(float)
+    payloads: Dict[str, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            doc_id = doc.get("id")
+            if not doc_id:
+                continue
+            scores[doc_id] += 1.0 / (k + rank + 1)
+            payloads.setdefault(doc_id, doc)
+    ranked = sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+    return [payloads[doc_id] for doc_id in ranked[:top_k]]
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import re
+import threading
+import zlib
+from typing import Iterable, List, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+LOCAL_EMBEDDING_MODELS = {"local-hashing"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def is_local_model(model: str) -> bool:
+    return model in LOCAL_EMBEDDING_MODELS
+
+
+def _term_features(term: str, char_ngrams: Tuple[int, ...]) -> List[str]:
+    # Bigram terms ("a b") hash as a single feature; word terms add boundary-marked char n-grams.
+    if " " in term:
+        return [f"b:{term}"]
+    padded = f"<{term}>"
+    feats = [f"w:{term}"]
+    for n in char_ngrams:
+        feats.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+    return feats
+
+
+class _TermTable(dict):
+    # term -> id, with each term's hashed (bucket, sign) features stored CSR-style so a whole batch
+    # expands to feature indices with a handful of NumPy gathers.
+    def __init__(self, dimensions: int, char_ngrams: Tuple[int, ...]) -> None:
+        super().__init__()
+        self.dimensions = dimensions
+        self.char_ngrams = char_ngrams
+        self.cols = np.zeros(1024, dtype=np.intp)
+        self.signs = np.zeros(1024, dtype=np.float32)
+        self.offsets = np.zeros(1024, dtype=np.intp)
+        self.size = 0
+
+    def __missing__(self, term: str) -> int:
+        term_id = len(self)
+        hashes = [zlib.crc32(f.encode("utf-8")) for f in _term_features(term, self.char_ngrams)]
+        start = int(self.offsets[term_id])
+        end = start + len(hashes)
+        if end > self.cols.shape[0]:
+            capacity = max(end, self.cols.shape[0] * 2)
+            self.cols = np.resize(self.cols, capacity)
+            self.signs = np.resize(self.signs, capacity)
+        if term_id + 2 > self.offsets.shape[0]:
+            self.offsets = np.resize(self.offsets, self.offsets.shape[0] * 2)
+        # crc32 is stable across processes, unlike hash(), so stored vectors stay comparable after a restart.
+        self.cols[start:end] = [h % self.dimensions for h in hashes]
+        self.signs[start:end] = [1.0 if (h >> 31) & 1 else -1.0 for h in hashes]
+        self.offsets[term_id + 1] = end
+        self[term] = term_id
+        return term_id
+
+
+class LocalHashingEmbedder:
+    def __init__(self, dimensions: int = 256, char_ngrams: Sequence[int] = (3, 4), max_terms: int = 500_000) -> None:
+        if np is None:
+            raise RuntimeError("numpy is not installed")
+        self.dimensions = dimensions
+        self.char_ngrams = tuple(char_ngrams)
+        self.max_terms = max_terms
+        self._lock = threading.Lock()
+        self._terms = _TermTable(dimensions, self.char_ngrams)
+
+    def embed_many(self, texts: Sequence[str]) -> "np.ndarray":
+        # Vectors depend only on their own text: no corpus statistics (e.g. IDF) are applied, since those
+        # would differ between the index and query time, across tenants and after a restart.
+        matrix = self._counts(texts)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed(self, text: str) -> List[float]:
+        return self.embed_many([text])[0].tolist()
+
+    def _counts(self, texts: Sequence[str]) -> "np.ndarray":
+        n = len(texts)
+        term_ids: List[int] = []
+        terms_per_doc: List[int] = []
+        with self._lock:
+            if len(self._terms) > self.max_terms:
+                self._terms = _TermTable(self.dimensions, self.char_ngrams)
+            table = self._terms
+            for text in texts:
+                tokens = _TOKEN_RE.findall(text.lower())
+                bigrams = [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+                term_ids.extend([table[t] for t in tokens])
+                term_ids.extend([table[t] for t in bigrams])
+                terms_per_doc.append(len(tokens) + len(bigrams))
+            cols, signs, offsets = table.cols, table.signs, table.offsets
+
+        if not term_ids:
+            return np.zeros((n, self.dimensions), dtype=np.float32)
+        ids = np.asarray(term_ids, dtype=np.intp)
+        starts = offsets[ids]
+        lengths = offsets[ids + 1] - starts
+        # Expand every term occurrence into the positions of its features in the CSR arrays.
+        shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        positions = shift + np.arange(shift.shape[0], dtype=np.intp)
+        rows = np.repeat(np.repeat(np.arange(n, dtype=np.intp), terms_per_doc), lengths)
+        flat = rows * self.dimensions + cols[positions]
+        counts = np.bincount(flat, weights=signs[positions], minlength=n * self.dimensions)
+        return counts.reshape(n, self.dimensions).astype(np.float32)
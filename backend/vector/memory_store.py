@@ -1,29 +1,512 @@
 from __future__ import annotations
 
+import copy
+import hashlib
+import json
 import math
-from collections import defaultdict
+import os
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, NamedTuple
 
+import numpy as np
+
+from backend.observability.metrics import REGISTRY
 from backend.vector.base import VectorRecord
+from backend.vector.quantization import CODECS, VectorCodec, make_codec
+
+
+VECTOR_EVICTIONS = REGISTRY.counter(
+    "opencortex_vector_collection_evictions_total",
+    "In-memory vector collections spilled to disk to stay within memory limits.",
+    ("reason",),
+)
+VECTOR_RELOADS = REGISTRY.counter(
+    "opencortex_vector_collection_reloads_total",
+    "Spilled in-memory vector collections loaded back on access.",
+)
+VECTOR_RESIDENT_BYTES = REGISTRY.gauge(
+    "opencortex_vector_resident_bytes",
+    "Estimated bytes held by resident in-memory vector collections and the indexes built alongside them.",
+)
+
+
+class _Snapshot(NamedTuple):
+    codec: VectorCodec
+    codes: np.ndarray
+    full: np.ndarray | None
+    payloads: list[dict[str, Any]]
+    mask: np.ndarray | None = None
+
+    def search(self, query: np.ndarray, top_k: int, rerank_factor: int) -> list[int]:
+        if not self.codes.shape[0]:
+            return []
+        scores = self.codec.scores(query, self.codes)
+        visible = self.codes.shape[0]
+        if self.mask is not None:
+            scores = np.where(self.mask, scores, -np.inf)
+            visible = int(self.mask.sum())
+        rerank = self.full is not None and rerank_factor > 1
+        candidates = _top_indices(scores, min(visible, top_k * rerank_factor if rerank else top_k))
+        if rerank:
+            exact = self.full[candidates] @ query
+            return [int(candidates[i]) for i in np.argsort(-exact, kind="stable")[:top_k]]
+        return [int(i) for i in candidates]
+
+
+class _Collection:
+    def __init__(self, dimensions: int, codec: VectorCodec, keep_full_precision: bool) -> None:
+        self.dimensions = dimensions
+        self.codec = codec
+        self.ids: list[str] = []
+        self.payloads: list[dict[str, Any]] = []
+        self.rows: dict[str, int] = {}
+        self.codes = np.empty((0, codec.code_width), dtype=codec.dtype)
+        self.full = np.empty((0, dimensions), dtype=np.float32) if keep_full_precision else None
+        self._masks: dict[tuple, np.ndarray] = {}
+        self._payload_bytes: int | None = None
+        self._organization_rows: Counter | None = None
+        # False once the collection matches its spill files, so evicting it again needs no write.
+        self.dirty = True
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def prepare(self, vectors: list[list[float]]) -> np.ndarray:
+        # Collections take the width of the widest vector stored (see InMemoryVectorStore.upsert); shorter
+        # vectors (e.g. fallback embeddings) are zero-padded, and only queries wider than that are truncated.
+        matrix = np.zeros((len(vectors), self.dimensions), dtype=np.float32)
+        for i, vector in enumerate(vectors):
+            n = min(len(vector), self.dimensions)
+            matrix[i, :n] = vector[:n]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def upsert(self, records: list[VectorRecord]) -> None:
+        self._changed()
+        latest = {r.id: r for r in records}
+        matrix = self.prepare([r.vector for r in latest.values()])
+        existing = [(i, self.rows[rid]) for i, rid in enumerate(latest) if rid in self.rows]
+        added = [i for i, rid in enumerate(latest) if rid not in self.rows]
+        records = list(latest.values())
+
+        if self.codec.needs_fit(len(self) + len(added)) or self.codec.fitted_on == 0:
+            self._refit(matrix)
+
+        # Copy-on-write: snapshots taken by in-flight queries keep referencing the previous arrays and list.
+        if existing:
+            src = [i for i, _ in existing]
+            dst = [row for _, row in existing]
+            codes = self.codes.copy()
+            codes[dst] = self.codec.encode(matrix[src])
+            self.codes = codes
+            if self.full is not None:
+                full = self.full.copy()
+                full[dst] = matrix[src]
+                self.full = full
+            payloads = list(self.payloads)
+            for i, row in existing:
+                payloads[row] = records[i].payload
+            self.payloads = payloads
+        if added:
+            self.codes = np.concatenate([self.codes, self.codec.encode(matrix[added])])
+            if self.full is not None:
+                self.full = np.concatenate([self.full, matrix[added]])
+            for i in added:
+                self.rows[records[i].id] = len(self.ids)
+                self.ids.append(records[i].id)
+            self.payloads = self.payloads + [records[i].payload for i in added]
+
+    def delete(self, ids: list[str]) -> None:
+        drop = {self.rows[i] for i in ids if i in self.rows}
+        if not drop:
+            return
+        self._changed()
+        keep = np.array([row not in drop for row in range(len(self.ids))], dtype=bool)
+        self.codes = self.codes[keep]
+        if self.full is not None:
+            self.full = self.full[keep]
+        self.ids = [doc_id for row, doc_id in enumerate(self.ids) if keep[row]]
+        self.payloads = [payload for row, payload in enumerate(self.payloads) if keep[row]]
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+    def _changed(self) -> None:
+        self._masks = {}
+        self._payload_bytes = None
+        self._organization_rows = None
+        self.dirty = True
+
+    def _refit(self, incoming: np.ndarray) -> None:
+        # Re-encode from full precision when it is kept, otherwise from the decoded codes; that is only the
+        # case for int8, whose scales survive a round trip (PQ always keeps full precision, see
+        # _new_collection). A fresh codec object keeps in-flight searches on their snapshot's codec/codes
+        # pair consistent.
+        current = self.full if self.full is not None else self.codec.decode(self.codes)
+        codec = copy.copy(self.codec)
+        codec.fit(np.concatenate([current, incoming]))
+        self.codes = codec.encode(current)
+        self.codec = codec
+
+    def snapshot(self, role: str | None = None, filters: dict[str, str] | None = None) -> _Snapshot:
+        return _Snapshot(self.codec, self.codes, self.full, self.payloads, self.mask(role, filters))
+
+    def mask(self, role: str | None, filters: dict[str, str] | None = None) -> np.ndarray | None:
+        # Same role rule as VectorIndexService.search_by_vector: docs without allowed_roles are visible to all.
+        # filters are exact payload matches, used to narrow a collection shared by several data sources.
+        if role is None and not filters:
+            return None
+        key = (role, tuple(sorted((filters or {}).items())))
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (_matches(p, role, filters) for p in self.payloads),
+                dtype=bool,
+                count=len(self.payloads),
+            )
+            self._masks[key] = mask
+        return mask
+
+    def payload_bytes(self) -> int:
+        # Serialised size is a stable stand-in for the (larger, interpreter-specific) size of the dicts.
+        if self._payload_bytes is None:
+            self._payload_bytes = sum(len(json.dumps(p, default=str)) for p in self.payloads)
+        return self._payload_bytes
+
+    def nbytes(self) -> int:
+        rerank_bytes = int(self.full.nbytes) if self.full is not None else 0
+        return int(self.codes.nbytes) + rerank_bytes + self.codec.nbytes() + self.payload_bytes()
+
+    def organization_rows(self) -> Counter:
+        if self._organization_rows is None:
+            self._organization_rows = Counter(p.get("organization_id") for p in self.payloads)
+        return self._organization_rows
+
+    def memory(self) -> dict[str, Any]:
+        count = len(self)
+        code_bytes = int(self.codes.nbytes)
+        rerank_bytes = int(self.full.nbytes) if self.full is not None else 0
+        codebook_bytes = self.codec.nbytes()
+        total = code_bytes + rerank_bytes + codebook_bytes
+        return {
+            "count": count,
+            "dimensions": self.dimensions,
+            "encoding": self.codec.name,
+            "code_bytes": code_bytes,
+            "rerank_bytes": rerank_bytes,
+            "codebook_bytes": codebook_bytes,
+            "payload_bytes": self.payload_bytes(),
+            "total_bytes": total + self.payload_bytes(),
+            "bytes_per_vector": round(total / count, 2) if count else 0.0,
+            "compression_vs_float32": round(count * self.dimensions * 4 / total, 2) if total else 0.0,
+        }
+
+    def save(self, path: str) -> None:
+        # Spill format: <path>.npz holds the code/rerank matrices and codec arrays, <path>.json the rest.
+        arrays = {"codes": self.codes}
+        if self.full is not None:
+            arrays["full"] = self.full
+        codec_state = {}
+        for key, value in vars(self.codec).items():
+            if isinstance(value, np.ndarray):
+                arrays[f"codec.{key}"] = value
+            else:
+                codec_state[key] = value
+        np.savez(f"{path}.npz", **arrays)
+        with open(f"{path}.json", "w", encoding="utf-8") as fh:
+            json.dump(
+                {
+                    "dimensions": self.dimensions,
+                    "codec": self.codec.name,
+                    "codec_state": codec_state,
+                    "ids": self.ids,
+                    "payloads": self.payloads,
+                },
+                fh,
+                default=str,
+            )
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: str) -> "_Collection":
+        with open(f"{path}.json", encoding="utf-8") as fh:
+            meta = json.load(fh)
+        with np.load(f"{path}.npz") as data:
+            arrays = {key: data[key] for key in data.files}
+        codec = CODECS[meta["codec"]].__new__(CODECS[meta["codec"]])
+        codec.__dict__.update(meta["codec_state"])
+        for key, value in arrays.items():
+            if key.startswith("codec."):
+                setattr(codec, key[len("codec."):], value)
+        col = cls(meta["dimensions"], codec, keep_full_precision="full" in arrays)
+        col.codes = arrays["codes"]
+        if col.full is not None:
+            col.full = arrays["full"]
+        col.ids = meta["ids"]
+        col.payloads = meta["payloads"]
+        col.rows = {doc_id: row for row, doc_id in enumerate(col.ids)}
+        col.dirty = False
+        return col
 
 
 class InMemoryVectorStore:
-    def __init__(self) -> None:
-        self._collections: dict[str, list[VectorRecord]] = defaultdict(list)
+    def __init__(
+        self,
+        encoding: str = "float32",
+        rerank_factor: int = 0,
+        pq_subspaces: int = 16,
+        memory_budget_bytes: int = 0,
+        organization_quota_bytes: int = 0,
+        organization_quotas: dict[str, int] | None = None,
+        spill_dir: str = "",
+    ) -> None:
+        make_codec(encoding, 1)
+        self.encoding = encoding
+        self.rerank_factor = rerank_factor
+        self.pq_subspaces = pq_subspaces
+        # 0 disables a limit. Collections over a limit are spilled least-recently-used first and reloaded
+        # from spill_dir on their next access.
+        self.memory_budget_bytes = memory_budget_bytes
+        self.organization_quota_bytes = organization_quota_bytes
+        self.organization_quotas = organization_quotas or {}
+        self.spill_dir = spill_dir
+        self._lock = threading.RLock()
+        self._collections: OrderedDict[str, _Collection] = OrderedDict()
+        self._spilled: dict[str, dict[str, Any]] = {}
+        # Bytes held by indexes built alongside the vectors (e.g. the lexical index), counted against the budget.
+        self._external: dict[str, int] = {}
 
     def upsert(self, collection: str, records: list[VectorRecord]) -> None:
-        existing = {r.id: r for r in self._collections[collection]}
-        for r in records:
-            existing[r.id] = r
-        self._collections[collection] = list(existing.values())
-
-    def query(self, collection: str, vector: list[float], top_k: int = 5) -> list[dict]:
-        rows = self._collections.get(collection, [])
-        scored = []
-        for rec in rows:
-            score = _cosine_similarity(vector, rec.vector)
-            scored.append((score, rec.payload))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [p for _, p in scored[:top_k]]
+        if not records:
+            return
+        widths = {len(r.vector) for r in records}
+        if len(widths) > 1:
+            raise ValueError(f"Vectors in one upsert must have the same width, got {sorted(widths)}")
+        width = widths.pop()
+        with self._lock:
+            col = self._resident(collection)
+            if col is None:
+                col = self._new_collection(width)
+                self._collections[collection] = col
+            elif width > col.dimensions:
+                # A wider embedding (e.g. the provider is back after fallback vectors set the width) must not
+                # be cut down, so the collection is rebuilt at the new width with existing rows zero-padded.
+                col = self._widened(col, width)
+                self._collections[collection] = col
+            col.upsert(records)
+            self._enforce_limits(keep=collection)
+
+    def query(
+        self,
+        collection: str,
+        vector: list[float],
+        top_k: int = 5,
+        role: str | None = None,
+        filters: dict[str, str] | None = None,
+    ) -> list[dict]:
+        with self._lock:
+            col = self._resident(collection)
+            if col is None or not vector:
+                return []
+            query = col.prepare([vector])[0]
+            snapshot = col.snapshot(role, filters)
+        # Scoring runs outside the lock; upserts replace arrays rather than resizing them in place.
+        return [snapshot.payloads[i] for i in snapshot.search(query, top_k, self.rerank_factor)]
+
+    def account_external(self, name: str, nbytes: int) -> None:
+        with self._lock:
+            self._external[name] = nbytes
+            self._enforce_limits(keep=None)
+
+    def delete(self, collection: str, ids: list[str]) -> None:
+        with self._lock:
+            col = self._resident(collection)
+            if col is not None:
+                col.delete(ids)
+
+    def content_hashes(self, collection: str, filters: dict[str, str] | None = None) -> dict[str, str]:
+        with self._lock:
+            col = self._resident(collection)
+            if col is None:
+                return {}
+            return {
+                doc_id: payload.get("content_hash", "")
+                for doc_id, payload in zip(col.ids, col.payloads)
+                if _matches(payload, None, filters)
+            }
+
+    def memory_stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            stats = {
+                name: {**col.memory(), "state": "resident", "organization_id": _organization(name)}
+                for name, col in self._collections.items()
+            }
+            stats.update({name: {**summary, "state": "spilled"} for name, summary in self._spilled.items()})
+            return stats
+
+    def memory_report(self) -> dict[str, Any]:
+        with self._lock:
+            organizations: dict[str, dict[str, Any]] = {}
+
+            def account(org: str, state: str, size: float) -> None:
+                usage = organizations.setdefault(
+                    org,
+                    {"resident_bytes": 0, "spilled_bytes": 0, "quota_bytes": self._quota(org)},
+                )
+                usage[f"{state}_bytes"] += int(size)
+
+            for name, col in self._collections.items():
+                for org, size in self._organization_shares(name, col.nbytes(), col.organization_rows()).items():
+                    account(org, "resident", size)
+            for name, summary in self._spilled.items():
+                for org, size in self._organization_shares(name, summary["total_bytes"], summary["organization_rows"]).items():
+                    account(org, "spilled", size)
+            resident_bytes = sum(col.nbytes() for col in self._collections.values())
+            return {
+                "budget_bytes": self.memory_budget_bytes,
+                "resident_bytes": resident_bytes,
+                "spilled_bytes": sum(summary["total_bytes"] for summary in self._spilled.values()),
+                "external_bytes": dict(self._external),
+                "organizations": organizations,
+                "collections": self.memory_stats(),
+            }
+
+    def measure_recall(self, collection: str, k: int = 10, samples: int = 50, seed: int = 0) -> dict[str, Any] | None:
+        # Recall@k of the compressed scan (with and without re-ranking) against exact search. Needs the
+        # full-precision copy kept for re-ranking; queries are perturbed copies of stored vectors.
+        with self._lock:
+            col = self._collections.get(collection)
+            if col is None or col.full is None or not len(col):
+                return None
+            rng = np.random.default_rng(seed)
+            picks = rng.choice(len(col), min(samples, len(col)), replace=False)
+            queries = col.full[picks] + rng.normal(0, 0.05, (len(picks), col.dimensions)).astype(np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+            k = min(k, len(col))
+            snapshot = col.snapshot()
+            raw = reranked = 0
+            for q in queries:
+                exact = set(_top_indices(col.full @ q, k).tolist())
+                raw += len(exact & set(snapshot.search(q, k, rerank_factor=1)))
+                reranked += len(exact & set(snapshot.search(q, k, rerank_factor=max(self.rerank_factor, 1))))
+            total = k * len(queries)
+            return {
+                "k": k,
+                "samples": len(queries),
+                "recall": round(raw / total, 4),
+                "reranked_recall": round(reranked / total, 4),
+            }
+
+    def _resident(self, collection: str) -> _Collection | None:
+        col = self._collections.get(collection)
+        if col is not None:
+            self._collections.move_to_end(collection)
+            return col
+        if collection not in self._spilled:
+            return None
+        col = _Collection.load(self._spill_path(collection))
+        del self._spilled[collection]
+        self._collections[collection] = col
+        VECTOR_RELOADS.inc()
+        self._enforce_limits(keep=collection)
+        return col
+
+    def _enforce_limits(self, keep: str | None) -> None:
+        # The collection being served is never evicted, so one collection larger than a limit stays resident.
+        if self.organization_quota_bytes or self.organization_quotas:
+            usage: dict[str, int] = {}
+            for name, col in self._collections.items():
+                org = _organization(name)
+                if org is not None:
+                    usage[org] = usage.get(org, 0) + col.nbytes()
+            for org, used in usage.items():
+                quota = self._quota(org)
+                # Only collections owned by one organization count against its quota; shared shards are
+                # left to the global budget.
+                for name in [n for n in self._collections if _organization(n) == org and n != keep]:
+                    if not quota or used <= quota:
+                        break
+                    used -= self._spill(name, "organization_quota")
+
+        resident = sum(col.nbytes() for col in self._collections.values()) + sum(self._external.values())
+        if self.memory_budget_bytes:
+            for name in [n for n in self._collections if n != keep]:
+                if resident <= self.memory_budget_bytes:
+                    break
+                resident -= self._spill(name, "memory_budget")
+        VECTOR_RESIDENT_BYTES.set(resident)
+
+    def _spill(self, collection: str, reason: str) -> int:
+        col = self._collections.pop(collection)
+        path = self._spill_path(collection)
+        if col.dirty or not os.path.exists(f"{path}.npz"):
+            col.save(path)
+        self._spilled[collection] = {
+            **col.memory(),
+            "organization_id": _organization(collection),
+            "organization_rows": dict(col.organization_rows()),
+            "disk_bytes": os.path.getsize(f"{path}.npz") + os.path.getsize(f"{path}.json"),
+        }
+        VECTOR_EVICTIONS.inc(reason=reason)
+        return col.nbytes()
+
+    def _spill_path(self, collection: str) -> str:
+        if not self.spill_dir:
+            self.spill_dir = tempfile.mkdtemp(prefix="opencortex-vectors-")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        return os.path.join(self.spill_dir, hashlib.sha1(collection.encode("utf-8")).hexdigest())
+
+    def _quota(self, organization_id: str) -> int:
+        return self.organization_quotas.get(organization_id, self.organization_quota_bytes)
+
+    def _organization_shares(self, collection: str, size: int, organization_rows: dict) -> dict[str, float]:
+        # Shared collections (see vector.layout) are attributed to organizations by row share.
+        org = _organization(collection)
+        if org is not None:
+            return {org: size}
+        rows = sum(organization_rows.values())
+        return {str(o or "unattributed"): size * n / rows for o, n in organization_rows.items()} if rows else {}
+
+    def _widened(self, col: _Collection, dimensions: int) -> _Collection:
+        widened = self._new_collection(dimensions)
+        if len(col):
+            vectors = col.full if col.full is not None else col.codec.decode(col.codes)
+            widened.upsert(
+                [
+                    VectorRecord(id=doc_id, vector=vector.tolist(), payload=payload)
+                    for doc_id, vector, payload in zip(col.ids, vectors, col.payloads)
+                ]
+            )
+        return widened
+
+    def _new_collection(self, dimensions: int) -> _Collection:
+        options = {"subspaces": self.pq_subspaces} if self.encoding == "pq" else {}
+        codec = make_codec(self.encoding, dimensions, **options)
+        # float32 codes already are full precision, so re-ranking needs no second copy. PQ keeps one even
+        # without re-ranking: retraining centroids on their own reconstructions would compound the error.
+        keep_full_precision = (self.rerank_factor > 0 or self.encoding == "pq") and self.encoding != "float32"
+        return _Collection(dimensions, codec, keep_full_precision=keep_full_precision)
+
+
+def _organization(collection: str) -> str | None:
+    # Collections named "org:<organization_id>:..." belong to one organization; anything else is shared.
+    parts = collection.split(":")
+    return parts[1] if len(parts) > 2 and parts[0] == "org" else None
+
+
+def _matches(payload: dict[str, Any], role: str | None, filters: dict[str, str] | None) -> bool:
+    if filters and any(payload.get(key) != value for key, value in filters.items()):
+        return False
+    return role is None or not payload.get("allowed_roles") or role in payload["allowed_roles"]
+
+
+def _top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    part = np.argpartition(-scores, k - 1)[:k]
+    return part[np.argsort(-scores[part], kind="stable")]
 
 
 def _cosine_similarity(a: list[float], b: list[float]) -> float:
@@ -1,15 +1,46 @@
 from __future__ import annotations
 
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
-from backend.vector.base import VectorRecord
+from backend.vector.base import RETRIEVAL_PAYLOAD_FIELDS, VectorRecord
+
+
+# organization_id/data_source_id narrow collections shared by several data sources (see vector.layout).
+INDEXED_PAYLOAD_FIELDS = ("kind", "allowed_roles", "organization_id", "data_source_id")
+
+
+def point_id(doc_id: str) -> str:
+    # Qdrant only accepts unsigned ints or UUIDs; the doc id itself stays in the payload.
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, doc_id))
 
 
 class QdrantVectorStore:
-    def __init__(self, url: str, api_key: str = "") -> None:
+    def __init__(
+        self,
+        url: str,
+        api_key: str = "",
+        upsert_batch_size: int = 256,
+        upsert_parallelism: int = 4,
+        slim_payloads: bool = False,
+        client: Any = None,
+    ) -> None:
         try:
             from qdrant_client import QdrantClient
-            from qdrant_client.http.models import PointStruct, VectorParams, Distance
+            from qdrant_client.http.models import (
+                Distance,
+                FieldCondition,
+                Filter,
+                IsEmptyCondition,
+                MatchValue,
+                PayloadField,
+                PayloadSchemaType,
+                PointIdsList,
+                PointStruct,
+                VectorParams,
+            )
         except ImportError as exc:
             raise RuntimeError("qdrant-client is required for QdrantVectorStore") from exc
 
@@ -17,23 +48,147 @@ class QdrantVectorStore:
         self._point_cls = PointStruct
         self._vector_params_cls = VectorParams
         self._distance_cls = Distance
-        self.client = QdrantClient(url=url, api_key=api_key or None)
+        self._point_ids_cls = PointIdsList
+        self._filter_cls = Filter
+        self._field_condition_cls = FieldCondition
+        self._match_value_cls = MatchValue
+        self._is_empty_cls = IsEmptyCondition
+        self._payload_field_cls = PayloadField
+        self._keyword_schema = PayloadSchemaType.KEYWORD
+        self.client = client or QdrantClient(url=url, api_key=api_key or None)
+        self.upsert_batch_size = max(1, upsert_batch_size)
+        self.upsert_parallelism = max(1, upsert_parallelism)
+        self.slim_payloads = slim_payloads
+        self._known_collections: set[str] = set()
+        self._collections_lock = threading.Lock()
 
     def upsert(self, collection: str, records: list[VectorRecord]) -> None:
         if not records:
             return
-        size = len(records[0].vector)
-        if not self.client.collection_exists(collection):
-            self.client.recreate_collection(
+        self._ensure_collection(collection, size=len(records[0].vector))
+
+        points = [self._point_cls(id=point_id(r.id), vector=r.vector, payload=self._payload(r)) for r in records]
+        chunks = [points[i:i + self.upsert_batch_size] for i in range(0, len(points), self.upsert_batch_size)]
+        if len(chunks) == 1 or self.upsert_parallelism == 1:
+            for chunk in chunks:
+                self._upsert_chunk(collection, chunk)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.upsert_parallelism, len(chunks))) as pool:
+            list(pool.map(lambda chunk: self._upsert_chunk(collection, chunk), chunks))
+
+    def query(
+        self,
+        collection: str,
+        vector: list[float],
+        top_k: int = 5,
+        role: str | None = None,
+        filters: dict[str, str] | None = None,
+    ) -> list[dict[str, Any]]:
+        if not self._collection_exists(collection):
+            return []
+        try:
+            results = self.client.query_points(
+                collection_name=collection,
+                query=vector,
+                query_filter=self._query_filter(role, filters),
+                limit=top_k,
+                with_payload=True,
+            ).points
+        except Exception:
+            # Most likely the collection was dropped elsewhere; forget it and let the next call re-check.
+            self.invalidate(collection)
+            if self.client.collection_exists(collection):
+                raise
+            return []
+        return [r.payload for r in results]
+
+    def delete(self, collection: str, ids: list[str]) -> None:
+        if not ids or not self._collection_exists(collection):
+            return
+        self.client.delete(
+            collection_name=collection,
+            points_selector=self._point_ids_cls(points=[point_id(i) for i in ids]),
+        )
+
+    def content_hashes(self, collection: str, filters: dict[str, str] | None = None) -> dict[str, str]:
+        if not self._collection_exists(collection):
+            return {}
+        hashes: dict[str, str] = {}
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection,
+                scroll_filter=self._query_filter(None, filters),
+                with_payload=["id", "content_hash"],
+                with_vectors=False,
+                limit=1024,
+                offset=offset,
+            )
+            for point in points:
+                payload = point.payload or {}
+                hashes[str(payload.get("id", point.id))] = payload.get("content_hash", "")
+            if offset is None:
+                return hashes
+
+    def invalidate(self, collection: str | None = None) -> None:
+        with self._collections_lock:
+            if collection is None:
+                self._known_collections.clear()
+            else:
+                self._known_collections.discard(collection)
+
+    def _collection_exists(self, collection: str) -> bool:
+        if collection in self._known_collections:
+            return True
+        exists = self.client.collection_exists(collection)
+        if exists:
+            with self._collections_lock:
+                self._known_collections.add(collection)
+        return exists
+
+    def _ensure_collection(self, collection: str, size: int) -> None:
+        if self._collection_exists(collection):
+            return
+        try:
+            self.client.create_collection(
                 collection_name=collection,
                 vectors_config=self._vector_params_cls(size=size, distance=self._distance_cls.COSINE),
             )
+        except Exception:
+            # Another worker may have created it first; anything else is a real failure.
+            if not self.client.collection_exists(collection):
+                raise
+        else:
+            for field_name in INDEXED_PAYLOAD_FIELDS:
+                self.client.create_payload_index(
+                    collection_name=collection,
+                    field_name=field_name,
+                    field_schema=self._keyword_schema,
+                )
+        with self._collections_lock:
+            self._known_collections.add(collection)
 
-        points = [self._point_cls(id=r.id, vector=r.vector, payload=r.payload) for r in records]
-        self.client.upsert(collection_name=collection, points=points)
+    def _upsert_chunk(self, collection: str, points: list[Any]) -> None:
+        self.client.upsert(collection_name=collection, points=points, wait=True)
 
-    def query(self, collection: str, vector: list[float], top_k: int = 5) -> list[dict[str, Any]]:
-        if not self.client.collection_exists(collection):
-            return []
-        results = self.client.search(collection_name=collection, query_vector=vector, limit=top_k)
-        return [r.payload for r in results]
+    def _payload(self, record: VectorRecord) -> dict[str, Any]:
+        payload = {**record.payload, "id": record.id}
+        if not self.slim_payloads:
+            return payload
+        return {k: payload[k] for k in RETRIEVAL_PAYLOAD_FIELDS if k in payload}
+
+    def _query_filter(self, role: str | None, filters: dict[str, str] | None) -> Any:
+        # Same role rule as VectorIndexService.search_by_vector: docs without allowed_roles are visible to all.
+        if role is None and not filters:
+            return None
+        must = [
+            self._field_condition_cls(key=key, match=self._match_value_cls(value=value))
+            for key, value in (filters or {}).items()
+        ]
+        should = None
+        if role is not None:
+            should = [
+                self._is_empty_cls(is_empty=self._payload_field_cls(key="allowed_roles")),
+                self._field_condition_cls(key="allowed_roles", match=self._match_value_cls(value=role)),
+            ]
+        return self._filter_cls(must=must or None, should=should)
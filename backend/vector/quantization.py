@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from typing import Dict, Type
+
+import numpy as np
+
+
+_SCORE_CHUNK_ROWS = 32_768
+
+
+class VectorCodec:
+    # Vectors are unit-normalised before encoding, so inner products are cosine similarities.
+    name = "float32"
+    dtype: np.dtype = np.dtype(np.float32)
+
+    def __init__(self, dimensions: int) -> None:
+        self.dimensions = dimensions
+        self.fitted_on = 0
+
+    @property
+    def code_width(self) -> int:
+        return self.dimensions
+
+    def fit(self, vectors: np.ndarray) -> None:
+        self.fitted_on = vectors.shape[0]
+
+    def needs_fit(self, count: int) -> bool:
+        return False
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.astype(self.dtype)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32)
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        if codes.dtype == np.float32:
+            return codes @ query
+        out = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], _SCORE_CHUNK_ROWS):
+            chunk = codes[start:start + _SCORE_CHUNK_ROWS]
+            out[start:start + chunk.shape[0]] = self.decode(chunk) @ query
+        return out
+
+    def nbytes(self) -> int:
+        return 0
+
+
+class Float16Codec(VectorCodec):
+    name = "float16"
+    dtype = np.dtype(np.float16)
+
+
+class Int8Codec(VectorCodec):
+    # Symmetric scalar quantisation with a per-dimension scale fitted on the data.
+    name = "int8"
+    dtype = np.dtype(np.int8)
+
+    def __init__(self, dimensions: int) -> None:
+        super().__init__(dimensions)
+        self.scale = np.full(dimensions, 1.0 / 127.0, dtype=np.float32)
+
+    def fit(self, vectors: np.ndarray) -> None:
+        super().fit(vectors)
+        if vectors.shape[0]:
+            peak = np.abs(vectors).max(axis=0)
+            self.scale = np.where(peak > 0, peak / 127.0, 1.0 / 127.0).astype(np.float32)
+
+    def needs_fit(self, count: int) -> bool:
+        return count > 2 * self.fitted_on
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        scaled = query * self.scale
+        out = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], _SCORE_CHUNK_ROWS):
+            chunk = codes[start:start + _SCORE_CHUNK_ROWS]
+            out[start:start + chunk.shape[0]] = chunk.astype(np.float32) @ scaled
+        return out
+
+    def nbytes(self) -> int:
+        return self.scale.nbytes
+
+
+class ProductQuantizationCodec(VectorCodec):
+    # Splits vectors into `subspaces` chunks, each encoded as the index of its nearest k-means centroid.
+    # Queries use asymmetric distance: the query stays exact and is compared against centroids once.
+    name = "pq"
+    dtype = np.dtype(np.uint8)
+
+    def __init__(
+        self,
+        dimensions: int,
+        subspaces: int = 16,
+        centroids: int = 256,
+        iterations: int = 12,
+        sample_size: int = 16_384,
+        seed: int = 0,
+    ) -> None:
+        super().__init__(dimensions)
+        self.subspaces = max(1, min(subspaces, dimensions))
+        self.sub_dim = -(-dimensions // self.subspaces)
+        self.centroids = min(centroids, 256)
+        self.iterations = iterations
+        self.sample_size = sample_size
+        self.seed = seed
+        self.codebooks = np.zeros((self.subspaces, 1, self.sub_dim), dtype=np.float32)
+
+    @property
+    def code_width(self) -> int:
+        return self.subspaces
+
+    def needs_fit(self, count: int) -> bool:
+        return count > 2 * self.fitted_on
+
+    def fit(self, vectors: np.ndarray) -> None:
+        super().fit(vectors)
+        if not vectors.shape[0]:
+            return
+        rng = np.random.default_rng(self.seed)
+        sample = self._split(vectors)
+        if sample.shape[0] > self.sample_size:
+            sample = sample[rng.choice(sample.shape[0], self.sample_size, replace=False)]
+        k = min(self.centroids, sample.shape[0])
+        codebooks = np.empty((self.subspaces, k, self.sub_dim), dtype=np.float32)
+        for m in range(self.subspaces):
+            codebooks[m] = _kmeans(sample[:, m, :], k, self.iterations, rng)
+        self.codebooks = codebooks
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(vectors)
+        codes = np.empty((vectors.shape[0], self.subspaces), dtype=np.uint8)
+        for m in range(self.subspaces):
+            codes[:, m] = _nearest(parts[:, m, :], self.codebooks[m])
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self.codebooks[np.arange(self.subspaces), codes]
+        return parts.reshape(codes.shape[0], -1)[:, : self.dimensions]
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        q = self._split(query[None, :])[0]
+        table = np.einsum("mkd,md->mk", self.codebooks, q)
+        out = np.zeros(codes.shape[0], dtype=np.float32)
+        for m in range(self.subspaces):
+            out += table[m].take(codes[:, m])
+        return out
+
+    def nbytes(self) -> int:
+        return self.codebooks.nbytes
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        padded_width = self.subspaces * self.sub_dim
+        if vectors.shape[1] < padded_width:
+            vectors = np.pad(vectors, ((0, 0), (0, padded_width - vectors.shape[1])))
+        return vectors.reshape(vectors.shape[0], self.subspaces, self.sub_dim)
+
+
+def _nearest(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(points.shape[0], dtype=np.intp)
+    c_sq = (centroids**2).sum(axis=1)
+    for start in range(0, points.shape[0], _SCORE_CHUNK_ROWS):
+        chunk = points[start:start + _SCORE_CHUNK_ROWS]
+        labels[start:start + chunk.shape[0]] = np.argmin(c_sq - 2.0 * chunk @ centroids.T, axis=1)
+    return labels
+
+
+def _kmeans(points: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = points[rng.choice(points.shape[0], k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _nearest(points, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, points)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+CODECS: Dict[str, Type[VectorCodec]] = {
+    "float32": VectorCodec,
+    "float16": Float16Codec,
+    "int8": Int8Codec,
+    "pq": ProductQuantizationCodec,
+}
+
+
+def make_codec(encoding: str, dimensions: int, **options: int) -> VectorCodec:
+    if encoding not in CODECS:
+        raise ValueError(f"Unknown vector encoding {encoding!r}; expected one of {sorted(CODECS)}")
+    if encoding == "pq":
+        return ProductQuantizationCodec(dimensions, **options)
+    return CODECS[encoding](dimensions)
@@ -1,71 +1,279 @@
 from __future__ import annotations
 
 import hashlib
+import json
 from typing import Any, Iterable
 
 import requests
 
-from backend.config import settings
+from backend.circuit_breaker import get_breaker
+from backend.config import parse_mapping, settings
+from backend.semantic.snapshot import CachedSnapshot
 from backend.vector.base import VectorRecord, VectorStore
+from backend.vector.hedging import HedgedEmbedder
+from backend.vector.layout import CollectionTarget, resolve_collection
+from backend.vector.lexical import LexicalIndex, LexicalResult, reciprocal_rank_fusion
+from backend.vector.local_embedder import LocalHashingEmbedder, is_local_model
+
+
+EMBEDDING_TIMEOUT_SECONDS = 30.0
+_MIB = 1024 * 1024
 
 
 def get_vector_store() -> VectorStore:
     if settings.vector_provider == "qdrant" and settings.qdrant_url:
         from backend.vector.qdrant_store import QdrantVectorStore
 
-        return QdrantVectorStore(url=settings.qdrant_url, api_key=settings.qdrant_api_key)
+        return QdrantVectorStore(
+            url=settings.qdrant_url,
+            api_key=settings.qdrant_api_key,
+            upsert_batch_size=settings.qdrant_upsert_batch_size,
+            upsert_parallelism=settings.qdrant_upsert_parallelism,
+            slim_payloads=settings.qdrant_slim_payloads,
+        )
 
     from backend.vector.memory_store import InMemoryVectorStore
 
-    return InMemoryVectorStore()
+    return InMemoryVectorStore(
+        encoding=settings.vector_encoding,
+        rerank_factor=settings.vector_rerank_factor,
+        pq_subspaces=settings.vector_pq_subspaces,
+        memory_budget_bytes=int(settings.vector_memory_budget_mb * _MIB),
+        organization_quota_bytes=int(settings.vector_organization_memory_quota_mb * _MIB),
+        organization_quotas=_parse_quotas(settings.vector_organization_memory_quotas_mb),
+        spill_dir=settings.vector_spill_dir,
+    )
+
+
+def _parse_quotas(raw: str) -> dict[str, int]:
+    quotas: dict[str, int] = {}
+    for organization_id, value in parse_mapping(raw).items():
+        try:
+            quotas[organization_id] = int(float(value) * _MIB)
+        except ValueError:
+            continue
+    return quotas
+
+
+def content_hash(doc: dict[str, Any], embedding_signature: str) -> str:
+    body = {k: v for k, v in doc.items() if k != "content_hash"}
+    raw = json.dumps([embedding_signature, body], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
 
 
 class EmbeddingClient:
+    def __init__(self) -> None:
+        self.local: LocalHashingEmbedder | None = None
+        if is_local_model(settings.embedding_model):
+            self.local = LocalHashingEmbedder(dimensions=settings.embedding_dimensions)
+
     def is_configured(self) -> bool:
-        return bool(settings.llm_api_base and settings.llm_api_key)
+        return self.local is None and bool(settings.llm_api_base and settings.llm_api_key)
 
-    def embed(self, text: str) -> list[float]:
+    def embed(self, text: str, timeout: float | None = None) -> list[float]:
+        if self.local is not None:
+            return self.local.embed(text)
         if self.is_configured():
             try:
-                response = requests.post(
-                    f"{settings.llm_api_base.rstrip('/')}/embeddings",
-                    headers={
-                        "Authorization": f"Bearer {settings.llm_api_key}",
-                        "Content-Type": "application/json",
-                    },
-                    json={"model": settings.embedding_model, "input": text},
-                    timeout=30,
-                )
-                response.raise_for_status()
-                return response.json()["data"][0]["embedding"]
+                return self.embed_remote(text, timeout=timeout)
             except Exception:
                 pass
         return self._deterministic_vector(text)
 
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        vectors = self.try_embed_documents(texts)
+        return [v if v is not None else self._deterministic_vector(t) for t, v in zip(texts, vectors)]
+
+    def try_embed_documents(self, texts: list[str]) -> list[list[float] | None]:
+        # None marks texts the configured provider failed to embed (as opposed to the intended fallback).
+        if self.local is not None:
+            return self.local.embed_many(texts).tolist()
+        if not self.is_configured():
+            return [self._deterministic_vector(text) for text in texts]
+        vectors: list[list[float] | None] = []
+        for text in texts:
+            try:
+                vectors.append(self.embed_remote(text))
+            except Exception:
+                vectors.append(None)
+        return vectors
+
+    def signature(self) -> str:
+        if self.local is not None:
+            # "tf": term-frequency weighting only; older IDF-weighted vectors hash differently and are re-embedded.
+            return f"{settings.embedding_model}:{self.local.dimensions}:tf"
+        if self.is_configured():
+            return settings.embedding_model
+        return "sha256-fallback"
+
+    def embed_remote(self, text: str, timeout: float | None = None) -> list[float]:
+        url = f"{settings.llm_api_base.rstrip('/')}/embeddings"
+        capped = timeout is not None and timeout < EMBEDDING_TIMEOUT_SECONDS
+        response = get_breaker(url).call(lambda: self._post(url, text, timeout), capped_timeout=capped)
+        return response.json()["data"][0]["embedding"]
+
+    def _post(self, url: str, text: str, timeout: float | None) -> requests.Response:
+        response = requests.post(
+            url,
+            headers={
+                "Authorization": f"Bearer {settings.llm_api_key}",
+                "Content-Type": "application/json",
+            },
+            json={"model": settings.embedding_model, "input": text},
+            timeout=EMBEDDING_TIMEOUT_SECONDS if timeout is None else min(timeout, EMBEDDING_TIMEOUT_SECONDS),
+        )
+        response.raise_for_status()
+        return response
+
     def _deterministic_vector(self, text: str) -> list[float]:
         digest = hashlib.sha256(text.encode("utf-8")).digest()
         return [((b / 255.0) * 2.0) - 1.0 for b in digest]
 
 
 class VectorIndexService:
-    def __init__(self, store: VectorStore, embedder: EmbeddingClient | None = None) -> None:
+    def __init__(
+        self,
+        store: VectorStore,
+        embedder: EmbeddingClient | None = None,
+        hedger: HedgedEmbedder | None = None,
+        lexical: LexicalIndex | None = None,
+    ) -> None:
         self.store = store
         self.embedder = embedder or EmbeddingClient()
+        self.lexical = lexical or LexicalIndex()
+        if hedger is None and settings.embedding_hedging:
+            hedger = HedgedEmbedder.from_settings(self.embedder.embed_remote)
+        self.hedger = hedger
+
+    def target(self, organization_id: str, data_source_id: str, layout: str | None = None) -> CollectionTarget:
+        return resolve_collection(organization_id, data_source_id, layout=layout)
+
+    def index_documents(self, collection: str | CollectionTarget, docs: Iterable[dict[str, Any]]) -> dict[str, int]:
+        # docs is the complete set for the collection: unchanged docs are skipped, missing ones deleted.
+        target = _as_target(collection)
+        signature = self.embedder.signature()
+        docs = [{**doc, **target.filters} for doc in docs if doc.get("text") and doc.get("id")]
+        docs = [{**doc, "content_hash": content_hash(doc, signature)} for doc in docs]
+        existing = self.store.content_hashes(target.name, filters=target.filters or None)
+        changed = [doc for doc in docs if existing.get(doc["id"]) != doc["content_hash"]]
+        removed = sorted(set(existing) - {doc["id"] for doc in docs})
 
-    def index_documents(self, collection: str, docs: Iterable[dict[str, Any]]) -> int:
         records = []
-        for doc in docs:
-            text = doc.get("text", "")
-            doc_id = doc.get("id")
-            if not text or not doc_id:
-                continue
-            records.append(VectorRecord(id=doc_id, vector=self.embedder.embed(text), payload=doc))
-        self.store.upsert(collection, records)
-        return len(records)
+        vectors = self.embedder.try_embed_documents([doc["text"] for doc in changed])
+        # Stores take one width per upsert, so fallback vectors are zero-padded to the provider's width.
+        width = max((len(vector) for vector in vectors if vector is not None), default=0)
+        for doc, vector in zip(changed, vectors):
+            if vector is None:
+                # Index the fallback vector but leave the hash blank so the next run retries the provider.
+                doc = {**doc, "content_hash": ""}
+                vector = self.embedder._deterministic_vector(doc["text"])
+                vector += [0.0] * (width - len(vector))
+            records.append(VectorRecord(id=doc["id"], vector=vector, payload=doc))
+        self.store.upsert(target.name, records)
+        self.store.delete(target.name, removed)
+
+        # The lexical index is rebuilt from every doc: it is cheap and repopulates after a restart.
+        self.lexical.upsert(target.scope, docs)
+        self.lexical.delete(target.scope, removed)
+        self._account_lexical()
+
+        added = sum(1 for doc in changed if doc["id"] not in existing)
+        return {
+            "added": added,
+            "updated": len(changed) - added,
+            "removed": len(removed),
+            "skipped": len(docs) - len(changed),
+        }
+
+    def drop_documents(self, collection: str | CollectionTarget, keep_lexical: bool = False) -> int:
+        # Removes one data source's vectors, e.g. the copy left in its old collection after a layout move.
+        target = _as_target(collection)
+        ids = sorted(self.store.content_hashes(target.name, filters=target.filters or None))
+        self.store.delete(target.name, ids)
+        if not keep_lexical:
+            self.lexical.delete(target.scope, ids)
+            self._account_lexical()
+        return len(ids)
+
+    def sync_lexical(self, organization_id: str, data_source_id: str, snapshot: CachedSnapshot) -> bool:
+        # The lexical index is process-local. Each worker rebuilds it from the shared semantic snapshot
+        # whenever the snapshot's etag moves, so every worker holds the same postings and makes the same
+        # confident-skip decision for a question.
+        # Callers must have checked that the data source belongs to organization_id. A model with no docs
+        # leaves no collection behind, so probing unknown scopes cannot grow the index.
+        target = self.target(organization_id, data_source_id)
+        if self.lexical.version(target.scope) == snapshot.etag:
+            return False
+        docs = [{**doc, **target.filters} for doc in self.build_semantic_docs(data_source_id, snapshot.model)]
+        if not docs and not self.lexical.size(target.scope):
+            return False
+        self.lexical.replace(target.scope, docs, version=snapshot.etag)
+        self._account_lexical()
+        return True
+
+    def _account_lexical(self) -> None:
+        # Stores with a memory budget count the lexical index against it.
+        account = getattr(self.store, "account_external", None)
+        if account is not None:
+            account("lexical", self.lexical.nbytes())
+
+    def search(self, collection: str | CollectionTarget, query: str, top_k: int = 5, role: str | None = None) -> list[dict[str, Any]]:
+        lexical = self.lexical_search(collection, query, top_k=top_k, role=role)
+        vector = None if self.is_lexically_confident(lexical, top_k) else self.embed_query(query)
+        return self.hybrid_search(collection, vector, lexical, top_k=top_k, role=role)
 
-    def search(self, collection: str, query: str, top_k: int = 5, role: str | None = None) -> list[dict[str, Any]]:
-        vec = self.embedder.embed(query)
-        candidates = self.store.query(collection, vec, top_k=max(top_k * 5, 25))
+    def lexical_search(
+        self,
+        collection: str | CollectionTarget,
+        query: str,
+        top_k: int = 5,
+        role: str | None = None,
+    ) -> LexicalResult:
+        return self.lexical.search(_as_target(collection).scope, query, top_k=max(top_k * 2, 25), role=role)
+
+    def is_lexically_confident(self, lexical: LexicalResult, top_k: int) -> bool:
+        # Skipping the embedding is only safe when lexical hits alone can fill the result set.
+        return len(lexical.hits) >= top_k and lexical.confidence >= settings.lexical_confidence_threshold
+
+    def hybrid_search(
+        self,
+        collection: str | CollectionTarget,
+        vector: list[float] | None,
+        lexical: LexicalResult,
+        top_k: int = 5,
+        role: str | None = None,
+    ) -> list[dict[str, Any]]:
+        # vector is None when the lexical match was confident enough to skip the embedding call.
+        if vector is None:
+            return lexical.docs[:top_k]
+        vector_docs = self.search_by_vector(collection, vector, top_k=max(top_k * 2, 25), role=role)
+        if not lexical.hits:
+            return vector_docs[:top_k]
+        return reciprocal_rank_fusion([vector_docs, lexical.docs], top_k=top_k)
+
+    def embed_query(self, query: str, timeout: float | None = None) -> list[float]:
+        if self.hedger is not None and self.embedder.is_configured():
+            try:
+                return self.hedger.embed(query, timeout=timeout)
+            except Exception:
+                return self.embedder._deterministic_vector(query)
+        return self.embedder.embed(query, timeout=timeout)
+
+    def search_by_vector(
+        self,
+        collection: str | CollectionTarget,
+        vector: list[float],
+        top_k: int = 5,
+        role: str | None = None,
+    ) -> list[dict[str, Any]]:
+        target = _as_target(collection)
+        candidates = self.store.query(
+            target.name,
+            vector,
+            top_k=max(top_k * 5, 25),
+            role=role,
+            filters=target.filters or None,
+        )
         filtered: list[dict[str, Any]] = []
         for doc in candidates:
             if role is None:
@@ -104,3 +312,7 @@ class VectorIndexService:
             docs.append({"id": doc_id, "kind": "metric", "text": text, **metric})
 
         return docs
+
+
+def _as_target(collection: str | CollectionTarget) -> CollectionTarget:
+    return collection if isinstance(collection, CollectionTarget) else CollectionTarget.from_name(collection)